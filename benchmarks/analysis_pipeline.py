@@ -0,0 +1,80 @@
+"""Measure the background analysis of a generated chapter: how long until every paragraph is analysed,
+and what a burst of typing costs, in jobs sent and time spent on the Tk thread. The chapter is headless,
+and its timers run on a virtual clock, so the script sleeps between frames to give the actors the time.
+Run from the repository root: python benchmarks/analysis_pipeline.py [tokens]"""
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+# pylint: disable=wrong-import-position
+from editor_suite import generate, make_chapter  # noqa: E402  # pylint: disable=wrong-import-order
+
+from ezwrite.analysis.analyzers import TextStats  # noqa: E402
+from ezwrite.analysis.pipeline import AnalysisPipeline, AnalysisResult  # noqa: E402
+from ezwrite.ui.chapter import Chapter  # noqa: E402
+from ezwrite.ui.headless import HeadlessChapterView  # noqa: E402
+from ezwrite.ui.tok import Tok  # noqa: E402
+
+TOKENS = 100_000
+FRAME_MS = 16
+BURST = "the quick brown fox jumps over the lazy dog " * 5
+
+
+def frame(view: HeadlessChapterView) -> None:
+    view.run_for(FRAME_MS)
+    time.sleep(FRAME_MS / 1000.0)
+
+
+def settle(pipeline: AnalysisPipeline, view: HeadlessChapterView) -> float:
+    """Run frames until the pipeline has nothing left to do, and return how long that took"""
+    start: float = time.perf_counter()
+    while pipeline.busy:
+        frame(view)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    token_count: int = int(sys.argv[1]) if len(sys.argv) > 1 else TOKENS
+    chapter: Chapter
+    chapter, _ = make_chapter("headless")
+    view = chapter.view
+    if not isinstance(view, HeadlessChapterView):
+        raise ValueError("the chapter must be headless")
+    chapter.append_paragraphs(generate(token_count))
+    chapter.layout()
+    total: List[TextStats] = [TextStats()]
+
+    def on_results(results: List[AnalysisResult]) -> None:
+        for result in results:
+            if isinstance(result.result, TextStats):
+                total[0] += result.result
+
+    pipeline = AnalysisPipeline(chapter, on_results)
+    pipeline.start()
+    seconds: float = settle(pipeline, view)
+    print(f"{len(chapter.child_entities)} paragraphs analysed in {seconds:.2f} s, "
+          f"{pipeline.stats.tk_seconds * 1000:.1f} ms of it on the Tk thread: {total[0]}")
+
+    before = pipeline.stats.sent
+    paragraph = chapter.child_entities[len(chapter.child_entities) // 2]
+    sentence = paragraph.first_child()
+    tok = sentence.first_child() if sentence is not None else None
+    if not isinstance(tok, Tok):
+        raise ValueError("the paragraph must have a token")
+    tok.place_cursor_at_word_index(0)
+    tk_seconds: float = pipeline.stats.tk_seconds
+    for char in BURST:
+        chapter.type_text(char)
+        frame(view)
+    settle(pipeline, view)
+    print(f"typing {len(BURST)} characters: {pipeline.stats.sent - before} jobs sent, "
+          f"{(pipeline.stats.tk_seconds - tk_seconds) * 1000:.2f} ms on the Tk thread")
+    print(pipeline.stats)
+    pipeline.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""Time layout, hit testing, navigation and editing on generated chapters of 1k to 500k tokens,
+and write the results as JSON, so that a run can be compared with one from another commit.
+By default the chapter is headless, with fixed advance metrics, so it needs no display.
+Use --backend tk to time the Tk widgets too, e.g. under Xvfb:
+    xvfb-run python benchmarks/editor_suite.py --backend tk
+Run from the repository root: python benchmarks/editor_suite.py --output after.json --baseline before.json"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+# pylint: disable=wrong-import-position
+import tkinter as tk  # noqa: E402
+
+from rdflib import Graph  # noqa: E402
+
+from ezwrite.ui.chapter import Chapter  # noqa: E402
+from ezwrite.ui.headless import HeadlessBackend, HeadlessChapterView  # noqa: E402
+from ezwrite.ui.paragraph import Paragraph  # noqa: E402
+from ezwrite.ui.selection import DocumentPosition, Selection  # noqa: E402
+from ezwrite.ui.sentence import Sentence  # noqa: E402
+from ezwrite.ui.tok import Tok  # noqa: E402
+from ezwrite.utils.memory import peak_rss_bytes  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000, 500_000]
+WIDTH = 800
+HEIGHT = 600
+WORDS = ("the quick brown fox jumps over a lazy dog while its owner reads quietly nearby "
+         "and nobody notices how extraordinarily long some paragraphs become").split()
+BATCH_PARAGRAPHS = 200
+
+Sample = Callable[[], object]
+
+
+def generate(token_count: int, seed: int = 42) -> List[List[List[str]]]:
+    """Paragraphs of sentences of token words, of varied lengths: mostly short paragraphs, some
+    long ones. Every paragraph ends with a full stop token, so that deleting it merges paragraphs."""
+    rnd = random.Random(seed)
+    paragraphs: List[List[List[str]]] = []
+    count = 0
+    while count < token_count:
+        paragraph_words = int(min(rnd.lognormvariate(3.5, 1.0), 2000)) + 2
+        sentences: List[List[str]] = []
+        while paragraph_words > 0:
+            length = min(rnd.randint(4, 25), paragraph_words)
+            sentence: List[str] = []
+            for index in range(length):
+                sentence.append(rnd.choice(WORDS))
+                sentence.append(" " if index < length - 1 else ".")
+            sentences.append(sentence)
+            paragraph_words -= length
+            if paragraph_words > 0:
+                sentence.append(" ")
+        paragraphs.append(sentences)
+        count += sum(len(sentence) for sentence in sentences)
+    return paragraphs
+
+
+def make_chapter(backend: str) -> Tuple[Chapter, Callable[[], None]]:
+    """A chapter with an empty graph, and a function that runs its pending timers"""
+    if backend == "headless":
+        chapter = Chapter(None, Graph(), HeadlessBackend())
+        view = chapter.view
+        if not isinstance(view, HeadlessChapterView):
+            raise ValueError("the headless backend must have a headless chapter view")
+        view.resize(WIDTH, HEIGHT)
+
+        def run_timers() -> None:
+            view.run_for(1000)
+        return (chapter, run_timers)
+    root = tk.Tk()
+    root.geometry(f"{WIDTH}x{HEIGHT}")
+    frame = tk.Frame(root)
+    frame.pack(fill="both", expand=True)
+    chapter = Chapter(frame, Graph())
+    root.update()
+    return (chapter, root.update)
+
+
+def tokens_of(chapter: Chapter) -> List[Tok]:
+    return [tok for paragraph in chapter.child_entities for sentence in paragraph.child_entities
+            for tok in sentence.child_entities if isinstance(tok, Tok)]
+
+
+def resize(chapter: Chapter, width: int) -> None:
+    """Lay out the whole chapter again at another width"""
+    view = chapter.view
+    if isinstance(view, HeadlessChapterView):
+        view.resize(width, HEIGHT)
+    else:
+        chapter.canvas.winfo_toplevel().geometry(f"{width}x{HEIGHT}")
+        chapter.canvas.update()
+    chapter.layout()
+
+
+def bench_layout(chapter: Chapter, _rnd: random.Random, _settle: Callable[[], None]) -> List[Sample]:
+    return [partial(resize, chapter, width) for width in [WIDTH - 100, WIDTH] * 3]
+
+
+def bench_closest_token(chapter: Chapter, rnd: random.Random, _settle: Callable[[], None]) -> List[Sample]:
+    last = chapter.child_entities[-1]
+    height = last.doc_y + last.height
+    return [lambda: chapter.get_closest_token(rnd.randrange(WIDTH), rnd.randrange(height))
+            for _ in range(500)]
+
+
+def bench_move_lines(chapter: Chapter, rnd: random.Random, _settle: Callable[[], None]) -> List[Sample]:
+    tokens = tokens_of(chapter)
+    start = tokens[rnd.randrange(len(tokens))]
+    start.place_cursor_at_word_index(0)
+    caret: List[Tok] = [start]
+
+    def move(down: bool) -> None:
+        moved = caret[0].move_down() if down else caret[0].move_up()
+        if moved is not None:
+            caret[0] = moved
+    return [partial(move, (i // 50) % 2 == 0) for i in range(400)]
+
+
+def bench_next_peer_walk(chapter: Chapter, _rnd: random.Random, _settle: Callable[[], None]) -> List[Sample]:
+    first = tokens_of(chapter)[0]
+
+    def walk() -> None:
+        tok = first.next_peer()
+        while tok is not None:
+            tok = tok.next_peer()
+    return [walk for _ in range(3)]
+
+
+def bench_selection(chapter: Chapter, _rnd: random.Random, _settle: Callable[[], None]) -> List[Sample]:
+    tokens = tokens_of(chapter)
+    selection = Selection()
+    selection.set(DocumentPosition(tokens[0], 0), DocumentPosition(tokens[-1], len(tokens[-1].word)))
+
+    def traverse() -> None:
+        for _ in selection.tokens():
+            pass
+    return [traverse for _ in range(3)]
+
+
+def bench_delete_left(chapter: Chapter, rnd: random.Random, settle: Callable[[], None]) -> List[Sample]:
+    """Delete a character in the middle of a word, and lay out what changed"""
+    def delete() -> None:
+        tokens = [tok for tok in tokens_of_random_paragraph(chapter, rnd) if len(tok.word) > 2]
+        if len(tokens) == 0:
+            return
+        tok = rnd.choice(tokens)
+        tok.place_cursor_at_word_index(2)
+        tok.editor.delete_character_left(tok)
+        chapter.layout()
+        settle()
+    return [delete for _ in range(200)]
+
+
+def tokens_of_random_paragraph(chapter: Chapter, rnd: random.Random) -> List[Tok]:
+    paragraph = rnd.choice(chapter.child_entities)
+    return [tok for sentence in paragraph.child_entities for tok in sentence.child_entities if isinstance(tok, Tok)]
+
+
+def bench_paragraph_merge(chapter: Chapter, rnd: random.Random, settle: Callable[[], None]) -> List[Sample]:
+    """BackSpace at the start of a paragraph: the full stop that ends the paragraph before it
+    is deleted, and the paragraph is merged into that one"""
+    def merge() -> None:
+        paragraphs = chapter.child_entities
+        paragraph = paragraphs[rnd.randrange(1, len(paragraphs))]
+        sentence = paragraph.first_child()
+        tok = sentence.first_child() if isinstance(sentence, Sentence) else None
+        if not isinstance(tok, Tok) or not isinstance(paragraph, Paragraph):
+            return
+        tok.place_cursor_at_word_index(0)
+        tok.editor.delete_character_left(tok)
+        chapter.layout()
+        settle()
+    return [merge for _ in range(min(50, len(chapter.child_entities) - 1))]
+
+
+BENCHMARKS: Dict[str, Callable[[Chapter, random.Random, Callable[[], None]], List[Sample]]] = {
+    "layout": bench_layout,
+    "get_closest_token": bench_closest_token,
+    "move_up_down": bench_move_lines,
+    "next_peer_walk": bench_next_peer_walk,
+    "selection_traversal": bench_selection,
+    "delete_character_left": bench_delete_left,
+    "paragraph_merge": bench_paragraph_merge,
+}
+
+
+def summary(seconds: List[float]) -> Dict[str, float | int]:
+    ms = sorted(s * 1000.0 for s in seconds)
+    return {
+        "runs": len(ms),
+        "min_ms": round(ms[0], 4),
+        "median_ms": round(statistics.median(ms), 4),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 4),
+        "max_ms": round(ms[-1], 4),
+    }
+
+
+def run_size(token_count: int, backend: str, names: List[str]) -> Dict[str, Any]:
+    chapter, settle = make_chapter(backend)
+    paragraphs = generate(token_count)
+    start = time.perf_counter()
+    for index in range(0, len(paragraphs), BATCH_PARAGRAPHS):
+        chapter.append_paragraphs(paragraphs[index:index + BATCH_PARAGRAPHS])
+    chapter.layout()
+    settle()
+    results: Dict[str, Any] = {
+        "tokens": len(tokens_of(chapter)),
+        "paragraphs": len(chapter.child_entities),
+        "build": summary([time.perf_counter() - start]),
+    }
+    rnd = random.Random(token_count)
+    for name in names:
+        timings: List[float] = []
+        for sample in BENCHMARKS[name](chapter, rnd, settle):
+            sample_start = time.perf_counter()
+            sample()
+            timings.append(time.perf_counter() - sample_start)
+        results[name] = summary(timings)
+        print(f"{token_count:>8} tokens  {name:<22} median {results[name]['median_ms']:10.3f} ms", flush=True)
+    return results
+
+
+def commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=Path(__file__).resolve().parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline_path: str) -> None:
+    """Print the ratio of each median to the baseline's, e.g. 1.25 is 25% slower"""
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline: Dict[str, Any] = json.load(file)
+    print(f"\ncompared with {baseline.get('commit')} (ratio of medians, above 1 is slower)")
+    for size, benchmarks in results["sizes"].items():
+        before = baseline["sizes"].get(size)
+        if before is None:
+            continue
+        for name, timing in benchmarks.items():
+            if not isinstance(timing, dict) or name not in before or before[name]["median_ms"] == 0:
+                continue
+            print(f"{size:>8} tokens  {name:<22} {timing['median_ms'] / before[name]['median_ms']:6.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda text: [int(size) for size in text.split(",")], default=SIZES,
+                        help="comma separated token counts")
+    parser.add_argument("--backend", choices=["headless", "tk"], default="headless")
+    parser.add_argument("--only", action="append", choices=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    args = parser.parse_args()
+    names: List[str] = args.only or list(BENCHMARKS)
+    results: Dict[str, Any] = {
+        "commit": commit(),
+        "backend": args.backend,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "viewport": [WIDTH, HEIGHT],
+        "sizes": {str(size): run_size(size, args.backend, names) for size in args.sizes},
+    }
+    peak = peak_rss_bytes()
+    results["peak_rss_mb"] = None if peak is None else round(peak / (1 << 20))
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"results written to {args.output}")
+    if args.baseline is not None:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Measure the worker side of an import of a generated 20 MB text file: how long until the first
+batch of paragraphs is ready for the Tk thread, the total time, and the peak memory.
+Building the batches into Tk widgets is not included, so run the app on a file to see
+the time to first paint: cd src; python -m main manuscript.txt
+Run from the repository root: python benchmarks/import_text.py"""
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+# pylint: disable=wrong-import-position
+from ezwrite.files.importer import Importer  # noqa: E402
+from ezwrite.utils.memory import peak_rss_bytes  # noqa: E402
+
+FILE_SIZE = 20 << 20
+WORDS = "the quick brown fox jumps over a lazy dog while its owner reads quietly nearby".split()
+
+
+def write_text(path: str, size: int) -> None:
+    rnd = random.Random(42)
+    written = 0
+    with open(path, "w", encoding="utf-8") as file:
+        while written < size:
+            words: List[str] = []
+            for _ in range(rnd.randint(20, 150)):
+                words.append(rnd.choice(WORDS) + ("." if rnd.random() < 0.08 else ""))
+            paragraph = " ".join(words) + "\n"
+            file.write(paragraph)
+            written += len(paragraph)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "manuscript.txt")
+        write_text(path, FILE_SIZE)
+        importer = Importer(path)
+        start = time.perf_counter()
+        first_batch = -1.0
+        paragraphs = 0
+        tokens = 0
+        for paragraph, _ in importer.paragraph_texts():
+            paragraphs += 1
+            tokens += paragraph.token_count
+            if first_batch < 0 and paragraphs == Importer.BATCH_PARAGRAPHS:
+                first_batch = time.perf_counter() - start
+        total = time.perf_counter() - start
+    peak = peak_rss_bytes()
+    print(f"{FILE_SIZE >> 20} MB, {paragraphs} paragraphs, {tokens} tokens")
+    print(f"first batch: {first_batch * 1000:8.1f} ms")
+    print(f"total:       {total:8.2f} s  ({FILE_SIZE / total / (1 << 20):.1f} MB/s)")
+    print("peak memory: " + ("n/a" if peak is None else f"{peak / (1 << 20):8.0f} MB"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare the cumulative width line breaker with the per-token layout loop that it replaced.
+Run from the repository root: python benchmarks/line_breaking.py"""
+import random
+import sys
+import timeit
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+# pylint: disable=wrong-import-position
+from ezwrite.layout.line_breaker import break_lines  # noqa: E402
+from ezwrite.ui.position import Position  # noqa: E402
+
+TOKEN_COUNT = 10_000
+FRAME_WIDTH = 400
+LINE_HEIGHT = 15
+REPEAT = 20
+
+
+class PerTokenLayout:
+    """The arithmetic of the old Tok.layout, one call per token, threading a mutable Position"""
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.x = 0
+        self.y = 0
+
+    def layout(self, pos: Position, frame_width: int) -> int:
+        if pos.x + self.width > frame_width:
+            pos.x = 0
+            pos.y += self.height
+        self.x = pos.x
+        self.y = pos.y
+        pos.x += self.width
+        return pos.y + self.height
+
+
+def per_token_loop(tokens: List[PerTokenLayout], frame_width: int, first_line_indent: int) -> int:
+    pos = Position(first_line_indent, 0)
+    height = 0
+    for token in tokens:
+        height = token.layout(pos, frame_width)
+    return height
+
+
+def main() -> None:
+    rnd = random.Random(42)
+    widths: List[int] = []
+    for i in range(TOKEN_COUNT):
+        widths.append(3 if i % 2 else rnd.randint(6, 70))
+    tokens = [PerTokenLayout(w, LINE_HEIGHT) for w in widths]
+    width_array = np.array(widths, dtype=np.int64)
+    height_array = np.full(TOKEN_COUNT, LINE_HEIGHT, dtype=np.int64)
+
+    loop_time = min(timeit.repeat(lambda: per_token_loop(tokens, FRAME_WIDTH, 30), number=1, repeat=REPEAT))
+    breaker_time = min(timeit.repeat(lambda: break_lines(width_array, height_array, FRAME_WIDTH, 30),
+                                     number=1,
+                                     repeat=REPEAT))
+
+    breaks = break_lines(width_array, height_array, FRAME_WIDTH, 30)
+    print(f"{TOKEN_COUNT} tokens, {breaks.line_count} lines, frame width {FRAME_WIDTH}")
+    print(f"per-token loop: {loop_time * 1000:8.3f} ms")
+    print(f"break_lines:    {breaker_time * 1000:8.3f} ms  ({loop_time / breaker_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Report where the memory of a generated chapter goes, by entity class, object type and allocating line,
+and what building it cost, from memory reports taken before and after. The chapter is headless, so the
+Tk widgets are not included; they live in Tcl, where tracemalloc does not see them anyway.
+Run from the repository root: python benchmarks/memory_report.py [tokens]"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+# pylint: disable=wrong-import-position
+from ezwrite.utils.memory import memory_report, start_tracing  # noqa: E402
+
+start_tracing()
+
+from editor_suite import generate, make_chapter  # noqa: E402  # pylint: disable=wrong-import-order
+
+TOKENS = 100_000
+
+
+def main() -> None:
+    token_count: int = int(sys.argv[1]) if len(sys.argv) > 1 else TOKENS
+    chapter, settle = make_chapter("headless")
+    before = memory_report([chapter])
+    chapter.append_paragraphs(generate(token_count))
+    chapter.layout()
+    settle()
+    after = memory_report([chapter])
+    print(after)
+    print(f"\nbuilding {token_count} tokens:")
+    print(after.diff(before))
+
+
+if __name__ == "__main__":
+    main()
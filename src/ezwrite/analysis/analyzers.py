@@ -0,0 +1,112 @@
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Dict, Generic, List, TypeVar, override
+
+from ezwrite.editors.tokenizer import WORD_PATTERN, ParagraphText
+
+IsStale = Callable[[], bool]
+R = TypeVar("R")
+
+
+class Analyzer(ABC):
+    """Analyses the text of a paragraph on an actor thread. It is given a copy of the text, never the
+    entities, which only the Tk thread may touch. Each actor has analyzers of its own, so an analyzer
+    can keep state, e.g. a cache, without a lock."""
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """The key of the results of this analyzer"""
+
+    @abstractmethod
+    def analyze(self, paragraph: ParagraphText, is_stale: IsStale) -> object | None:
+        """The result for the paragraph, or None if is_stale became True on the way"""
+
+
+class SentenceAnalyzer(Analyzer, Generic[R], ABC):
+    """Analyses a paragraph a sentence at a time, and combines the results of its sentences.
+    The results are cached by the text of the sentence, so after an edit only the sentences that
+    changed are analysed again, and the work stops between sentences once it is stale."""
+    MAX_SENTENCES: int = 50_000
+
+    def __init__(self) -> None:
+        self._cache: Dict[str, R] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @override
+    def analyze(self, paragraph: ParagraphText, is_stale: IsStale) -> object | None:
+        results: List[R] = []
+        for words in paragraph.sentences():
+            if is_stale():
+                return None
+            text: str = "".join(words)
+            result: R | None = self._cache.get(text)
+            if result is None:
+                self.misses += 1
+                if len(self._cache) >= SentenceAnalyzer.MAX_SENTENCES:
+                    self._cache.clear()
+                result = self.analyze_sentence(words)
+                self._cache[text] = result
+            else:
+                self.hits += 1
+            results.append(result)
+        return self.combine(results)
+
+    @abstractmethod
+    def analyze_sentence(self, words: List[str]) -> R:
+        """The result for the token words of one sentence"""
+
+    @abstractmethod
+    def combine(self, results: List[R]) -> object:
+        """The result for a paragraph, from the results of its sentences"""
+
+
+@dataclass(frozen=True)
+class TextStats:
+    """Counts of a text, which add up over sentences, paragraphs and the chapter"""
+    words: int = 0
+    sentences: int = 0
+    characters: int = 0
+    long_sentences: int = 0
+
+    def __add__(self, other: "TextStats") -> "TextStats":
+        return TextStats(self.words + other.words,
+                         self.sentences + other.sentences,
+                         self.characters + other.characters,
+                         self.long_sentences + other.long_sentences)
+
+    def __sub__(self, other: "TextStats") -> "TextStats":
+        return TextStats(self.words - other.words,
+                         self.sentences - other.sentences,
+                         self.characters - other.characters,
+                         self.long_sentences - other.long_sentences)
+
+    def __str__(self) -> str:
+        return (f"{self.words} words, {self.sentences} sentences, {self.characters} characters, "
+                f"{self.long_sentences} long sentences")
+
+
+class TextStatsAnalyzer(SentenceAnalyzer[TextStats]):
+    """Counts the words, sentences and characters, and the sentences that are long enough to be hard to read"""
+    LONG_SENTENCE_WORDS: int = 35
+
+    @property
+    @override
+    def name(self) -> str:
+        return "text_stats"
+
+    @override
+    def analyze_sentence(self, words: List[str]) -> TextStats:
+        word_count: int = sum(1 for word in words if WORD_PATTERN.match(word) is not None)
+        return TextStats(word_count,
+                         1 if word_count > 0 else 0,
+                         sum(len(word) for word in words if word != "\n"),
+                         1 if word_count >= TextStatsAnalyzer.LONG_SENTENCE_WORDS else 0)
+
+    @override
+    def combine(self, results: List[TextStats]) -> TextStats:
+        total = TextStats()
+        for result in results:
+            total += result
+        return total
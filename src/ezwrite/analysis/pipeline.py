@@ -0,0 +1,245 @@
+import queue
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Dict, List, Tuple, override
+
+import pykka
+
+from ezwrite.analysis.analyzers import Analyzer, TextStatsAnalyzer
+from ezwrite.editors.tokenizer import ParagraphText
+from ezwrite.files.exporter import paragraph_text
+from ezwrite.ui.chapter import Chapter, ContentChange
+from ezwrite.ui.paragraph import Paragraph
+from ezwrite.utils.tracing import tracer
+
+
+@dataclass(frozen=True)
+class AnalysisJob:
+    """A copy of the text of a paragraph, as of one generation of the paragraph"""
+    key: int  # the id of the paragraph, which the pipeline holds while it tracks the paragraph
+    generation: int
+    text: ParagraphText
+
+
+@dataclass(frozen=True)
+class AnalysisDone:
+    """What an actor made of a job: the result of its analyzer, or None if the job went stale"""
+    key: int
+    generation: int
+    analyzer: str
+    result: object | None
+
+
+@dataclass(frozen=True)
+class AnalysisResult:
+    """A result for a paragraph, on the Tk thread. It is None when the paragraph was removed."""
+    paragraph: Paragraph
+    analyzer: str
+    result: object | None
+
+
+@dataclass
+class PipelineStats:
+    """What the pipeline did with the changes it was told about"""
+    changes: int = 0
+    coalesced: int = 0  # changes to a paragraph that was still waiting to be sent
+    sent: int = 0  # jobs, one per paragraph, each analysed by every actor
+    completed: int = 0  # results that were current when they reached the Tk thread
+    cancelled: int = 0  # results that an actor gave up on because the paragraph changed again
+    dropped: int = 0  # results that were stale by the time they reached the Tk thread
+    tk_seconds: float = 0.0  # time spent on the Tk thread, copying paragraphs and handling results
+
+
+def default_analyzers() -> List[Analyzer]:
+    return [TextStatsAnalyzer()]
+
+
+class AnalysisActor(pykka.ThreadingActor):
+    """Runs one analyzer on the jobs in its inbox, one at a time, on a thread of its own, and puts what
+    it made of each into the done queue. A job is stale once its paragraph changed again, which the
+    generations that the pipeline keeps tell, so the actor skips it, or stops between sentences."""
+    use_daemon_thread = True  # do not keep the application from exiting
+
+    def __init__(self, analyzer: Analyzer, generations: Dict[int, int], done: queue.SimpleQueue[AnalysisDone]):
+        super().__init__()
+        self._analyzer = analyzer
+        self._generations = generations
+        self._done = done
+
+    @override
+    def on_receive(self, message: Any) -> Any:
+        if not isinstance(message, AnalysisJob):
+            return None
+        job: AnalysisJob = message
+        result: object | None = None
+        try:
+            if not self._is_stale(job):
+                result = self._analyzer.analyze(job.text, partial(self._is_stale, job))
+        finally:
+            # the pipeline counts the jobs in flight, so it hears of each one, even if the analyzer failed
+            self._done.put(AnalysisDone(job.key, job.generation, self._analyzer.name, result))
+        return None
+
+    def _is_stale(self, job: AnalysisJob) -> bool:
+        # the Tk thread replaces the generation of a key in one step, so reading it needs no lock
+        return self._generations.get(job.key) != job.generation
+
+
+class AnalysisPipeline():
+    """Analyses the text of a chapter in the background, with an actor per analyzer. The chapter publishes
+    a change for each paragraph that an edit changes. The pipeline notes it, and bumps the generation of the
+    paragraph, so any job in flight for an older generation is stale from then on. A paragraph is sent once it
+    has been quiet for a moment and laid out: a burst of typing is one job, not one per key. It is copied then,
+    on the Tk thread, so the actors never touch the entities. The jobs in flight are capped, and the rest wait,
+    one per paragraph however often it changes. The results come back through a queue that the Tk thread
+    polls with after, and are handed to on_results in batches; stale ones are dropped on the way."""
+    QUIET_MS: int = 300
+    MAX_IN_FLIGHT: int = 64  # jobs per actor
+    POLL_INTERVAL_MS: int = 50
+    SEND_BUDGET_MS: float = 4.0
+
+    def __init__(self,
+                 chapter: Chapter,
+                 on_results: Callable[[List[AnalysisResult]], None],
+                 analyzers: Callable[[], List[Analyzer]] = default_analyzers):
+        self._chapter = chapter
+        self._on_results = on_results
+        self._analyzers = analyzers
+        self._actors: List[pykka.ActorRef[AnalysisActor]] = []
+        # the generations of all the paragraphs are counted together, so that a job for a removed
+        # paragraph is still stale if a new paragraph gets its id
+        self._generation: int = 0
+        self._generations: Dict[int, int] = {}
+        self._paragraphs: Dict[int, Paragraph] = {}  # the paragraphs that are tracked, by key
+        self._waiting: Dict[int, float] = {}  # the time each waiting paragraph last changed, oldest first
+        self._results: Dict[int, Dict[str, object]] = {}
+        self._removed: List[AnalysisResult] = []
+        self._done: queue.SimpleQueue[AnalysisDone] = queue.SimpleQueue()
+        self._in_flight: int = 0
+        self._job_id: str | None = None
+        self.stats = PipelineStats()
+
+    @property
+    def running(self) -> bool:
+        return len(self._actors) > 0
+
+    @property
+    def busy(self) -> bool:
+        """True while paragraphs are waiting to be sent, or jobs are in flight"""
+        return len(self._waiting) > 0 or self._in_flight > 0 or len(self._removed) > 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def start(self) -> None:
+        """Start the actors, and analyse the paragraphs that are already in the chapter"""
+        if self.running:
+            return
+        self._actors = [AnalysisActor.start(analyzer, self._generations, self._done) for analyzer in self._analyzers()]
+        self._chapter.subscribe(self._on_change)
+        for paragraph in self._chapter.child_entities:
+            if isinstance(paragraph, Paragraph):
+                self._on_change(ContentChange(paragraph))
+
+    def stop(self) -> None:
+        """Stop the actors. The jobs in their inboxes are dropped."""
+        if not self.running:
+            return
+        self._chapter.unsubscribe(self._on_change)
+        if self._job_id is not None:
+            self._chapter.view.after_cancel(self._job_id)
+            self._job_id = None
+        self._generations.clear()  # so that the jobs in flight are stale
+        for actor in self._actors:
+            actor.stop(block=False)
+        self._actors = []
+        self._paragraphs.clear()
+        self._waiting.clear()
+        self._results.clear()
+        self._removed = []
+        self._done = queue.SimpleQueue()  # the old actors may still put into the old one
+        self._in_flight = 0
+
+    def results_of(self, paragraph: Paragraph) -> Dict[str, object]:
+        """The latest results for a paragraph, by analyzer name. They may be older than its text."""
+        return self._results.get(id(paragraph), {})
+
+    def _on_change(self, change: ContentChange) -> None:
+        key: int = id(change.paragraph)
+        self.stats.changes += 1
+        if change.removed:
+            self._generations.pop(key, None)
+            self._paragraphs.pop(key, None)
+            self._waiting.pop(key, None)
+            results: Dict[str, object] = self._results.pop(key, {})
+            self._removed.extend(AnalysisResult(change.paragraph, name, None) for name in results)
+        else:
+            self._generation += 1
+            self._generations[key] = self._generation
+            self._paragraphs[key] = change.paragraph
+            if self._waiting.pop(key, None) is not None:
+                self.stats.coalesced += 1
+            self._waiting[key] = time.perf_counter()  # at the end, so the waiting paragraphs stay oldest first
+        if self._job_id is None:
+            self._job_id = self._chapter.view.after(AnalysisPipeline.POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self) -> None:
+        self._job_id = None
+        started: float = time.perf_counter()
+        results: List[AnalysisResult] = self._removed
+        self._removed = []
+        self._receive(results)
+        self._send(started)
+        self.stats.tk_seconds += time.perf_counter() - started
+        if len(results) > 0:
+            with tracer.span("analysis_results", "analysis", {"results": len(results)} if tracer.enabled else None):
+                self._on_results(results)
+        if self.busy:
+            self._job_id = self._chapter.view.after(AnalysisPipeline.POLL_INTERVAL_MS, self._poll)
+
+    def _receive(self, results: List[AnalysisResult]) -> None:
+        """Take what the actors have done off the queue, and keep the results that are still current"""
+        while True:
+            try:
+                done: AnalysisDone = self._done.get_nowait()
+            except queue.Empty:
+                return
+            self._in_flight -= 1
+            paragraph: Paragraph | None = self._paragraphs.get(done.key)
+            if done.result is None:
+                self.stats.cancelled += 1
+            elif paragraph is None or self._generations.get(done.key) != done.generation:
+                self.stats.dropped += 1
+            else:
+                self.stats.completed += 1
+                self._results.setdefault(done.key, {})[done.analyzer] = done.result
+                results.append(AnalysisResult(paragraph, done.analyzer, done.result))
+
+    def _send(self, started: float) -> None:
+        """Send the paragraphs that have been quiet long enough, oldest first, while there is room in flight.
+        A paragraph that is not laid out yet still waits: a change to it is only published once per layout,
+        so a copy of it now could miss an edit that follows."""
+        capacity: int = AnalysisPipeline.MAX_IN_FLIGHT * len(self._actors)
+        quiet_since: float = started - AnalysisPipeline.QUIET_MS / 1000.0
+        deadline: float = started + AnalysisPipeline.SEND_BUDGET_MS / 1000.0
+        ready: List[Tuple[int, Paragraph]] = []
+        for key, changed_at in self._waiting.items():
+            if self._in_flight + len(self._actors) * (len(ready) + 1) > capacity or time.perf_counter() >= deadline:
+                break
+            paragraph: Paragraph = self._paragraphs[key]
+            if changed_at <= quiet_since and not paragraph.dirty:
+                ready.append((key, paragraph))
+        for key, paragraph in ready:
+            del self._waiting[key]
+            job = AnalysisJob(key, self._generations[key], paragraph_text(paragraph))
+            for actor in self._actors:
+                actor.tell(job)
+            self._in_flight += len(self._actors)
+            self.stats.sent += 1
@@ -1,19 +1,44 @@
+import os
 import tkinter as tk
-from tkinter import Frame, Scrollbar, Tk
+from tkinter import Frame, Label, Scrollbar, Tk, filedialog
+from typing import Dict, List
 
 from rdflib.graph import Graph
 
+from ezwrite.analysis.analyzers import TextStats
+from ezwrite.analysis.pipeline import AnalysisPipeline, AnalysisResult
+from ezwrite.editors.tokenizer import ParagraphText
+from ezwrite.files.exporter import ExportTask
+from ezwrite.files.importer import Importer, ImportReport
 from ezwrite.ui.chapter import Chapter
+from ezwrite.ui.hud import PerformanceHud
+from ezwrite.ui.key_handler import Key, chord
 from ezwrite.ui.paragraph import Paragraph
 from ezwrite.ui.sentence import Sentence
 from ezwrite.ui.tok import Tok
+from ezwrite.utils.memory import MemoryReport, memory_report, start_tracing
+from ezwrite.utils.tracing import tracer
 
 
 class App:
     """This is the ezwrite main application."""
-    def __init__(self):
+
+    def __init__(self, path: str | None = None):
+        # EZWRITE_TRACE=trace.json records tracing spans, and writes them there on exit
+        self._trace_path: str | None = os.environ.get("EZWRITE_TRACE")
+        if self._trace_path:
+            tracer.enable()
+        # EZWRITE_TRACEMALLOC=1 traces allocations from the start, so that the memory report can say where they are
+        if os.environ.get("EZWRITE_TRACEMALLOC"):
+            start_tracing()
+        self._memory_report: MemoryReport | None = None
         self.root: Tk = tk.Tk()
         self.root.geometry("400x300")
+        self._status: Label = tk.Label(self.root, anchor="w")
+        self._status.pack(side="bottom", fill="x")
+        self._text_stats_label: Label = tk.Label(self.root, anchor="e")
+        self._text_stats_label.pack(side="bottom", fill="x")
+        self._importer: Importer | None = None
         self._frame: Frame = tk.Frame(self.root)
         self._frame.pack(fill="both", expand=True)
         graph: Graph = Graph()
@@ -21,7 +46,104 @@ class App:
         scrollbar: Scrollbar = tk.Scrollbar(self._frame, orient="vertical", command=self.chapter.canvas.yview)
         scrollbar.pack(side="right", fill="y")
         self._chapter.canvas.configure(yscrollcommand=scrollbar.set)
-        self._chapter.canvas.config(scrollregion=(0, 0, 400, 2000))  # width=400, height=2000
+        self._chapter.key_handler.bind(chord("s", ["Control"]), self._handle_save)
+        self._hud = PerformanceHud(self._chapter)
+        self._chapter.key_handler.bind(chord("F12"), self._handle_toggle_hud)
+        self._chapter.key_handler.bind(chord("F11"), self._handle_memory_report)
+        # the counts of the chapter, kept up to date in the background
+        self._paragraph_stats: Dict[int, TextStats] = {}
+        self._text_stats = TextStats()
+        self._analysis = AnalysisPipeline(self._chapter, self._analysis_results)
+        if path is None:
+            self._add_sample_text(graph)
+        else:
+            self.open(path)
+        self._analysis.start()
+
+        #frame.bind("<Configure>", self.frame_resized)
+
+    def open(self, path: str) -> None:
+        """Import a plain text or Markdown file into the chapter. It is read in the background,
+        and built into the chapter in batches, with its progress in the status bar."""
+        if self._importer is not None:
+            self._importer.cancel()
+        self._importer = Importer(path)
+        self._status.configure(text=f"Importing {path}")
+        self._importer.start(self.root, self._import_batch, self._import_progress, self._import_done)
+
+    def _import_batch(self, batch: List[ParagraphText]) -> None:
+        first: bool = self._chapter.first_child() is None
+        self._chapter.append_paragraphs((paragraph.sentences() for paragraph in batch), 30)
+        if not first:
+            return
+        # lay out and paint the first batch now, so that the time to first paint includes it
+        self._chapter.layout()
+        self.root.update_idletasks()
+        paragraph = self._chapter.first_child()
+        sentence = paragraph.first_child() if paragraph is not None else None
+        tok = sentence.first_child() if sentence is not None else None
+        if isinstance(tok, Tok):
+            tok.place_cursor_at_word_index(0)
+
+    def _import_progress(self, fraction: float) -> None:
+        self._status.configure(text=f"Importing: {fraction:.0%}")
+
+    def _import_done(self, report: ImportReport) -> None:
+        self._importer = None
+        self._status.configure(text=str(report))
+
+    def _analysis_results(self, results: List[AnalysisResult]) -> None:
+        for result in results:
+            key: int = id(result.paragraph)
+            self._text_stats -= self._paragraph_stats.pop(key, TextStats())
+            if isinstance(result.result, TextStats):
+                self._paragraph_stats[key] = result.result
+                self._text_stats += result.result
+        self._text_stats_label.configure(text=str(self._text_stats))
+
+    def _handle_save(self, _event: tk.Event, _keys: List[Key]) -> bool:
+        path: str = filedialog.asksaveasfilename(
+            parent=self.root,
+            filetypes=[("Text", "*.txt"), ("Markdown", "*.md"), ("NIF Turtle", "*.ttl")]
+        )
+        if path:
+            self.export(path)
+        return True
+
+    def _handle_toggle_hud(self, _event: tk.Event, _keys: List[Key]) -> bool:
+        self._hud.toggle()
+        return True
+
+    def _handle_memory_report(self, _event: tk.Event, _keys: List[Key]) -> bool:
+        self.print_memory_report()
+        return True
+
+    def print_memory_report(self) -> MemoryReport:
+        """Print where the memory of the chapter goes, and what changed since the last report"""
+        report: MemoryReport = memory_report([self._chapter])
+        print(report)
+        if self._memory_report is not None:
+            print("since the last report:")
+            print(report.diff(self._memory_report))
+        self._memory_report = report
+        self._status.configure(text=f"Memory: {report.paragraph_bytes.mean / 1024:.1f} KB per paragraph, "
+                                    f"{report.paragraph_bytes.largest / 1024:.1f} KB at most, report printed")
+        return report
+
+    def export(self, path: str) -> None:
+        """Export the chapter, in the format of the suffix of path, see exporter_for. The document is
+        copied in slices between frames, and written on a worker thread, see ExportTask."""
+        self._chapter.flush_edits()
+        self._status.configure(text=f"Exporting {path}")
+        ExportTask(path, self._chapter).start(self.root, self._export_done)
+
+    def _export_done(self, task: ExportTask) -> None:
+        if task.error is not None:
+            self._status.configure(text=f"Could not export {task.path}: {task.error}")
+        else:
+            self._status.configure(text=f"Exported {task.path}")
+
+    def _add_sample_text(self, graph: Graph) -> None:
         # NIF: Namespace = Namespace("http://persistence.uni-leipzig.org/nlp2rdf/ontologies/nif-core")
         paragraph: Paragraph = Paragraph(self._chapter, graph,30)
         sentence: Sentence = Sentence(paragraph)
@@ -130,11 +252,12 @@ class App:
 
         tok.place_cursor_at_word_index(0)
 
-        #frame.bind("<Configure>", self.frame_resized)
-
     def start(self):
         """Start the UI. This is the entrypoint for the application."""
         self.root.mainloop()
+        self._analysis.stop()
+        if self._trace_path:
+            tracer.export(self._trace_path)
 
     @property
     def frame(self):
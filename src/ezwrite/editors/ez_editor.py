@@ -23,3 +23,6 @@ class EzEditor(ABC):
 
     def delete_selected(self, ent: Entity) -> bool: # pylint: disable=unused-argument
         return False
+
+    def insert_text(self, ent: Entity, text: str) -> bool: # pylint: disable=unused-argument
+        return False
@@ -0,0 +1,88 @@
+from argparse import ArgumentTypeError
+from dataclasses import dataclass
+from typing import List
+
+from ezwrite.editors.tokenizer import joins, split_tokens
+from ezwrite.ui.sentence import Sentence
+from ezwrite.ui.tok import Tok
+
+
+@dataclass
+class Retokenized:
+    """The tokens of the window that was tokenized again, and where the cursor is in them"""
+    tokens: List[Tok]
+    cursor_token: Tok | None  # None when no text is left in the window
+    cursor_index: int
+
+
+def _window(tokens: List[Tok], index: int) -> range:
+    """The tokens around tokens[index] up to the nearest stable boundaries"""
+    start: int = index
+    while start > 0 and joins(tokens[start - 1].word, tokens[start].word):
+        start -= 1
+    end: int = index + 1
+    while end < len(tokens) and joins(tokens[end - 1].word, tokens[end].word):
+        end += 1
+    return range(start, end)
+
+
+def retokenize(tok: Tok, cursor_index: int) -> Retokenized:
+    """Tokenize the text around tok again, after its word was edited, and return where the cursor,
+    at cursor_index in the word of tok, is now. Only the window up to the nearest stable boundaries
+    in the sentence is scanned, and the old tokens are replaced with a minimal diff: the tokens at
+    the start and end of the window whose words are unchanged are kept as they are, changed ones are
+    reused with their new word, and tokens are only created or zapped for the difference in count.
+    Kept and reused tokens keep their widgets, measurements and annotations."""
+    parent = tok.parent
+    if not isinstance(parent, Sentence): raise ArgumentTypeError("the parent of a Tok must be a Sentence")
+    sentence: Sentence = parent
+    children: List[Tok] = [child for child in sentence.child_entities if isinstance(child, Tok)]
+    window: range = _window(children, children.index(tok))
+    old: List[Tok] = children[window.start:window.stop]
+    offset: int = cursor_index
+    for old_tok in old:
+        if old_tok is tok:
+            break
+        offset += len(old_tok.word)
+    pieces: List[str] = split_tokens("".join(old_tok.word for old_tok in old))
+    tokens: List[Tok] = _apply_diff(sentence, old, pieces)
+    return _locate(tokens, offset)
+
+
+def _apply_diff(sentence: Sentence, old: List[Tok], pieces: List[str]) -> List[Tok]:
+    prefix: int = 0
+    while prefix < min(len(old), len(pieces)) and old[prefix].word == pieces[prefix]:
+        prefix += 1
+    suffix: int = 0
+    while suffix < min(len(old), len(pieces)) - prefix and old[-1 - suffix].word == pieces[-1 - suffix]:
+        suffix += 1
+    middle_old: List[Tok] = old[prefix:len(old) - suffix]
+    middle_new: List[str] = pieces[prefix:len(pieces) - suffix]
+    tokens: List[Tok] = old[:prefix]
+    for reused, piece in zip(middle_old, middle_new):
+        reused.change_word(piece)
+        tokens.append(reused)
+    for surplus in middle_old[len(middle_new):]:
+        surplus.zap()
+    for piece in middle_new[len(middle_old):]:
+        template: Tok = old[0]
+        new_tok = Tok(sentence, piece, template.font, False)
+        if len(tokens) > 0:
+            sentence.insert_token_after(tokens[-1], new_tok)
+        else:
+            sentence.insert_token_before(old[len(old) - suffix], new_tok)
+        tokens.append(new_tok)
+    tokens.extend(old[len(old) - suffix:])
+    return tokens
+
+
+def _locate(tokens: List[Tok], offset: int) -> Retokenized:
+    """Find the token and index of a character offset into the words of the tokens.
+    An offset at the end of one word is placed there, rather than at the start of the next."""
+    for tok in tokens:
+        if offset <= len(tok.word):
+            return Retokenized(tokens, tok, offset)
+        offset -= len(tok.word)
+    if len(tokens) == 0:
+        return Retokenized(tokens, None, 0)
+    return Retokenized(tokens, tokens[-1], len(tokens[-1].word))
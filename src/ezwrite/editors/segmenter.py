@@ -0,0 +1,59 @@
+from argparse import ArgumentTypeError
+from typing import List
+
+from ezwrite.editors.tokenizer import ends_sentence
+from ezwrite.graph.entity import Entity
+from ezwrite.ui.sentence import Sentence
+from ezwrite.ui.tok import Tok
+
+
+def _tokens(sentence: Sentence) -> List[Tok]:
+    return [child for child in sentence.child_entities if isinstance(child, Tok)]
+
+
+def _sentence_end(tokens: List[Tok], start: int) -> int:
+    """The index after the first sentence end at or after start, or -1 if there is none.
+    A sentence ends at the whitespace that follows a terminator, e.g. a full stop."""
+    for index in range(max(start, 1), len(tokens)):
+        if tokens[index].word.isspace() and ends_sentence(tokens[index - 1].word):
+            return index + 1
+    return -1
+
+
+def _ends_properly(tokens: List[Tok]) -> bool:
+    return len(tokens) > 0 and _sentence_end(tokens, len(tokens) - 1) == len(tokens)
+
+
+def resegment(tok: Tok) -> None:
+    """Split and merge the sentences around an edited token, so that each ends where its text does.
+    The sentences before and after the edit were already right, so this walks from the sentence
+    before the edit, and stops at the first sentence after it whose end did not change.
+    Token runs are moved between the sentences rather than copied, so the tokens keep
+    their widgets and annotations."""
+    parent = tok.parent
+    if not isinstance(parent, Sentence): raise ArgumentTypeError("the parent of a Tok must be a Sentence")
+    edited: Sentence = parent
+    paragraph: Entity | None = edited.parent
+    if paragraph is None:
+        return
+    previous = paragraph.get_previous_child(edited)
+    sentence: Sentence = previous if isinstance(previous, Sentence) else edited
+    passed_edit: bool = sentence is edited
+    while True:
+        tokens: List[Tok] = _tokens(sentence)
+        end: int = _sentence_end(tokens, 0)
+        following = paragraph.get_next_child(sentence)
+        if 0 < end < len(tokens):
+            sentence.split_after(tokens[end - 1])
+        elif not _ends_properly(tokens) and isinstance(following, Sentence):
+            sentence.append_tokens_from(following)
+            following.zap()
+            passed_edit = passed_edit or following is edited
+            continue
+        elif passed_edit:
+            return
+        following = paragraph.get_next_child(sentence)
+        if not isinstance(following, Sentence):
+            return
+        passed_edit = passed_edit or following is edited or sentence is edited
+        sentence = following
@@ -4,8 +4,10 @@ from pylint.exceptions import InvalidArgsError
 from typing_extensions import override
 
 from ezwrite.editors.ez_editor import EzEditor
+from ezwrite.editors.retokenizer import Retokenized, retokenize
+from ezwrite.editors.segmenter import resegment
 from ezwrite.graph.entity import Entity
-from ezwrite.ui.sentence import Sentence
+from ezwrite.ui.sentence import Sentence, SentenceContainer
 from ezwrite.ui.tok import Tok
 
 
@@ -51,6 +53,12 @@ class TokenEditor(EzEditor):
         selection_end = tok.selection_end
         word_len = len(tok.word)
         if selection_start == 0 and selection_end >= word_len:
+            if tok.previous_peer() is None and tok.next_peer() is None:
+                # the last token of the document keeps the caret, with an empty word
+                tok.change_word("")
+                tok.place_cursor_at_word_index(0)
+                tok.deselect()
+                return True
             tok.zap()
             return True
         if selection_start > 0:
@@ -70,10 +78,35 @@ class TokenEditor(EzEditor):
             return True
         return False
 
+    @override
+    def insert_text(self, ent: Entity, text: str) -> bool:
+        """Insert text at the cursor, and tokenize and segment the edited region again, e.g. if the
+        text ends a sentence, the tokens after it move to a new sentence. Only the tokens around
+        the cursor change, so the paragraph can usually relayout just one line."""
+        if not isinstance(ent, Tok):
+            raise InvalidArgsError("ent needs to be a Tok")
+        tok: Tok = ent
+        index: int = tok.cursor_word_index
+        tok.change_word(tok.word[:index] + text + tok.word[index:])
+        retokenized: Retokenized = self._retokenize_at(tok, index + len(text))
+        if retokenized.cursor_token is not None:
+            resegment(retokenized.cursor_token)
+        return True
+
+    def _retokenize_at(self, tok: Tok, cursor_index: int) -> Retokenized:
+        """Tokenize the text around tok again, and put the cursor back where it was"""
+        retokenized: Retokenized = retokenize(tok, cursor_index)
+        if retokenized.cursor_token is not None:
+            retokenized.cursor_token.place_cursor_at_word_index(retokenized.cursor_index)
+        return retokenized
+
     def _delete_char_left_of_word(self, tok: Tok) -> bool:
         prev_tok = self._get_prev_token(tok)
         if prev_tok is None:
             return False
+        if self._paragraph_of(prev_tok) is not self._paragraph_of(tok):
+            # at the start of a paragraph, backspace deletes the break between it and the one before
+            return self._join_paragraphs(prev_tok, tok)
         prev_tok.place_cursor_at_word_index(-1)
         return self.delete_character_left(prev_tok)
 
@@ -82,55 +115,27 @@ class TokenEditor(EzEditor):
             parent = tok.parent
             if not isinstance(parent, Sentence):
                 raise ValueError("parent needs to be a Sentence")
-            sentence: Sentence = parent
             prev_tok = self._get_prev_token(tok)
             next_tok = self._get_next_token(tok)
-            if prev_tok is not None and next_tok is not None:
-                if prev_tok.parent != parent or next_tok.parent != parent:
-                    if not isinstance(prev_tok.parent, Sentence):
-                        raise ValueError("previous parent must be a sentence")
-                    if not isinstance(next_tok.parent, Sentence):
-                        raise ValueError("next parent must be a sentence")
-                    prev_sentence: Sentence = prev_tok.parent
-                    next_sentence: Sentence = next_tok.parent
-                    if prev_sentence.parent == next_sentence.parent:
-                        # same paragraph
-                        tok.zap()
-                        tok = prev_sentence.join_tokens(prev_tok, next_tok)
-                        new_word_index = len(prev_tok.word)
-                        tok.place_cursor_at_word_index(new_word_index)
-                        prev_tok.zap()
-                        next_tok.zap()
-                    elif prev_sentence.get_root_container() != next_sentence.get_root_container():
-                        return False # Don't allow backspace at the start of a chapter to edit the previous chapter
-                    else:
-                        # different paragraphs
-                        # copy all the sentences from the next paragraph to the previous,
-                        # and delete the whole next paragraph
-                        Tok(prev_sentence, ' ', tok.font)
-                        for child in next_sentence.parent.child_entities:
-                            if not isinstance(child, Sentence):
-                                continue
-                            nxt_sen: Sentence = child
-                            prev_sentence.append_copy_tokens_from(nxt_sen)
-                        next_sentence.parent.zap()
-                        return True
-                    if sentence not in (next_sentence, prev_sentence):
-                        # Three different sentences in play here
-                        # A sentence with one token (the one where the cursor was),
-                        # The sentence to the right, and the sentence to the left.
-                        # Join the two up but remove the middle one
-                        prev_sentence.append_copy_tokens_from(sentence)
-                        sentence.zap()
-                    prev_sentence.append_copy_tokens_from(next_sentence)
-                    next_sentence.zap()
-                    return True
+            if tok.word == "\n" and next_tok is not None:
+                if self._paragraph_of(next_tok) is not self._paragraph_of(tok):
+                    return self._join_paragraphs(tok, next_tok)
+            if prev_tok is not None and self._paragraph_of(prev_tok) is self._paragraph_of(tok):
+                # the deleted token may have ended a sentence, and the tokens either side of it,
+                # e.g. of a deleted space, may now be one word
                 tok.zap()
-                tok = sentence.join_tokens(prev_tok, next_tok)
-                new_word_index = len(prev_tok.word)
-                tok.place_cursor_at_word_index(new_word_index)
-                prev_tok.zap()
-                next_tok.zap()
+                resegment(prev_tok)
+                self._retokenize_at(prev_tok, len(prev_tok.word))
+                return True
+            # the caret moves to a neighbour before the token goes, or stays on it, with an empty
+            # word, if it is the last token of the document
+            if next_tok is not None:
+                next_tok.place_cursor_at_word_index(0)
+            elif prev_tok is not None:
+                prev_tok.place_cursor_at_word_index(-1)
+            else:
+                tok.change_word("")
+                tok.place_cursor_at_word_index(0)
                 return True
             tok.zap()
             return True
@@ -139,12 +144,52 @@ class TokenEditor(EzEditor):
         tok.move_left()
         return True
 
+    def _join_paragraphs(self, prev_tok: Tok, next_tok: Tok) -> bool:
+        """Move the sentences of the paragraph of next_tok to the end of the paragraph of prev_tok, the one
+        before it, and delete the paragraph of next_tok, which is empty by then. The sentences are moved rather
+        than copied, so their tokens keep their measurements and graph nodes. The caret stays before next_tok."""
+        if not isinstance(prev_tok.parent, Sentence):
+            raise ValueError("previous parent must be a sentence")
+        if not isinstance(next_tok.parent, Sentence):
+            raise ValueError("next parent must be a sentence")
+        prev_sentence: Sentence = prev_tok.parent
+        next_sentence: Sentence = next_tok.parent
+        if prev_sentence.get_root_container() != next_sentence.get_root_container():
+            return False # Don't allow backspace at the start of a chapter to edit the previous chapter
+        if not isinstance(prev_sentence.parent, SentenceContainer):
+            raise ValueError("previous sentence parent must be a SentenceContainer")
+        if not isinstance(next_sentence.parent, SentenceContainer):
+            raise ValueError("next sentence parent must be a SentenceContainer")
+        prev_paragraph: SentenceContainer = prev_sentence.parent
+        next_paragraph: SentenceContainer = next_sentence.parent
+        next_tok.place_cursor_at_word_index(0)
+        if prev_tok.word != "\n":
+            # the paragraph has no line break token, so a space keeps the last word apart from the next
+            space = Tok(prev_sentence, ' ', prev_tok.font)
+            prev_paragraph.append_sentences_from(next_paragraph)
+            next_paragraph.zap()
+            resegment(space)
+            return True
+        # the line break goes, and the text either side of it comes together, e.g. into one word
+        prev_tok.zap()
+        prev_paragraph.append_sentences_from(next_paragraph)
+        next_paragraph.zap()
+        resegment(next_tok)
+        retokenized: Retokenized = self._retokenize_at(next_tok, 0)
+        if retokenized.cursor_token is not None:
+            resegment(retokenized.cursor_token)
+        return True
+
     def _delete_character_mid_word(self, tok: Tok) -> bool:
         new_word = tok.word[:tok.cursor_word_index - 1] + tok.word[tok.cursor_word_index:]
         tok.change_word(new_word)
         tok.move_left()
         return True
 
+    def _paragraph_of(self, tok: Tok) -> Entity | None:
+        sentence = tok.parent
+        return sentence.parent if sentence is not None else None
+
     def _get_prev_token(self, tok: Tok) -> Optional[Tok]:
         prev = tok.previous_peer()
         if prev is None:
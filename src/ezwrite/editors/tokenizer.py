@@ -0,0 +1,110 @@
+import re
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List
+
+# a run of word characters, or a single whitespace or punctuation character
+TOKEN_PATTERN = re.compile(r"\w+|\s|[^\w\s]")
+WORD_PATTERN = re.compile(r"\w+")
+SENTENCE_TERMINATORS = frozenset(".!?")
+
+
+def split_tokens(text: str) -> List[str]:
+    """Split text into the words of its tokens"""
+    return TOKEN_PATTERN.findall(text)
+
+
+def joins(left: str, right: str) -> bool:
+    """Two tokens are one word if a word character ends the first and starts the second.
+    Any other boundary is stable: whitespace and punctuation are always tokens of their own."""
+    return len(left) > 0 and len(right) > 0 \
+        and WORD_PATTERN.fullmatch(left[-1]) is not None and WORD_PATTERN.fullmatch(right[0]) is not None
+
+
+def ends_sentence(text: str) -> bool:
+    return text in SENTENCE_TERMINATORS
+
+
+def iter_paragraphs(text: str) -> Iterator[List[List[str]]]:
+    """Tokenize text lazily, one paragraph at a time, so that a long text can be built into
+    the document while it is still being tokenized. Each line is a paragraph, which ends with
+    its newline token. A paragraph is a list of sentences, and a sentence a list of token words.
+    A sentence ends at the whitespace that follows a terminator, as the segmenter has it."""
+    sentences: List[List[str]] = []
+    sentence: List[str] = []
+    for match in TOKEN_PATTERN.finditer(text):
+        word: str = match.group()
+        ends: bool = word == "\n" or (word.isspace() and len(sentence) > 0 and ends_sentence(sentence[-1]))
+        sentence.append(word)
+        if not ends:
+            continue
+        sentences.append(sentence)
+        sentence = []
+        if word == "\n":
+            yield sentences
+            sentences = []
+    if len(sentence) > 0:
+        sentences.append(sentence)
+    if len(sentences) > 0:
+        yield sentences
+
+
+@dataclass
+class ParagraphText:
+    """A tokenized paragraph, kept compact until it is built into the document, e.g. while an import
+    is queued between threads: its text, the offset in the text where each token ends, and the
+    number of tokens at the end of each sentence"""
+    text: str
+    token_ends: array
+    sentence_ends: array
+
+    @classmethod
+    def from_sentences(cls, sentences: Iterable[Iterable[str]]) -> "ParagraphText":
+        """The compact form of sentences of token words"""
+        words: List[str] = []
+        token_ends: array = array("I")
+        sentence_ends: array = array("I")
+        end: int = 0
+        for sentence in sentences:
+            for word in sentence:
+                words.append(word)
+                end += len(word)
+                token_ends.append(end)
+            if len(sentence_ends) == 0 or sentence_ends[-1] != len(token_ends):
+                sentence_ends.append(len(token_ends))
+        return cls("".join(words), token_ends, sentence_ends)
+
+    @property
+    def token_count(self) -> int:
+        return len(self.token_ends)
+
+    def sentences(self) -> List[List[str]]:
+        """The sentences as lists of token words, as iter_paragraphs has them"""
+        sentences: List[List[str]] = []
+        start: int = 0
+        token: int = 0
+        for sentence_end in self.sentence_ends:
+            words: List[str] = []
+            while token < sentence_end:
+                end: int = self.token_ends[token]
+                words.append(self.text[start:end])
+                start = end
+                token += 1
+            sentences.append(words)
+        return sentences
+
+
+def tokenize_paragraph(text: str) -> ParagraphText:
+    """Tokenize the text of one paragraph, and find where its sentences end"""
+    token_ends: array = array("I")
+    sentence_ends: array = array("I")
+    previous: str = ""
+    for match in TOKEN_PATTERN.finditer(text):
+        word: str = match.group()
+        if word.isspace() and ends_sentence(previous):
+            sentence_ends.append(len(token_ends) + 1)
+        token_ends.append(match.end())
+        previous = word
+    if len(token_ends) > 0 and (len(sentence_ends) == 0 or sentence_ends[-1] != len(token_ends)):
+        sentence_ends.append(len(token_ends))
+    return ParagraphText(text, token_ends, sentence_ends)
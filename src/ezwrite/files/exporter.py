@@ -0,0 +1,263 @@
+import math
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from typing import Iterable, Iterator, List, TextIO, Tuple, override
+
+from ezwrite.editors.tokenizer import ParagraphText
+from ezwrite.graph.entity import Entity
+from ezwrite.ui.chapter import Chapter
+from ezwrite.ui.tok import Tok
+from ezwrite.utils.timers import Timers
+
+NIF = "http://persistence.uni-leipzig.org/nlp2rdf/ontologies/nif-core#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+
+def snapshot(root: Entity) -> List[ParagraphText]:
+    """Copy the text of a document, e.g. a chapter, in document order, in one step on the Tk thread.
+    The copy shares nothing with the document that an edit changes. This takes about 50 ms for
+    100k tokens, so ExportTask copies a large document in slices instead."""
+    return [paragraph_text(paragraph) for paragraph in root.child_entities]
+
+
+def paragraph_text(paragraph: Entity) -> ParagraphText:
+    """Copy the text of one paragraph, on the Tk thread, e.g. to analyse it on another thread"""
+    return ParagraphText.from_sentences(
+        [tok.word for tok in sentence.child_entities if isinstance(tok, Tok)]
+        for sentence in paragraph.child_entities
+    )
+
+
+def paragraph_string(paragraph: ParagraphText) -> str:
+    """The text of a paragraph as it is exported: every paragraph ends with a line end"""
+    return paragraph.text if paragraph.text.endswith("\n") else paragraph.text + "\n"
+
+
+class Exporter(ABC):
+    """Writes a document to a file a paragraph at a time, so the whole text is never one string"""
+    @abstractmethod
+    def write(self, file: TextIO, paragraphs: Iterable[ParagraphText]) -> None:
+        pass
+
+    def export(self, path: str, paragraphs: Iterable[ParagraphText]) -> None:
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            self.write(file, paragraphs)
+
+
+class TextExporter(Exporter):
+    """Plain text, a line per paragraph"""
+    @override
+    def write(self, file: TextIO, paragraphs: Iterable[ParagraphText]) -> None:
+        for paragraph in paragraphs:
+            file.write(paragraph_string(paragraph))
+
+
+class MarkdownExporter(Exporter):
+    """Markdown, with a blank line between paragraphs. The text is written as it is, so markup that
+    was imported as text, e.g. a heading, is Markdown again. Each line of a fenced code block was
+    imported as a paragraph of its own, so the lines inside a fence are written as they were."""
+    @override
+    def write(self, file: TextIO, paragraphs: Iterable[ParagraphText]) -> None:
+        first: bool = True
+        fenced: bool = False
+        for paragraph in paragraphs:
+            line: str = paragraph.text.rstrip("\n")
+            if not first and not fenced:
+                file.write("\n")
+            file.write(line)
+            file.write("\n")
+            if line.lstrip().startswith("```"):
+                fenced = not fenced
+            first = False
+
+
+def _literal(text: str) -> str:
+    escaped: str = (text.replace("\\", "\\\\").replace("\"", "\\\"")
+                    .replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t"))
+    return f"\"{escaped}\""
+
+
+class NifExporter(Exporter):
+    """NIF 2.0 in Turtle. The document text, as TextExporter writes it, is the nif:Context, and each
+    paragraph, sentence and word is a string of it, with its nif:beginIndex and nif:endIndex in
+    characters. The offsets are counted while the paragraphs are written, so it takes one pass.
+    The context is written last, when its length is known, so it has a URI of its own rather than
+    a char= one, and its text is left to the plain text export instead of repeated as nif:isString."""
+    def __init__(self, base_uri: str):
+        self._base_uri = base_uri
+
+    def _uri(self, begin: int, end: int) -> str:
+        return f"<{self._base_uri}#char={begin},{end}>"
+
+    def _string(self, file: TextIO, kind: str, begin: int, end: int, properties: List[str]) -> None:
+        lines: List[str] = [
+            f"{self._uri(begin, end)} a nif:{kind}",
+            f"    nif:beginIndex \"{begin}\"^^xsd:nonNegativeInteger",
+            f"    nif:endIndex \"{end}\"^^xsd:nonNegativeInteger",
+            f"    nif:referenceContext <{self._base_uri}#context>"
+        ] + [f"    {line}" for line in properties]
+        file.write(" ;\n".join(lines))
+        file.write(" .\n\n")
+
+    @override
+    def write(self, file: TextIO, paragraphs: Iterable[ParagraphText]) -> None:
+        file.write(f"@prefix nif: <{NIF}> .\n@prefix xsd: <{XSD}> .\n\n")
+        offset: int = 0
+        for paragraph in paragraphs:
+            self._write_paragraph(file, paragraph, offset)
+            offset += len(paragraph_string(paragraph))
+        file.write(f"<{self._base_uri}#context> a nif:Context ;\n"
+                   f"    nif:beginIndex \"0\"^^xsd:nonNegativeInteger ;\n"
+                   f"    nif:endIndex \"{offset}\"^^xsd:nonNegativeInteger .\n")
+
+    def _write_paragraph(self, file: TextIO, paragraph: ParagraphText, offset: int) -> None:
+        text: str = paragraph.text
+        end: int = len(text.rstrip())
+        self._string(file, "Paragraph", offset, offset + end, [])
+        paragraph_uri: str = self._uri(offset, offset + end)
+        for words in _sentence_words(paragraph):
+            (sentence_start, sentence_end) = (words[0][0], words[-1][1])
+            sentence_uri: str = self._uri(offset + sentence_start, offset + sentence_end)
+            self._string(file, "Sentence", offset + sentence_start, offset + sentence_end, [
+                f"nif:anchorOf {_literal(text[sentence_start:sentence_end])}",
+                f"nif:superString {paragraph_uri}"
+            ])
+            for (word_start, word_end) in words:
+                self._string(file, "Word", offset + word_start, offset + word_end, [
+                    f"nif:anchorOf {_literal(text[word_start:word_end])}",
+                    f"nif:sentence {sentence_uri}"
+                ])
+
+
+def _sentence_words(paragraph: ParagraphText) -> Iterator[List[Tuple[int, int]]]:
+    """The start and end offsets of the tokens of each sentence that has any, leaving out whitespace"""
+    start: int = 0
+    token: int = 0
+    for sentence_end in paragraph.sentence_ends:
+        words: List[Tuple[int, int]] = []
+        while token < sentence_end:
+            token_end: int = paragraph.token_ends[token]
+            if not paragraph.text[start:token_end].isspace():
+                words.append((start, token_end))
+            start = token_end
+            token += 1
+        if len(words) > 0:
+            yield words
+
+
+def exporter_for(path: str) -> Exporter:
+    """The exporter for the suffix of a file name: .md or .markdown, .ttl for NIF, or else plain text"""
+    suffix: str = os.path.splitext(path)[1].lower()
+    if suffix in (".md", ".markdown"):
+        return MarkdownExporter()
+    if suffix == ".ttl":
+        return NifExporter("file://" + os.path.abspath(path))
+    return TextExporter()
+
+
+class _Restart(Exception):
+    """The Tk thread started the copy of the document again, after an edit"""
+
+
+class ExportTask():
+    """Exports a chapter on a worker thread. Copying a whole chapter on the Tk thread paused the UI,
+    about 250 ms for 500k tokens, while writing the copy took a few ms. So the Tk thread copies the
+    paragraphs in slices, between frames, and the worker writes each slice as it comes.
+    The generation of the chapter tells whether an edit landed between two slices. The copy then starts
+    again, and so does the file, so the file is always the text as it was at one moment. The copy after
+    an edit is made in one step, with the pause, so that typing cannot keep an export from finishing."""
+    COPY_BUDGET_MS: float = 8.0
+    POLL_INTERVAL_MS: int = 16
+
+    def __init__(self, path: str, chapter: Chapter, exporter: Exporter | None = None):
+        self._path = path
+        self._chapter = chapter
+        self._exporter: Exporter = exporter_for(path) if exporter is None else exporter
+        self._thread = threading.Thread(target=self._work, name="exporter", daemon=True)
+        self._queue: queue.SimpleQueue[List[ParagraphText] | _Restart | None] = queue.SimpleQueue()
+        self._error: str | None = None
+        self._widget: Timers | None = None
+        self._on_done: Callable[[ExportTask], None] = lambda task: None
+        self._generation: int = -1
+        self._copied: int = 0
+        self._restarts: int = 0
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def done(self) -> bool:
+        return not self._thread.is_alive()
+
+    @property
+    def error(self) -> str | None:
+        return self._error
+
+    @property
+    def restarts(self) -> int:
+        """How many times an edit made the copy start again"""
+        return self._restarts
+
+    def start(self, widget: Timers, on_done: Callable[["ExportTask"], None]) -> None:
+        """Start writing, and copy the first slice. Call on_done on the Tk thread once the file is written."""
+        self._widget = widget
+        self._on_done = on_done
+        self._generation = self._chapter.generation
+        self._thread.start()
+        self._copy_slice()
+
+    def _copy_slice(self) -> None:
+        """Copy paragraphs until the time budget of this frame is spent, or all of them after an edit"""
+        deadline: float = time.perf_counter() + ExportTask.COPY_BUDGET_MS / 1000.0
+        if self._chapter.generation != self._generation:
+            self._generation = self._chapter.generation
+            self._copied = 0
+            self._restarts += 1
+            self._queue.put(_Restart())
+            deadline = math.inf
+        paragraphs: List[Entity] = self._chapter.child_entities
+        copied: List[ParagraphText] = []
+        while self._copied < len(paragraphs):
+            copied.append(paragraph_text(paragraphs[self._copied]))
+            self._copied += 1
+            if time.perf_counter() >= deadline:
+                break
+        self._queue.put(copied)
+        if self._copied < len(paragraphs) and self._error is None and self._widget is not None:
+            self._widget.after(ExportTask.POLL_INTERVAL_MS, self._copy_slice)
+            return
+        self._queue.put(None)  # the end of the document
+        self._poll()
+
+    def _poll(self) -> None:
+        if not self.done and self._widget is not None:
+            self._widget.after(ExportTask.POLL_INTERVAL_MS, self._poll)
+            return
+        self._on_done(self)
+
+    def _work(self) -> None:
+        try:
+            while True:
+                try:
+                    self._exporter.export(self._path, self._copies())
+                    return
+                except _Restart:
+                    continue
+        except OSError as error:
+            self._error = str(error)
+
+    def _copies(self) -> Iterator[ParagraphText]:
+        """The paragraphs as the Tk thread copies them, until the end of the document.
+        Raises _Restart when the copy starts again, which leaves the file to be written again."""
+        while True:
+            copied: List[ParagraphText] | _Restart | None = self._queue.get()
+            if copied is None:
+                return
+            if isinstance(copied, _Restart):
+                raise copied
+            yield from copied
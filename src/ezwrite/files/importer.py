@@ -0,0 +1,247 @@
+import codecs
+import mmap
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Tuple
+
+from ezwrite.editors.tokenizer import ParagraphText, tokenize_paragraph
+from ezwrite.utils.memory import peak_rss_bytes
+from ezwrite.utils.timers import Timers
+from ezwrite.utils.tracing import tracer
+
+MARKDOWN_SUFFIXES = (".md", ".markdown")
+# lines that start a Markdown block of their own, rather than continuing the paragraph above
+_MARKDOWN_BLOCK_STARTS = ("#", ">", "- ", "* ", "+ ", "|")
+
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[Tuple[str, int]]:
+    """Decode a UTF-8 file a chunk at a time, from a memory map of it, so that reading it takes
+    no more memory than a chunk. Yield each chunk of text with the number of bytes read so far."""
+    with open(path, "rb") as file:
+        size: int = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return  # an empty file cannot be mapped
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            for start in range(0, size, chunk_size):
+                end: int = min(start + chunk_size, size)
+                yield decoder.decode(mapped[start:end], final=end == size), end
+
+
+def iter_lines(chunks: Iterable[Tuple[str, int]]) -> Iterator[Tuple[str, int]]:
+    """Split chunks of text into lines, without their line ends, each with the bytes read so far"""
+    pending: str = ""
+    done: int = 0
+    for chunk, done in chunks:
+        lines: List[str] = (pending + chunk).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r"), done
+    if pending != "":
+        yield pending.rstrip("\r"), done
+
+
+def _starts_block(line: str) -> bool:
+    stripped: str = line.lstrip()
+    if stripped.startswith(_MARKDOWN_BLOCK_STARTS):
+        return True
+    number, dot, _ = stripped.partition(". ")
+    return dot != "" and number.isdigit()
+
+
+def markdown_paragraphs(lines: Iterable[Tuple[str, int]]) -> Iterator[Tuple[str, int]]:
+    """Join the lines of each Markdown paragraph, which are separated by blank lines. Headings,
+    list items, quotes and table rows are paragraphs of their own, and so is each line of a fenced
+    code block. The markup is kept as text."""
+    block: List[str] = []
+    fenced: bool = False
+    done: int = 0
+    for line, done in lines:
+        if line.lstrip().startswith("```"):
+            fenced = not fenced
+        if fenced or line.lstrip().startswith("```"):
+            if len(block) > 0:
+                yield " ".join(block), done
+                block = []
+            yield line, done
+            continue
+        if line.strip() == "" or _starts_block(line):
+            if len(block) > 0:
+                yield " ".join(block), done
+                block = []
+        if line.strip() == "":
+            continue
+        block.append(line.strip())
+        if line.lstrip().startswith("#"):
+            yield " ".join(block), done
+            block = []
+    if len(block) > 0:
+        yield " ".join(block), done
+
+
+@dataclass
+class ImportReport:
+    """How an import went"""
+    path: str
+    size_bytes: int
+    paragraphs: int
+    tokens: int
+    first_paint_s: float  # from the start until Tk was idle after building the first batch, so had drawn it
+    total_s: float
+    peak_rss_bytes: int | None
+    error: str | None = None
+
+    def __str__(self) -> str:
+        if self.error is not None:
+            return f"Could not import {self.path}: {self.error}"
+        peak: str = "n/a" if self.peak_rss_bytes is None else f"{self.peak_rss_bytes / (1 << 20):.0f} MB"
+        return (f"Imported {self.size_bytes / (1 << 20):.1f} MB, {self.paragraphs} paragraphs, {self.tokens} tokens "
+                f"in {self.total_s:.2f} s, first paint {self.first_paint_s * 1000:.0f} ms, peak memory {peak}")
+
+
+class Importer():
+    """Opens a plain text or Markdown file into the document in the background. A worker thread reads
+    the file through a memory map and tokenizes it a chunk at a time, into compact ParagraphText.
+    It queues the paragraphs in batches, and the queue is bounded, so the worker waits while the
+    document is built rather than holding the whole file in memory. The Tk thread polls the queue
+    with after, and hands each batch to on_batch, which builds it into the document. Tk is only
+    used from the Tk thread."""
+    CHUNK_SIZE: int = 1 << 20
+    BATCH_PARAGRAPHS: int = 64
+    MAX_PENDING_BATCHES: int = 8
+    POLL_INTERVAL_MS: int = 16
+    POLL_BUDGET_MS: float = 8.0
+
+    def __init__(self, path: str, markdown: bool | None = None):
+        self._path = path
+        self._markdown: bool = path.lower().endswith(MARKDOWN_SUFFIXES) if markdown is None else markdown
+        self._size: int = 0
+        self._queue: queue.Queue[List[ParagraphText] | None] = queue.Queue(Importer.MAX_PENDING_BATCHES)
+        self._cancelled = threading.Event()
+        self._bytes_done: int = 0
+        self._error: str | None = None
+        self._worker: threading.Thread | None = None
+        self._widget: Timers | None = None
+        self._job_id: str | None = None
+        self._on_batch: Callable[[List[ParagraphText]], None] = lambda batch: None
+        self._on_progress: Callable[[float], None] = lambda fraction: None
+        self._on_done: Callable[[ImportReport], None] = lambda report: None
+        self._started_at: float = 0.0
+        self._first_paint_s: float = -1.0
+        self._paragraphs: int = 0
+        self._tokens: int = 0
+
+    @property
+    def progress(self) -> float:
+        """The fraction of the file that has been read"""
+        return 1.0 if self._size == 0 else self._bytes_done / self._size
+
+    def start(self, # pylint: disable=too-many-arguments,too-many-positional-arguments
+              widget: Timers,
+              on_batch: Callable[[List[ParagraphText]], None],
+              on_progress: Callable[[float], None],
+              on_done: Callable[[ImportReport], None]) -> None:
+        self._widget = widget
+        self._on_batch = on_batch
+        self._on_progress = on_progress
+        self._on_done = on_done
+        self._started_at = time.perf_counter()
+        try:
+            self._size = os.path.getsize(self._path)
+        except OSError as error:
+            # reported as the worker reports its errors, after start has returned
+            self._error = str(error)
+            self._job_id = widget.after_idle(self._finish)
+            return
+        self._worker = threading.Thread(target=self._work, name="importer", daemon=True)
+        self._worker.start()
+        self._job_id = widget.after(Importer.POLL_INTERVAL_MS, self._poll)
+
+    def cancel(self) -> None:
+        """Stop reading. The paragraphs already built stay in the document."""
+        self._cancelled.set()
+        if self._widget is not None and self._job_id is not None:
+            self._widget.after_cancel(self._job_id)
+            self._job_id = None
+
+    def paragraph_texts(self) -> Iterator[Tuple[ParagraphText, int]]:
+        """Tokenize the file, a paragraph at a time, each with the number of bytes read so far"""
+        lines: Iterator[Tuple[str, int]] = iter_lines(read_chunks(self._path, Importer.CHUNK_SIZE))
+        blocks: Iterator[Tuple[str, int]] = markdown_paragraphs(lines) if self._markdown else lines
+        for text, done in blocks:
+            yield tokenize_paragraph(text + "\n"), done
+
+    def _work(self) -> None:
+        batch: List[ParagraphText] = []
+        try:
+            for paragraph, done in self.paragraph_texts():
+                if self._cancelled.is_set():
+                    return
+                batch.append(paragraph)
+                self._bytes_done = done
+                if len(batch) >= Importer.BATCH_PARAGRAPHS:
+                    self._put(batch)
+                    batch = []
+            if len(batch) > 0:
+                self._put(batch)
+        except (OSError, ValueError) as error:
+            self._error = str(error)
+        finally:
+            self._put(None)  # the end of the import
+
+    def _put(self, batch: List[ParagraphText] | None) -> None:
+        """Wait for room in the queue, unless the import is cancelled"""
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(batch, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _poll(self) -> None:
+        """Build the queued batches until the time budget of this frame is spent"""
+        self._job_id = None
+        deadline: float = time.perf_counter() + Importer.POLL_BUDGET_MS / 1000.0
+        while time.perf_counter() < deadline:
+            try:
+                batch: List[ParagraphText] | None = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if batch is None:
+                self._finish()
+                return
+            first: bool = self._paragraphs == 0
+            with tracer.span("import_batch", "import", {"paragraphs": len(batch)} if tracer.enabled else None):
+                self._on_batch(batch)
+            self._paragraphs += len(batch)
+            self._tokens += sum(paragraph.token_count for paragraph in batch)
+            if first and self._widget is not None:
+                # Tk draws in its idle handlers, which run after this poll and before the next one
+                self._widget.after_idle(self._first_paint)
+                break
+        self._on_progress(self.progress)
+        if self._widget is not None and not self._cancelled.is_set():
+            self._job_id = self._widget.after(Importer.POLL_INTERVAL_MS, self._poll)
+
+    def _first_paint(self) -> None:
+        self._first_paint_s = time.perf_counter() - self._started_at
+
+    def _finish(self) -> None:
+        self._job_id = None
+        total_s: float = time.perf_counter() - self._started_at
+        report = ImportReport(self._path,
+                              self._size,
+                              self._paragraphs,
+                              self._tokens,
+                              max(self._first_paint_s, 0.0),
+                              total_s,
+                              peak_rss_bytes(),
+                              self._error)
+        if tracer.enabled:
+            tracer.instant("import done", "import", {"report": str(report)})
+        self._on_progress(1.0)
+        self._on_done(report)
@@ -113,9 +113,19 @@ class Entity(Resource, ABC):
     def height(self) -> int:
         pass
 
-    def inside(self, root_x, root_y) -> bool:
-        xmin = self.root_x
-        ymin = self.root_y
-        xmax = self.root_x + self.width
-        ymax = self.root_y + self.height
-        return xmin <= root_x < xmax and ymin <= root_y < ymax
+    @property
+    @abstractmethod
+    def doc_x(self) -> int:
+        """x in document coordinates, i.e. relative to the root container, as laid out"""
+
+    @property
+    @abstractmethod
+    def doc_y(self) -> int:
+        """y in document coordinates, i.e. relative to the root container, as laid out"""
+
+    def inside(self, doc_x, doc_y) -> bool:
+        xmin = self.doc_x
+        ymin = self.doc_y
+        xmax = xmin + self.width
+        ymax = ymin + self.height
+        return xmin <= doc_x < xmax and ymin <= doc_y < ymax
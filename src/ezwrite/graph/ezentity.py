@@ -1,6 +1,6 @@
 from abc import ABC
 from collections.abc import Callable
-from typing import Optional, override
+from typing import List, Optional, Type, override
 
 from rdflib.graph import Graph
 from rdflib.term import URIRef
@@ -79,28 +79,27 @@ class EzEntity(Entity, ABC):
         children = self.child_entities
         if children is None or len(children) == 0:
             return None
-        found: bool = False
-        for this_child in children:
-            if found:
-                return this_child
-            if this_child == child:
-                found = True
-        return None
+        try:
+            index: int = children.index(child)
+        except ValueError:
+            return None
+        if index + 1 >= len(children):
+            return None
+        return children[index + 1]
 
     @override
     def get_previous_child(self, child: Entity) -> Optional[Entity]:
         children = self.child_entities
         if children is None or len(children) == 0:
             return None
-        prev_child: Entity | None = None
-        for this_child in children:
-            if this_child == child:
-                if prev_child is not None:
-                    return prev_child
-                break
-            prev_child = this_child
-        # no previous child found in this parent
-        return None
+        try:
+            index: int = children.index(child)
+        except ValueError:
+            return None
+        if index == 0:
+            # no previous child found in this parent
+            return None
+        return children[index - 1]
 
     @override
     def first_child(self) -> Optional[Entity]:
@@ -133,6 +132,12 @@ class EzEntity(Entity, ABC):
         self.mark_dirty()
         return self._property_list.remove(EzProperty.HAS_PART, child)
 
+    def remove_child_entities_from(self, start: int, entity_type: Type[Entity]) -> List[Entity]:
+        """Remove the children of a type from index start on, in one step, and return them in order,
+        e.g. to move them to another container"""
+        self.mark_dirty()
+        return self._property_list.remove_from(EzProperty.HAS_PART, entity_type, start)
+
     @property
     @override
     def has_children(self) -> bool:
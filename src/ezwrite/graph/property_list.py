@@ -28,6 +28,36 @@ class PropertyList():
             return
         existing_list.append(entity)
 
+    def extend(self,
+               predicate: str | URIRef | EzProperty,
+               entities: List[Entity]
+               ) -> None:
+        """Append entities that were just created, so cannot already be in the list.
+        Unlike append, this does not look for each one in the list first."""
+        if len(entities) == 0:
+            return
+        pred_key: str = predicate.uri.lower() if isinstance(predicate, EzProperty) else predicate.lower()
+        type_key: str = entities[0].__class__.__name__
+        existing: Dict[str, List[Entity]] = self.hashtable.setdefault(pred_key, {})
+        existing.setdefault(type_key, []).extend(entities)
+
+    def remove_from(self,
+                    predicate: str | URIRef | EzProperty,
+                    entity_type_key: str | Type[Entity],
+                    start: int
+                    ) -> List[Entity]:
+        """Remove the entities of a type from index start to the end of their list, in one step, and
+        return them in order, e.g. to extend another list with them. Unlike remove, this does not look
+        for each one in the list, so moving a run of entities costs the same however long the list is."""
+        pred_key: str = predicate.uri.lower() if isinstance(predicate, EzProperty) else predicate.lower()
+        type_key: str = entity_type_key if isinstance(entity_type_key, str) else entity_type_key.__name__
+        existing_list: List[Entity] | None = self.hashtable.get(pred_key, {}).get(type_key)
+        if existing_list is None:
+            return []
+        removed: List[Entity] = existing_list[start:]
+        del existing_list[start:]
+        return removed
+
     def insert_before(self,
                       reference: Entity,
                       predicate: str | URIRef | EzProperty,
@@ -46,6 +76,24 @@ class PropertyList():
         ind = existing_list.index(reference)
         existing_list.insert(ind, entity)
 
+    def insert_after(self,
+                     reference: Entity,
+                     predicate: str | URIRef | EzProperty,
+                     entity: Entity
+                     ) -> None:
+        pred_key: str = predicate.uri.lower() if isinstance(predicate, EzProperty) else predicate.lower()
+        type_key: str = entity.__class__.__name__
+        if pred_key not in self.hashtable:
+            raise ValueError("reference not found, no matching predicate in the list")
+        existing: Dict[str, List[Entity]] = self.hashtable[pred_key]
+        existing_list: List[Entity] = existing[type_key]
+        if not reference in existing_list:
+            raise ValueError("reference not found in the list")
+        if entity in existing_list:
+            return
+        ind = existing_list.index(reference)
+        existing_list.insert(ind + 1, entity)
+
     def remove(self,
                predicate: str | URIRef | EzProperty,
                entity: Entity
@@ -80,7 +128,8 @@ class PropertyList():
         if pred_key not in self.hashtable:
             return False
         existing: Dict[str, List[Entity]] = self.hashtable[pred_key]
-        return len(existing.values()) > 0
+        # the list of a type stays when its last entity is removed
+        return any(len(entities) > 0 for entities in existing.values())
 
     def entities_of(self,
                     predicate: str | URIRef | EzProperty,
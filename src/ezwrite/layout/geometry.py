@@ -0,0 +1,31 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class Box:
+    """The geometry that layout assigned to an entity, relative to the frame that contains it.
+    Reading positions from here, rather than from Tk with winfo_*, avoids a round trip to Tcl."""
+    x: int = 0
+    y: int = 0
+    width: int = 0
+    height: int = 0
+
+    @property
+    def right(self) -> int:
+        return self.x + self.width
+
+    @property
+    def bottom(self) -> int:
+        return self.y + self.height
+
+    def contains(self, x: int, y: int) -> bool:
+        return self.x <= x < self.right and self.y <= y < self.bottom
+
+    def place(self, x: int, y: int, width: int, height: int) -> None:
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    def differs_from(self, x: int, y: int, width: int, height: int) -> bool:
+        return (self.x, self.y, self.width, self.height) != (x, y, width, height)
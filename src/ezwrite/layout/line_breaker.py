@@ -0,0 +1,119 @@
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import List, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+IntArray = npt.NDArray[np.int64]
+
+
+def _empty() -> IntArray:
+    return np.zeros(0, dtype=np.int64)
+
+
+@dataclass
+class LineBox:
+    """One laid out line of a paragraph. It holds the tokens[start:end],
+    and its position is relative to the paragraph frame."""
+    start: int
+    end: int
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+@dataclass
+class LineBreaks:
+    """The result of breaking a paragraph into lines.
+    The line arrays have one entry per line, the offset arrays one entry per token,
+    all relative to the paragraph frame. token_lines maps each token to its line."""
+    line_starts: IntArray = field(default_factory=_empty)
+    line_ends: IntArray = field(default_factory=_empty)
+    line_x: IntArray = field(default_factory=_empty)
+    line_y: IntArray = field(default_factory=_empty)
+    line_widths: IntArray = field(default_factory=_empty)
+    line_heights: IntArray = field(default_factory=_empty)
+    x_offsets: IntArray = field(default_factory=_empty)
+    y_offsets: IntArray = field(default_factory=_empty)
+    token_lines: IntArray = field(default_factory=_empty)
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_starts)
+
+    @property
+    def height(self) -> int:
+        if self.line_count == 0:
+            return 0
+        return int(self.line_y[-1] + self.line_heights[-1])
+
+    def line(self, index: int) -> LineBox:
+        return LineBox(
+            int(self.line_starts[index]),
+            int(self.line_ends[index]),
+            int(self.line_x[index]),
+            int(self.line_y[index]),
+            int(self.line_widths[index]),
+            int(self.line_heights[index])
+        )
+
+    @property
+    def lines(self) -> List[LineBox]:
+        return [self.line(i) for i in range(self.line_count)]
+
+
+def break_lines(widths: Sequence[int] | IntArray,
+                heights: Sequence[int] | IntArray,
+                frame_width: int,
+                first_line_indent: int = 0
+                ) -> LineBreaks:
+    """Greedy line breaking over the widths of all the tokens of a paragraph.
+    The cumulative widths are computed once, and the end of each line is found with
+    a binary search over them, so the only Python loop is per line. The offsets of the
+    tokens are then computed for the whole paragraph in one vectorized pass.
+    A line always holds at least one token, even if that token is wider than the frame."""
+    width_array: IntArray = np.asarray(widths, dtype=np.int64)
+    height_array: IntArray = np.asarray(heights, dtype=np.int64)
+    count: int = len(width_array)
+    if count == 0:
+        return LineBreaks()
+    cumulative: IntArray = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(width_array, out=cumulative[1:])
+
+    line_starts: IntArray = np.array(_line_starts(cumulative, frame_width, first_line_indent), dtype=np.int64)
+    line_ends: IntArray = np.append(line_starts[1:], count)
+    line_x: IntArray = np.zeros(len(line_starts), dtype=np.int64)
+    line_x[0] = first_line_indent
+    line_heights: IntArray = np.maximum.reduceat(height_array, line_starts)
+    line_y: IntArray = np.zeros(len(line_starts), dtype=np.int64)
+    np.cumsum(line_heights[:-1], out=line_y[1:])
+    token_lines: IntArray = np.repeat(np.arange(len(line_starts)), line_ends - line_starts)
+    return LineBreaks(
+        line_starts=line_starts,
+        line_ends=line_ends,
+        line_x=line_x,
+        line_y=line_y,
+        line_widths=cumulative[line_ends] - cumulative[line_starts],
+        line_heights=line_heights,
+        x_offsets=cumulative[:-1] - cumulative[line_starts][token_lines] + line_x[token_lines],
+        y_offsets=line_y[token_lines],
+        token_lines=token_lines
+    )
+
+
+def _line_starts(cumulative: IntArray, frame_width: int, first_line_indent: int) -> List[int]:
+    # bisect_right on a list is searchsorted(side="right"), without the overhead
+    # of a numpy call for each line
+    cumulative_list: List[int] = cumulative.tolist()
+    count: int = len(cumulative_list) - 1
+    starts: List[int] = []
+    start: int = 0
+    x: int = first_line_indent
+    while start < count:
+        end: int = bisect_right(cumulative_list, cumulative_list[start] + frame_width - x, start + 1) - 1
+        starts.append(start)
+        start = end if end > start else start + 1
+        x = 0
+    return starts
@@ -0,0 +1,46 @@
+from abc import ABC, abstractmethod
+from typing import Any, override
+
+# a font of a FontMetrics implementation, e.g. a tkinter.font.Font
+Font = Any
+
+
+class FontMetrics(ABC):
+    """Measures text for layout. The model and the layout only measure through this, so they can
+    run with metrics that need no display, e.g. in batch jobs and benchmarks."""
+    @abstractmethod
+    def width(self, font: Font, text: str) -> int:
+        pass
+
+    @abstractmethod
+    def linespace(self, font: Font) -> int:
+        pass
+
+    @abstractmethod
+    def default_font(self) -> Font:
+        pass
+
+    @property
+    def cache_hit_rate(self) -> float | None:
+        """The fraction of measurements that were cached, or None if the metrics have no cache"""
+        return None
+
+
+class FixedAdvanceMetrics(FontMetrics):
+    """Every character has the same advance, and every line the same height, whatever the font.
+    The measurements are deterministic and need no display."""
+    def __init__(self, advance: int = 7, linespace: int = 15):
+        self._advance = advance
+        self._linespace = linespace
+
+    @override
+    def width(self, font: Font, text: str) -> int:
+        return len(text) * self._advance
+
+    @override
+    def linespace(self, font: Font) -> int:
+        return self._linespace
+
+    @override
+    def default_font(self) -> Font:
+        return "fixed"
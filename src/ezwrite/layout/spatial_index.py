@@ -0,0 +1,77 @@
+from bisect import bisect_right
+from dataclasses import dataclass
+from enum import Enum
+from typing import Generic, List, Optional, Tuple, TypeVar
+
+from ezwrite.layout.line_breaker import LineBreaks
+
+T = TypeVar("T")
+
+
+class HitEdge(Enum):
+    """Where a point is, relative to the token that is closest to it"""
+    BEFORE = -1
+    INSIDE = 0
+    AFTER = 1
+
+
+@dataclass
+class LineHit:
+    """The token (by its index in the paragraph) at or nearest to a point"""
+    index: int
+    line: int
+    edge: HitEdge
+
+
+def hit_test_lines(breaks: LineBreaks, x: int, y: int) -> Optional[LineHit]:
+    """Find the token at or nearest to (x, y), relative to the paragraph frame.
+    The line is found by binary search over the line tops, and the token by binary search
+    over the x offsets of that line, so this is O(log n) in the number of tokens.
+    Points above the first line are before the first token, points below the last line are
+    after the last token, and points left or right of a line are before its first token or
+    after its last."""
+    if breaks.line_count == 0:
+        return None
+    if y < 0:
+        return LineHit(0, 0, HitEdge.BEFORE)
+    last_line: int = breaks.line_count - 1
+    if y >= breaks.height:
+        return LineHit(int(breaks.line_ends[last_line]) - 1, last_line, HitEdge.AFTER)
+    line: int = int(breaks.line_y.searchsorted(y, side="right")) - 1
+    return hit_test_line(breaks, line, x)
+
+
+def hit_test_line(breaks: LineBreaks, line: int, x: int) -> LineHit:
+    """Find the token of a line that is at or nearest to x, relative to the paragraph frame"""
+    start: int = int(breaks.line_starts[line])
+    end: int = int(breaks.line_ends[line])
+    if x < breaks.line_x[line]:
+        return LineHit(start, line, HitEdge.BEFORE)
+    if x >= breaks.line_x[line] + breaks.line_widths[line]:
+        return LineHit(end - 1, line, HitEdge.AFTER)
+    index: int = start + int(breaks.x_offsets[start:end].searchsorted(x, side="right")) - 1
+    return LineHit(index, line, HitEdge.INSIDE)
+
+
+class VerticalIndex(Generic[T]):
+    """Items stacked from top to bottom, e.g. the paragraphs of a chapter, sorted by their y"""
+    def __init__(self) -> None:
+        self._tops: List[int] = []
+        self._items: List[T] = []
+
+    def rebuild(self, stacked: List[Tuple[int, T]]) -> None:
+        self._tops = [top for top, _ in stacked]
+        self._items = [item for _, item in stacked]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def item(self, index: int) -> T:
+        return self._items[index]
+
+    def find(self, y: int) -> int:
+        """The index of the last item that starts at or above y, or 0 if y is above them all.
+        Returns -1 when there are no items."""
+        if len(self._items) == 0:
+            return -1
+        return max(bisect_right(self._tops, y) - 1, 0)
@@ -0,0 +1,200 @@
+import time
+from argparse import ArgumentTypeError
+from collections.abc import Callable
+from typing import Iterator, List
+
+from ezwrite.editors.retokenizer import Retokenized, retokenize
+from ezwrite.editors.segmenter import resegment
+from ezwrite.layout.metrics import Font
+from ezwrite.ui.paragraph import Paragraph, ParagraphContainer
+from ezwrite.ui.sentence import Sentence
+from ezwrite.ui.tok import Tok
+from ezwrite.utils.tracing import traced
+
+
+def append_sentences(paragraph: Paragraph, sentences: List[List[str]], font: Font) -> List[Tok]:
+    """Build sentences of token words at the end of a paragraph. The first one continues
+    the last sentence of the paragraph, if it has one. Return the tokens that were built."""
+    built: List[Tok] = []
+    for index, words in enumerate(sentences):
+        last = paragraph.last_child()
+        if index > 0 or not isinstance(last, Sentence):
+            if len(words) == 0:
+                continue
+            last = Sentence(paragraph)
+        sentence: Sentence = last
+        tokens: List[Tok] = [Tok(sentence, word, font, False) for word in words if word != ""]
+        sentence.extend_tokens(tokens)
+        built.extend(tokens)
+    return built
+
+
+class BulkInsert():
+    """Builds a long text, e.g. a paste, into the chapter at the caret, a batch of paragraphs
+    at a time. The text is tokenized lazily, and its tokens are appended to their sentences in
+    one go, without measuring a word twice or looking for each token in its sentence first.
+    The paragraphs that fill the viewport are built straight away, so the next layout shows them,
+    and the rest are built in batches between frames, so that the window keeps handling events.
+    The text after the caret is moved into a paragraph of its own, which the inserted paragraphs are
+    built before, and moved back into the last of them when the last batch is built, unless the text
+    ends with a line break. Its tokens are moved rather than copied, so they keep their measurements
+    and graph nodes."""
+    BATCH_BUDGET_MS: float = 8.0
+    BATCH_INTERVAL_MS: int = 16
+
+    def __init__(self, # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 chapter: ParagraphContainer,
+                 paragraphs: Iterator[List[List[str]]],
+                 on_batch: Callable[[], None],
+                 on_done: Callable[["BulkInsert"], None],
+                 viewport_area: int):
+        self._chapter = chapter
+        self._paragraphs = paragraphs
+        self._on_batch = on_batch
+        self._on_done = on_done
+        self._viewport_area = viewport_area
+        self._paragraph: Paragraph | None = None
+        self._font: Font | None = None
+        self._tail: Paragraph | None = None
+        self._job_id: str | None = None
+        self._token_count: int = 0
+        self._paragraph_count: int = 0
+        self._done: bool = False
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    @property
+    def token_count(self) -> int:
+        """The number of tokens built so far"""
+        return self._token_count
+
+    @property
+    def paragraph_count(self) -> int:
+        """The number of paragraphs built so far, including the one with the caret"""
+        return self._paragraph_count
+
+    def start(self, tok: Tok, index: int) -> None:
+        """Insert at index in the word of tok. The first paragraph of the text goes into the paragraph
+        of tok, and so do the paragraphs after it until they fill the viewport."""
+        sentence = tok.parent
+        if not isinstance(sentence, Sentence): raise ArgumentTypeError("the parent of a Tok must be a Sentence")
+        paragraph = sentence.parent
+        if not isinstance(paragraph, Paragraph): raise ArgumentTypeError("the parent of a Sentence must be a Paragraph")
+        self._paragraph = paragraph
+        self._font = tok.font
+        self._tail = self._split_at(tok, index)
+        first: List[List[str]] | None = next(self._paragraphs, None)
+        if first is not None:
+            area: int = self._append_sentences(first)
+            self._paragraph_count += 1
+            retokenized: Retokenized = retokenize(tok, index)
+            if retokenized.cursor_token is not None:
+                # the caret stays at the start of the insertion until the last batch is built
+                retokenized.cursor_token.place_cursor_at_word_index(retokenized.cursor_index)
+                resegment(retokenized.cursor_token)
+            while area < self._viewport_area and not self._done:
+                area += self._build_next()
+        self._on_batch()
+        if not self._done:
+            self._job_id = self._chapter.view.after(BulkInsert.BATCH_INTERVAL_MS, self._run)
+
+    def finish_now(self) -> None:
+        """Build the rest of the text without yielding, e.g. before an edit that must follow it"""
+        if self._job_id is not None:
+            self._chapter.view.after_cancel(self._job_id)
+            self._job_id = None
+        while not self._done:
+            self._build_next()
+        self._on_batch()
+
+    @traced("bulk_insert_batch", "editor")
+    def _run(self) -> None:
+        self._job_id = None
+        deadline: float = time.perf_counter() + BulkInsert.BATCH_BUDGET_MS / 1000.0
+        while not self._done and time.perf_counter() < deadline:
+            self._build_next()
+        self._on_batch()
+        if not self._done:
+            self._job_id = self._chapter.view.after(BulkInsert.BATCH_INTERVAL_MS, self._run)
+
+    def _build_next(self) -> int:
+        """Build the next paragraph, or the end of the insertion if there is none.
+        Return the area of the tokens that were built, in square pixels."""
+        sentences: List[List[str]] | None = next(self._paragraphs, None)
+        if sentences is None:
+            self._finish()
+            return 0
+        if self._paragraph is None or self._font is None:
+            raise ValueError("the bulk insert has not started")
+        self._paragraph = Paragraph(self._chapter,
+                                    self._chapter.graph,
+                                    self._paragraph.first_line_indent,
+                                    self._paragraph)
+        self._paragraph_count += 1
+        return self._append_sentences(sentences)
+
+    def _split_at(self, tok: Tok, index: int) -> Paragraph | None:
+        """Move the text after index in the word of tok, to the end of its paragraph, into a new paragraph
+        after it, and return that paragraph, or None if there is no text after index"""
+        sentence = tok.parent
+        if not isinstance(sentence, Sentence): raise ArgumentTypeError("the parent of a Tok must be a Sentence")
+        paragraph = sentence.parent
+        if not isinstance(paragraph, Paragraph): raise ArgumentTypeError("the parent of a Sentence must be a Paragraph")
+        if index < len(tok.word):
+            sentence.insert_token_after(tok, Tok(sentence, tok.word[index:], tok.font, False))
+            tok.change_word(tok.word[:index])
+        if sentence.last_child() is not tok:
+            sentence.split_after(tok)
+        sentences = paragraph.child_entities
+        following: int = sentences.index(sentence) + 1
+        if following == len(sentences):
+            return None
+        tail = Paragraph(self._chapter, self._chapter.graph, paragraph.first_line_indent, paragraph)
+        tail.append_sentences_from(paragraph, following)
+        return tail
+
+    def _append_sentences(self, sentences: List[List[str]]) -> int:
+        """Append the sentences to the paragraph being built, and return the area of their tokens"""
+        if self._paragraph is None or self._font is None:
+            raise ValueError("the bulk insert has not started")
+        tokens: List[Tok] = append_sentences(self._paragraph, sentences, self._font)
+        self._token_count += len(tokens)
+        return sum(tok.measured_width * tok.measured_height for tok in tokens)
+
+    def _finish(self) -> None:
+        """Put the text that was after the caret back after the insertion, tokenize and segment where
+        they meet, and place the caret at the end of the insertion. After a line break, the text after
+        the caret stays a paragraph of its own, and the caret goes to its start."""
+        self._done = True
+        if self._paragraph is None:
+            return
+        last = self._paragraph.last_child()
+        end = last.last_child() if isinstance(last, Sentence) else None
+        if self._tail is not None and isinstance(end, Tok) and end.word == "\n":
+            # the insertion ends with a line break, so the text after the caret starts a paragraph of its own
+            first = self._tail.first_child()
+            start = first.first_child() if isinstance(first, Sentence) else None
+            self._tail = None
+            if isinstance(start, Tok):
+                start.place_cursor_at_word_index(0)
+            self._on_done(self)
+            return
+        if self._tail is not None:
+            first = self._tail.first_child()
+            self._paragraph.append_sentences_from(self._tail)
+            self._tail.zap()
+            self._tail = None
+            if isinstance(last, Sentence) and isinstance(first, Sentence):
+                # the text after the caret continues the sentence that the insertion ends with
+                last.append_tokens_from(first)
+                first.zap()
+        if not isinstance(end, Tok):
+            self._on_done(self)
+            return
+        retokenized: Retokenized = retokenize(end, len(end.word))
+        if retokenized.cursor_token is not None:
+            retokenized.cursor_token.place_cursor_at_word_index(retokenized.cursor_index)
+            resegment(retokenized.cursor_token)
+        self._on_done(self)
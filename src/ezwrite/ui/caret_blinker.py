@@ -0,0 +1,67 @@
+import time
+from typing import List
+
+from ezwrite.ui.tok import AbstractToken
+from ezwrite.utils.timers import Timers
+from ezwrite.utils.tracing import traced
+
+
+class CaretBlinker():
+    """A single timer, owned by the chapter, that blinks the active caret.
+    Only the caret item of the active token is redrawn. While the user is typing or moving
+    the caret, it stays solid; after a long idle period the timer stops, leaving the caret
+    solid, until the next activity restarts it."""
+    COLOURS: List[str] = ["purple", "gold"]
+    BLINK_INTERVAL_MS: int = 370
+    TYPING_PAUSE_S: float = 0.5
+    IDLE_STOP_S: float = 10.0
+
+    def __init__(self, widget: Timers):
+        self._widget = widget
+        self._caret: AbstractToken | None = None
+        self._job_id: str | None = None
+        self._phase: int = 0
+        self._last_activity: float = time.monotonic()
+
+    @property
+    def caret(self) -> AbstractToken | None:
+        return self._caret
+
+    def attach(self, caret: AbstractToken) -> None:
+        """The primary caret has been placed in this token"""
+        self._caret = caret
+        self.activity()
+
+    def detach(self, caret: AbstractToken) -> None:
+        if self._caret is not caret:
+            return
+        self._caret = None
+        self._stop()
+
+    def activity(self) -> None:
+        """The user typed or moved the caret: show it solid, and hold off blinking for a moment"""
+        self._last_activity = time.monotonic()
+        self._phase = 0
+        if self._caret is not None:
+            self._caret.set_cursor_colour(CaretBlinker.COLOURS[0])
+        if self._job_id is None:
+            self._job_id = self._widget.after(CaretBlinker.BLINK_INTERVAL_MS, self._tick)
+
+    def _stop(self) -> None:
+        if self._job_id is not None:
+            self._widget.after_cancel(self._job_id)
+            self._job_id = None
+
+    @traced("caret_blink", "render")
+    def _tick(self) -> None:
+        self._job_id = None
+        if self._caret is None:
+            return
+        idle: float = time.monotonic() - self._last_activity
+        if idle >= CaretBlinker.IDLE_STOP_S:
+            self._caret.set_cursor_colour(CaretBlinker.COLOURS[0])
+            return
+        if idle >= CaretBlinker.TYPING_PAUSE_S:
+            self._phase = (self._phase + 1) % len(CaretBlinker.COLOURS)
+            self._caret.set_cursor_colour(CaretBlinker.COLOURS[self._phase])
+        self._job_id = self._widget.after(CaretBlinker.BLINK_INTERVAL_MS, self._tick)
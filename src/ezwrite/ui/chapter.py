@@ -1,18 +1,37 @@
+import math
+import time
 import tkinter as tk
 from argparse import ArgumentTypeError
-from typing import List, Optional, override
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple, override
 
 from rdflib.graph import Graph
 from rdflib.term import URIRef
 
 from ezwrite.editors.chapter_editor import ChapterEditor
 from ezwrite.editors.ez_editor import EzEditor
-from ezwrite.graph.ezentity import Entity, EntityTraversal
+from ezwrite.editors.retokenizer import Retokenized, retokenize
+from ezwrite.editors.segmenter import resegment
+from ezwrite.editors.tokenizer import iter_paragraphs
+from ezwrite.graph.ezentity import Entity
 from ezwrite.graph.ezproperty import EzProperty
-from ezwrite.ui.key_handler import Key, KeyHandler
-from ezwrite.ui.paragraph import Paragraph, ParagraphContainer
+from ezwrite.layout.metrics import Font
+from ezwrite.layout.spatial_index import HitEdge, VerticalIndex
+from ezwrite.ui.bulk_insert import BulkInsert, append_sentences
+from ezwrite.ui.caret_blinker import CaretBlinker
+from ezwrite.ui.edit_queue import Edit, EditQueue
+from ezwrite.ui.key_handler import Key, KeyHandler, chord
+from ezwrite.ui.layout_scheduler import LayoutScheduler
+from ezwrite.ui.paragraph import Paragraph, ParagraphContainer, TokenHit
+from ezwrite.ui.selection import DocumentPosition, Selection
+from ezwrite.ui.tk_backend import TkBackend
 from ezwrite.ui.tok import AbstractToken, RelativeCursor, Tok
+from ezwrite.ui.views import Backend, ChapterView
 from ezwrite.utils.lock import Lock
+from ezwrite.utils.stats import LatencyStats
+from ezwrite.utils.tracing import traced, tracer
 
 
 class MouseEventCache():
@@ -20,68 +39,141 @@ class MouseEventCache():
     def __init__(self, rel: RelativeCursor, key: Key):
         self.rel = rel
         self.key = key
+        self.serial = key.serial
 
     def same_key(self, key: Key) -> bool:
-        return self.key == key
+        """Key objects are reused, so this is the same press only if the serial has not changed"""
+        return self.key is key and self.serial == key.serial
+
+
+@dataclass
+class ContentChange:
+    """The text of a paragraph changed, or the paragraph was removed. A change is published when
+    the paragraph is first changed after its last layout, so a burst of edits to it is one change
+    until the next layout. Subscribers run on the Tk thread, and should only note the paragraph.
+    Changes are per paragraph, not per sentence: an edit can split, merge and resegment the sentences
+    of its paragraph, so the sentences it touched may be gone by the time a subscriber reads the text.
+    A subscriber that works by sentence, e.g. a SentenceAnalyzer, tells the changed ones by their text."""
+    paragraph: Paragraph
+    removed: bool = False
+
+
+ContentListener = Callable[[ContentChange], None]
 
 class Chapter(ParagraphContainer):
     """The entire canvas of the editor is (at one point in time) a chapter of the book.
     It contains the paragraphs, and the canvas is scrollable."""
-    def __init__(self, frame: tk.Frame, graph: Graph):
-        super().__init__(graph, URIRef("http://persistence.uni-leipzig.org/nlp2rdf/ontologies/nif-core#Chapter"))
+    debug_geometry: bool = False  # cross-check the layout model against Tk after each layout
+    AUTOSCROLL_INTERVAL_MS: int = 50
+    def __init__(self, frame: tk.Frame | None, graph: Graph, backend: Backend | None = None):
+        """The chapter is shown in frame, with Tk widgets, unless another backend is given,
+        e.g. a HeadlessBackend, which needs no frame"""
+        super().__init__(graph,
+                         URIRef("http://persistence.uni-leipzig.org/nlp2rdf/ontologies/nif-core#Chapter"),
+                         TkBackend() if backend is None else backend)
         self._lock: Lock = Lock()
         self._laying_out: bool = True
         self._frame = frame
         self._laying_out = False
         self._graph = graph
-        self._canvas = tk.Canvas(frame, bg="white", cursor="arrow")
-        self._canvas.pack(side="left", fill="both", expand=True)
-        self._canvas.bind("<Configure>", self.on_resize)
+        self._view: ChapterView = self.backend.chapter_view(frame)
+        self._view.bind_resize(self.on_resize)
+        if self._view.widget is not None:
+            self.widget_registry.register(self._view.widget, self)
         self._editor = ChapterEditor()
         self._select_start: MouseEventCache | None = None
         self._select_end: MouseEventCache | None = None
+        self._selection = Selection()
         self._layout_needed = False
-        key_handler = KeyHandler(self._canvas)
-        key_handler.add_handler(self.handle_arrow_click)
-        key_handler.add_handler(self.handle_shift_arrow_click)
-        key_handler.add_handler(self.handle_editing_keys)
-        key_handler.add_handler(self.handle_typed_character)
-        key_handler.add_handler(self.handle_mouse_button_1)
-        key_handler.add_handler(self.handle_mouse_moved_1)
+        self._layout_queue: Deque[Paragraph] = deque()
+        self._layout_queue_stale: bool = True
+        self._changed_paragraphs: List[Paragraph] = []
+        self._restack_needed: bool = True
+        self._layout_scheduler = LayoutScheduler(self._view, self._layout_step)
+        self._paragraph_index: VerticalIndex[Paragraph] = VerticalIndex()
+        self._caret_blinker = CaretBlinker(self._view)
+        self._scroll_region: Tuple[int, int, int, int] = (0, 0, 0, 0)
+        self._autoscroll_job_id: str | None = None
+        self._edit_queue = EditQueue(self._view, self._apply_edit, self._finish_edits)
+        self._bulk_insert: BulkInsert | None = None
+        self._keystroke_at: float | None = None
+        self._content_listeners: List[ContentListener] = []
+        self._generation: int = 0
+        # instrumentation, e.g. for the performance HUD
+        self.layout_stats = LatencyStats()
+        self.last_layout_tokens: int = 0
+        self.keystroke_latency = LatencyStats()
+        self._key_handler: KeyHandler | None = None
+        if isinstance(self._view.widget, tk.Canvas):
+            self._key_handler = self._bind_keys(self._view.widget)
+
+    def _bind_keys(self, canvas: tk.Canvas) -> KeyHandler:
+        key_handler = KeyHandler(canvas)
+        for keysym in ('Left', 'Right', 'Up', 'Down', 'Prior', 'Next'):
+            key_handler.bind(chord(keysym), self.handle_arrow_click)
+            key_handler.bind(chord(keysym, ["Shift"]), self.handle_shift_arrow_click)
+        key_handler.bind(chord("BackSpace"), self.handle_editing_keys)
+        key_handler.set_fallback(self.handle_typed_character)
+        for modifier in ("Control", "Meta"):
+            key_handler.bind(chord("v", [modifier]), self.handle_paste)
+        key_handler.bind(chord("<Button-1>"), self.handle_mouse_button_1)
+        key_handler.bind(chord("<B1-Motion>"), self.handle_drag_1)
+        return key_handler
 
     @override
     def is_container(self) -> bool:
         return True
 
+    @property
+    def generation(self) -> int:
+        """Counts the changes to the text, so that a copy of it made in slices, e.g. by an export,
+        can tell whether it changed between two slices"""
+        return self._generation
+
+    @override
+    def mark_dirty(self) -> None:
+        self._generation += 1
+        super().mark_dirty()
+
     @override
     @property
     def x(self) -> int:
-        return self._canvas.winfo_x()
+        return self._view.x
 
     @override
     @property
     def y(self) -> int:
-        return self._canvas.winfo_y()
+        return self._view.y
+
+    @override
+    @property
+    def doc_x(self) -> int:
+        return 0
+
+    @override
+    @property
+    def doc_y(self) -> int:
+        return 0
 
     @override
     @property
     def root_x(self) -> int:
-        return self._canvas.winfo_rootx()
+        return self._view.root_x
 
     @override
     @property
     def root_y(self) -> int:
-        return self._canvas.winfo_rooty()
+        return self._view.root_y
 
     @override
     @property
     def width(self) -> int:
-        return self._canvas.winfo_width()
+        return self._view.width
 
     @override
     @property
     def height(self) -> int:
-        return self._canvas.winfo_height()
+        return self._view.height
 
     @property
     @override
@@ -90,28 +182,88 @@ class Chapter(ParagraphContainer):
 
     @property
     @override
+    def view(self) -> ChapterView:
+        return self._view
+
+    @property
     def canvas(self) -> tk.Canvas:
-        return self._canvas
+        """The canvas of a chapter that is shown with Tk"""
+        canvas = self._view.widget
+        if not isinstance(canvas, tk.Canvas): raise ValueError("the chapter is not shown with Tk")
+        return canvas
 
     @property
     def graph(self) -> Graph:
         return self._graph
 
-    def handle_mouse_moved_1(self, _event: tk.Event, keys: List[Key]) -> bool:
+    @property
+    def key_handler(self) -> KeyHandler:
+        if self._key_handler is None: raise ValueError("the chapter is not shown with Tk")
+        return self._key_handler
+
+    def handle_drag_1(self, event: tk.Event, keys: List[Key]) -> bool:
+        """Button 1 is held and the pointer moved: extend the selection, and auto-scroll"""
+        self.handle_mouse_button_1(event, keys)
+        return self.handle_mouse_moved_1(event, keys)
+
+    def handle_mouse_moved_1(self, event: tk.Event, keys: List[Key]) -> bool:
         if len(keys) != 1:
             return False
         key = keys[0]
         if key.keysym != "<Button-1>" or not key.moved:
             return False
-        print(f"mouse moved {key.x2},{key.y2}")
+        entity = self.widget_inside(key.widget)
+        if entity is None:
+            return True
+        (_, y) = self._to_document(entity, key.x2, key.y2)
+        self._autoscroll(event, y)
         return True
 
-    @staticmethod
-    def select_token(ent: Entity) -> None:
-        if not isinstance(ent, Tok):
+    def _autoscroll(self, event: tk.Event, doc_y: int) -> None:
+        """Keep scrolling while a drag is above or below the viewport"""
+        if self._scroll_direction(doc_y) == 0:
+            if self._autoscroll_job_id is not None:
+                self._view.after_cancel(self._autoscroll_job_id)
+                self._autoscroll_job_id = None
+            return
+        if self._autoscroll_job_id is None:
+            self._autoscroll_job_id = self._view.after(Chapter.AUTOSCROLL_INTERVAL_MS, self._autoscroll_step, event)
+
+    def _scroll_direction(self, doc_y: int) -> int:
+        if doc_y < self._view.view_top:
+            return -1
+        if doc_y >= self._view.view_top + self._view.height:
+            return 1
+        return 0
+
+    def _autoscroll_step(self, event: tk.Event) -> None:
+        self._autoscroll_job_id = None
+        if len(self.key_handler.keys) != 1:
             return
-        tok: Tok = ent
-        tok.select()
+        key: Key = self.key_handler.keys[0]
+        entity = self.widget_inside(key.widget)
+        if key.released or entity is None:
+            return
+        canvas: tk.Canvas = self.canvas
+        pointer_x: int = canvas.winfo_pointerx() - canvas.winfo_rootx()
+        pointer_y: int = canvas.winfo_pointery() - canvas.winfo_rooty()
+        direction: int = self._scroll_direction(int(canvas.canvasy(pointer_y)))
+        if direction == 0:
+            return
+        canvas.yview_scroll(direction, "units")
+        # the pointer stayed still while the view scrolled, so it is now over another part of the document
+        doc_x: int = int(canvas.canvasx(pointer_x))
+        doc_y: int = int(canvas.canvasy(pointer_y))
+        (origin_x, origin_y) = self._to_document(entity, 0, 0)
+        key.x2 = doc_x - origin_x
+        key.y2 = doc_y - origin_y
+        self.key_handler.replay_motion(event)
+
+    def _to_document(self, entity: Entity, x: int, y: int) -> Tuple[int, int]:
+        """Convert event coordinates, relative to the entity's widget, to document coordinates"""
+        if entity is self:
+            return (self._view.view_left + x, self._view.view_top + y)
+        return (entity.doc_x + x, entity.doc_y + y)
 
     def handle_mouse_button_1(self, _event: tk.Event, keys: List[Key]) -> bool:
         if len(keys) != 1:
@@ -121,9 +273,10 @@ class Chapter(ParagraphContainer):
         if key.keysym != "<Button-1>":
             return False
 
+        self._edit_queue.flush()
         entity = self.widget_inside(key.widget)
         if not entity:
-            print(f"location outside: x={key.x1}, y={key.y1}")
+            tracer.instant("press outside the document", "input")
             return False
 
         self._select_end = None
@@ -159,162 +312,151 @@ class Chapter(ParagraphContainer):
                       entity: Entity,
                       key: Key
                       ) -> Optional[RelativeCursor]:
-        """Return (token, relative_cursor, paragraph) or (None, None, None)."""
-        tok: Tok
-        if isinstance(entity, (Chapter, Paragraph)):
-            print(f"paragraph: x={key.x1}, y={key.y1}")
-            ex = entity.root_x + key.x1
-            ey = entity.root_y + key.y1
-            closest = entity.get_closest_token(ex, ey)
-            if closest is None or not isinstance(closest, Tok):
-                print("Could not find token close to paragraph")
-                return None
-            tok = closest
-            if tok == tok.parent.first_child():
-                rel_press = tok.calculate_cursor_x(0)
-            elif tok == tok.parent.last_child():
-                rel_press = tok.calculate_cursor_x(tok.width)
-            else:
-                rel_press = tok.calculate_cursor_x(ex - tok.root_x)
-        elif isinstance(entity, Tok):
-            tok = entity
-            print(f"token: {tok.word} x={key.x1}, y={key.y1}")
-            if tok.parent is None:
-                print("parent of Tok cannot be None")
-                return None
-            parent = tok.parent.parent  # Paragraph
-            if parent is None or not isinstance(parent, Paragraph):
-                print("grandparent of Tok must be a Paragraph")
-                return None
-            rel_press = tok.calculate_cursor_x(key.x1)
-        else:
-            print("Could not find entity near press")
+        """Return the cursor position where the mouse was pressed, or None"""
+        if not isinstance(entity, (Chapter, Paragraph, Tok)):
+            tracer.instant("no entity near press", "input")
             return None
-
-        return rel_press
+        (ex, ey) = self._to_document(entity, key.x1, key.y1)
+        hit = self.hit_test(ex, ey)
+        if hit is None:
+            tracer.instant("no token near press", "input")
+            return None
+        return Chapter._cursor_at_hit(hit, ex)
 
     def _handle_release(self,
                         entity: Entity,
                         key: Key
                         ) -> Optional[RelativeCursor]:
         """Return rel_release or None (meaning early exit but no error)."""
-        tok_release: Tok
-        if isinstance(entity, (Chapter, Paragraph)):
-            print(f"paragraph release: x={key.x2}, y={key.y2}")
-            ex = entity.root_x + key.x2
-            ey = entity.root_y + key.y2
-            closest = self.get_closest_token(ex, ey)
-            if closest is None or not isinstance(closest, Tok):
-                print("No token near paragraph on release")
-                return None
-            tok_release = closest
-            if tok_release == tok_release.parent.first_child():
-                return tok_release.calculate_cursor_x(0)
-            if tok_release == tok_release.parent.last_child():
-                return tok_release.calculate_cursor_x(tok_release.width)
-            return tok_release.calculate_cursor_x(ex - tok_release.root_x)
-
-        # entity is a Tok
-        if not isinstance(entity, Tok) or entity.parent is None:
-            print("entity must be Tok or Paragraph, and parent of Tok cannot be None")
+        if not isinstance(entity, (Chapter, Paragraph, Tok)):
+            tracer.instant("no entity near release", "input")
             return None
-
-        canvas = entity.canvas
-        ex = canvas.winfo_rootx() + key.x2
-        ey = canvas.winfo_rooty() + key.y2
-        ent_release = self.get_closest_token(ex, ey)
-        if ent_release is None or not isinstance(ent_release, Tok):
-            print("Could not find closest token on release")
+        # Tk reports the release relative to the widget where the button was pressed
+        (ex, ey) = self._to_document(entity, key.x2, key.y2)
+        hit = self.hit_test(ex, ey)
+        if hit is None:
+            tracer.instant("no token near release", "input")
             return None
+        return Chapter._cursor_at_hit(hit, ex)
 
-        tok_release = ent_release
-        rel_x = ex - tok_release.canvas.winfo_rootx()
-        return tok_release.calculate_cursor_x(rel_x)
+    @staticmethod
+    def _cursor_at_hit(hit: TokenHit, x: int) -> RelativeCursor:
+        """A point before a token puts the cursor at its start, a point after it at its end"""
+        tok: Tok = hit.token
+        match hit.edge:
+            case HitEdge.BEFORE:
+                return tok.calculate_cursor_x(0)
+            case HitEdge.AFTER:
+                return tok.calculate_cursor_x(tok.width)
+        return tok.calculate_cursor_x(x - tok.doc_x)
 
     def _apply_selection(self) -> bool:
-        """Apply selection logic between _select_start and _select_end."""
-        self.deselect_all()
-
+        """Move the selection to run from _select_start to _select_end."""
         if self._select_end is None or self._select_start is None:
+            self._selection.clear()
             return False
+        self._selection.set(
+            DocumentPosition(self._select_start.rel.token, self._select_start.rel.word_index),
+            DocumentPosition(self._select_end.rel.token, self._select_end.rel.word_index)
+        )
+        return True
 
-        if self._select_end.rel.token == self._select_start.rel.token:
-            if self._select_end.rel.word_index == self._select_start.rel.word_index:
-                return True
-            if self._select_end.rel.word_index < self._select_start.rel.word_index:
-                self._select_start.rel.token.select(self._select_end.rel.word_index, self._select_start.rel.word_index)
-            else:
-                self._select_start.rel.token.select(self._select_start.rel.word_index, self._select_end.rel.word_index)
-        else:
-            traversal = EntityTraversal(self._select_start.rel.token, self._select_end.rel.token, Chapter.select_token)
-            traversal.traverse_leaf_entities_between(self)
-            if traversal.ent_first != self._select_start.rel.token:
-                self._select_end.rel.token.select(self._select_end.rel.word_index, -1)
-                self._select_start.rel.token.select(0, self._select_start.rel.word_index)
-            else:
-                self._select_start.rel.token.select(self._select_start.rel.word_index, -1)
-                self._select_end.rel.token.select(0, self._select_end.rel.word_index)
+    def get_selected(self) -> Iterator[Tok]:
+        return self._selection.tokens()
 
-        return True
+    def select(self, anchor: DocumentPosition, head: DocumentPosition) -> None:
+        """Select the text between two positions, e.g. from a script"""
+        self._selection.set(anchor, head)
+
+    @traced("hit_test", "layout")
+    def hit_test(self, x: int, y: int) -> Optional[TokenHit]:
+        """Find the token at or nearest to (x, y), in document coordinates. The paragraph is found
+        by binary search over the paragraph tops, then the paragraph searches its line boxes."""
+        if self._layout_scheduler.pending:
+            self.layout()
+        index: int = self._paragraph_index.find(y)
+        if index < 0:
+            return None
+        return self._paragraph_index.item(index).hit_test(x, y)
 
     def get_closest_token(self, x: int, y: int) -> Entity | None:
-        closest_dd: int = 0
-        closest: Tok | None = None
-        for child in self.child_entities:
-            if not isinstance(child, Paragraph):
-                continue
-            paragraph: Paragraph = child
-            ent = paragraph.get_closest_token(x, y)
-            if ent is not None and isinstance(ent, Tok):
-                tok: Tok = ent
-                if tok.inside(x, y):
-                    return tok
-                dx = x - tok.root_x + tok.width // 2
-                dy = y - tok.root_y + tok.height // 2
-                dd = dx * dx + dy * dy
-                # if it is closer than the last one
-                if closest is None or dd < closest_dd:
-                    closest = tok
-                    closest_dd = dd
-        return closest
+        hit: TokenHit | None = self.hit_test(x, y)
+        if hit is None:
+            return None
+        return hit.token
+
+    @override
+    def cursor_on_line(self, tok: Tok, line_offset: int, x: int) -> Optional[RelativeCursor]:
+        """Step line_offset lines from the line of tok, through the line boxes of its paragraph
+        and, past its first or last line, of the paragraphs above or below it. Then find the
+        token at x on that line by binary search."""
+        if self._layout_scheduler.pending:
+            self.layout()
+        paragraph: Entity | None = tok.parent.parent if tok.parent is not None else None
+        if not isinstance(paragraph, Paragraph):
+            return None
+        line: int = paragraph.line_of(tok)
+        index: int = paragraph.stack_index
+        if line < 0 or index < 0:
+            return None
+        line += line_offset
+        while line < 0:
+            index -= 1
+            if index < 0:
+                return None
+            paragraph = self._paragraph_index.item(index)
+            line += paragraph.line_count
+        while line >= paragraph.line_count:
+            line -= paragraph.line_count
+            index += 1
+            if index >= len(self._paragraph_index):
+                return None
+            paragraph = self._paragraph_index.item(index)
+        return Chapter._cursor_at_hit(paragraph.hit_test_line(line, x), x)
+
+    def move_by_pages(self, tok: Tok, pages: int) -> Optional[Tok]:
+        """Page Up and Page Down: scroll by the height of the viewport, and move the cursor
+        by the same distance, keeping its x position"""
+        height: int = self._view.height
+        x: int = tok.doc_x + tok.cursor_pos.x
+        y: int = tok.doc_y + tok.cursor_pos.y + pages * height
+        self._scroll_to(self._view.view_top + pages * height)
+        hit: TokenHit | None = self.hit_test(x, y)
+        if hit is None:
+            return None
+        rel: RelativeCursor = Chapter._cursor_at_hit(hit, x)
+        rel.token.place_cursor_at_word_index_and_x_position(rel.word_index, rel.x)
+        return rel.token
+
+    def scroll_to_show(self, tok: Tok) -> None:
+        """Scroll the least distance that brings tok into the viewport"""
+        top: int = self._view.view_top
+        height: int = self._view.height
+        if tok.doc_y < top:
+            self._scroll_to(tok.doc_y)
+        elif tok.doc_y + tok.height > top + height:
+            self._scroll_to(tok.doc_y + tok.height - height)
+
+    def _scroll_to(self, top: int) -> None:
+        scroll_height: int = self._scroll_region[3]
+        if scroll_height <= 0:
+            return
+        top = min(max(top, 0), max(scroll_height - self._view.height, 0))
+        self._view.scroll_to(top)
 
     def handle_arrow_click(self, event: tk.Event, keys: List[Key]) -> bool:
-        if len(keys) != 1:
-            return False
-        keysym: str = keys[0].keysym
-        if keysym not in ('Left', 'Right', 'Up', 'Down'):
-            return False
+        self._edit_queue.flush()
+        keysym: str = keys[-1].keysym
         entity: Entity | None = self.widget_inside(event.widget)
         if entity is None:
             return False
         if not isinstance(entity, Tok):
             return False
-        tok: Tok = entity
-        match keysym:
-            case "Left":
-                tok.move_left()
-            case "Right":
-                tok.move_right()
-            case "Up":
-                tok.move_up()
-            case "Down":
-                tok.move_down()
+        self._move_cursor(entity, keysym)
         return True
 
-    def handle_shift_arrow_click(self, event: tk.Event, keys: List[Key]) -> bool:
-        if not (len(keys) == 2 and keys[0].keysym in ["Shift_L", "Shift_R"]):
-            return False
-        key = keys[1]
-        keysym: str = key.keysym
-        if keysym not in ('Left', 'Right', 'Up', 'Down'):
-            return False
-        entity: Entity | None = self.widget_inside(event.widget)
-        if entity is None:
-            return False
-        if not isinstance(entity, Tok):
-            return False
-        tok: Tok = entity
-        moved_to: Tok | None
+    def _move_cursor(self, tok: Tok, keysym: str) -> Optional[Tok]:
+        moved_to: Tok | None = None
         match keysym:
             case "Left":
                 moved_to = tok.move_left()
@@ -324,59 +466,199 @@ class Chapter(ParagraphContainer):
                 moved_to = tok.move_up()
             case "Down":
                 moved_to = tok.move_down()
-        if moved_to is None:
-            return True
-
-        rel = RelativeCursor(moved_to.cursor_pos.x, moved_to.cursor_index, moved_to)
-        self._select_end = MouseEventCache(rel, key)
-        self._apply_selection()
-        return True
+            case "Prior":
+                moved_to = self.move_by_pages(tok, -1)
+            case "Next":
+                moved_to = self.move_by_pages(tok, 1)
+        if moved_to is not None:
+            self.scroll_to_show(moved_to)
+        return moved_to
 
-    def handle_editing_keys(self, event: tk.Event, keys: List[Key]) -> bool:
+    def handle_shift_arrow_click(self, event: tk.Event, keys: List[Key]) -> bool:
+        self._edit_queue.flush()
+        keysym: str = keys[-1].keysym
         entity: Entity | None = self.widget_inside(event.widget)
         if entity is None:
             return False
         if not isinstance(entity, Tok):
             return False
         tok: Tok = entity
-        if len(keys) == 1 and keys[0].keysym == "BackSpace":
-            selected = self.get_selected()
-            if len(selected) > 0:
-                for tok in selected:
-                    tok.editor.delete_selected(tok)
-                self.cleanup_empty_containers()
-                self.layout_if_needed()
-                return True
-            if tok.editor.delete_character_left(tok):
-                self.cleanup_empty_containers()
-                self.layout_if_needed()
-                return True
+        anchor: DocumentPosition | None = self._selection.anchor
+        if anchor is None or self._selection.is_empty:
+            anchor = DocumentPosition(tok, tok.cursor_word_index)
+        moved_to: Tok | None = self._move_cursor(tok, keysym)
+        if moved_to is None:
+            return True
+
+        self._selection.set(anchor, DocumentPosition(moved_to, moved_to.cursor_word_index))
+        return True
+
+    @traced("editing_keys", "editor")
+    def handle_editing_keys(self, _event: tk.Event, keys: List[Key]) -> bool:
+        if keys[-1].keysym == "BackSpace":
+            if self.caret_owner is not None:
+                self._keystroke_received()
+            return self.backspace()
         return False
 
-    def handle_typed_character(self, event: tk.Event, keys: List[Key]) -> bool:
-        if len(keys) != 1:
+    def backspace(self) -> bool:
+        """Delete the selection, or else the character left of the caret"""
+        # edits apply at the caret, which is still there when a queued edit has removed the
+        # token that had the focus when the key event was sent
+        if self.caret_owner is None:
             return False
-        keysym: str = keys[0].keysym
-        entity: Entity | None = self.widget_inside(event.widget)
-        if entity is None:
+        if self._selection.is_empty:
+            # held down, BackSpace repeats faster than a long document can be edited and laid out
+            self._edit_queue.push("delete_left")
+            return True
+        self._delete_selection()
+        self._finish_edits()
+        return True
+
+    def _delete_selection(self) -> None:
+        self._edit_queue.flush()
+        self.finish_bulk_insert()
+        # the text either side of the selection comes together, and may need tokenizing again
+        start: DocumentPosition | None = self._selection.start
+        before: Entity | None = None
+        index: int = 0
+        if start is not None and start.word_index > 0:
+            before = start.token
+            index = start.word_index
+        elif start is not None:
+            before = start.token.previous_peer()
+            index = len(before.word) if isinstance(before, Tok) else 0
+        end: DocumentPosition | None = self._selection.end
+        after: Entity | None = end.token.next_peer() if end is not None else None
+        for tok in list(self.get_selected()):
+            tok.editor.delete_selected(tok)
+        self._selection.forget()
+        if self.caret_owner is None and isinstance(after, Tok):
+            # the selection took the caret, from the start of the document
+            after.place_cursor_at_word_index(0)
+        if isinstance(before, Tok):
+            # merge the sentences either side of the gap first: the tokens to join may be in both,
+            # and retokenize only looks within a sentence
+            resegment(before)
+            retokenized: Retokenized = retokenize(before, index)
+            if retokenized.cursor_token is not None:
+                retokenized.cursor_token.place_cursor_at_word_index(retokenized.cursor_index)
+                resegment(retokenized.cursor_token)
+
+    def _apply_edit(self, edit: Edit) -> None:
+        """Apply a queued editing command at the primary caret"""
+        self.finish_bulk_insert()
+        tok: AbstractToken | None = self.caret_owner
+        if not isinstance(tok, Tok):
+            return
+        match edit.command:
+            case "delete_left":
+                for _ in range(edit.count):
+                    if not tok.editor.delete_character_left(tok):
+                        return
+                    tok = self.caret_owner
+                    if not isinstance(tok, Tok):
+                        return
+            case "insert":
+                tok.editor.insert_text(tok, edit.text)
+
+    def _finish_edits(self) -> None:
+        """Remove the containers that the edits emptied, and lay out what they changed.
+        Only the changed paragraphs are cleaned up, so this does not walk the whole chapter."""
+        for paragraph in list(self._changed_paragraphs):
+            if paragraph in self._changed_paragraphs:  # not already removed by an earlier cleanup
+                paragraph.cleanup_empty_containers()
+        self.layout_if_needed()
+        if self._keystroke_at is not None:
+            self._view.after_idle(self._keystroke_painted, self._keystroke_at, False)
+            self._keystroke_at = None
+
+    def _keystroke_received(self) -> None:
+        """Time from the first key whose edit is not painted yet"""
+        if self._keystroke_at is None:
+            self._keystroke_at = time.perf_counter()
+
+    def _keystroke_painted(self, received_at: float, redrawn: bool) -> None:
+        """Record the latency from a key event to the paint of its edit. Tk redraws in the idle pass
+        after the layout, so this waits for the layout to finish, then for one more idle pass."""
+        if self._layout_scheduler.pending:
+            self._view.after(1, self._keystroke_painted, received_at, False)
+        elif not redrawn:
+            self._view.after_idle(self._keystroke_painted, received_at, True)
+        else:
+            self.keystroke_latency.record(time.perf_counter() - received_at)
+
+    def handle_typed_character(self, _event: tk.Event, keys: List[Key]) -> bool:
+        if self.caret_owner is not None:
+            self._keystroke_received()
+        return self.type_text(keys[-1].char)
+
+    def type_text(self, text: str) -> bool:
+        """Insert text at the caret, as if it was typed, replacing the selection"""
+        if self.caret_owner is None:
             return False
-        if not isinstance(entity, Tok):
+        if not self._selection.is_empty:
+            self._delete_selection()  # typing replaces the selection
+        self._edit_queue.push("insert", text)
+        return True
+
+    def handle_paste(self, _event: tk.Event, _keys: List[Key]) -> bool:
+        try:
+            text: str = self.canvas.clipboard_get()
+        except tk.TclError:
+            return False  # nothing on the clipboard, or not text
+        return self.paste(text)
+
+    def paste(self, text: str) -> bool:
+        """Insert text at the caret, replacing the selection. A long text is built into the document
+        in batches, see BulkInsert, and the caret moves to its end when the last batch is built."""
+        if self.caret_owner is None or text == "":
             return False
-        tok: Tok = entity
-        # TODO: finish this
-        return False
+        self._edit_queue.flush()
+        self.finish_bulk_insert()
+        if not self._selection.is_empty:
+            self._delete_selection()
+        tok: AbstractToken | None = self.caret_owner
+        if not isinstance(tok, Tok):
+            return False
+        self._bulk_insert = BulkInsert(self,
+                                       iter_paragraphs(text.replace("\r\n", "\n")),
+                                       self._finish_edits,
+                                       self._bulk_insert_done,
+                                       self._view.width * self._view.height)
+        self._bulk_insert.start(tok, tok.cursor_word_index)
+        return True
+
+    def append_paragraphs(self,
+                          paragraphs: Iterable[List[List[str]]],
+                          first_line_indent: int = 0,
+                          font: Font = None) -> None:
+        """Build paragraphs of sentences of token words at the end of the chapter, e.g. a batch of an import"""
+        if font is None:
+            font = self.backend.metrics.default_font()
+        for sentences in paragraphs:
+            append_sentences(Paragraph(self, self._graph, first_line_indent), sentences, font)
+        self.layout_if_needed()
+
+    def flush_edits(self) -> None:
+        """Apply the queued edits and build the rest of a bulk insert now, e.g. before the document is exported"""
+        self._edit_queue.flush()
+        self.finish_bulk_insert()
+
+    def finish_bulk_insert(self) -> None:
+        """Build the rest of a bulk insert now, e.g. before an edit, which must apply to the whole text"""
+        if self._bulk_insert is not None:
+            self._bulk_insert.finish_now()
+
+    def _bulk_insert_done(self, bulk_insert: BulkInsert) -> None:
+        if self._bulk_insert is bulk_insert:
+            self._bulk_insert = None
+        if tracer.enabled:
+            tracer.instant("bulk insert done", "editor",
+                           {"paragraphs": bulk_insert.paragraph_count, "tokens": bulk_insert.token_count})
 
     def widget_inside(self, widget: tk.Misc) -> Entity | None:
-        for child in self.child_entities:
-            if not isinstance(child, Paragraph):
-                continue
-            paragraph: Paragraph = child
-            entity: Entity | None = paragraph.widget_inside(widget)
-            if entity is not None:
-                return entity
-        if self._canvas == widget:
-            return self
-        return None
+        return self.widget_registry.lookup(widget)
 
     @override
     def add_child_entity(self, child: Entity) -> None:
@@ -384,38 +666,168 @@ class Chapter(ParagraphContainer):
             raise ArgumentTypeError("token_container needs to be an instance of Sentence")
         paragraph: Paragraph = child
         self._property_list.append(EzProperty.HAS_PART, paragraph)
+        self._layout_queue_stale = True
+        self._generation += 1
 
     @override
-    def remove_cursor_except(self, tok: AbstractToken) -> None:
-        for child in self.child_entities:
-            if not isinstance(child, Paragraph): raise ArgumentTypeError("children need to be instances of Paragraph")
-            paragraph: Paragraph = child
-            paragraph.remove_cursor_except(tok)
+    def insert_paragraph_after(self, reference: Paragraph, paragraph: Paragraph) -> None:
+        self._property_list.insert_after(reference, EzProperty.HAS_PART, paragraph)
+        self._layout_queue_stale = True
+        self._generation += 1
+
+    @override
+    def paragraph_after(self, paragraph: Paragraph) -> Optional[Paragraph]:
+        """Once the layout has caught up with the edits, every paragraph with text is stacked,
+        and the next one is found by the stacked index rather than by searching the paragraphs"""
+        index: int = paragraph.stack_index
+        if self._stack_is_current and index >= 0 and self._paragraph_index.item(index) is paragraph:
+            return self._paragraph_index.item(index + 1) if index + 1 < len(self._paragraph_index) else None
+        following: Entity | None = self.get_next_child(paragraph)
+        return following if isinstance(following, Paragraph) else None
+
+    @property
+    def _stack_is_current(self) -> bool:
+        return (not self._layout_queue_stale and not self._restack_needed
+                and len(self._layout_queue) == 0 and len(self._changed_paragraphs) == 0)
+
+    @override
+    def paragraph_changed(self, paragraph: Paragraph) -> None:
+        self._changed_paragraphs.append(paragraph)
+        self._publish(ContentChange(paragraph))
 
-    def on_resize(self, event: tk.Event) -> None:
-        """Called when the canvas is resized."""
-        print(f"Canvas resized to {event.width}x{event.height} width = {self._canvas.winfo_width()}")
+    def subscribe(self, listener: ContentListener) -> None:
+        """Call listener with each ContentChange, e.g. to analyse the text in the background"""
+        self._content_listeners.append(listener)
 
-        self.layout()
+    def unsubscribe(self, listener: ContentListener) -> None:
+        self._content_listeners.remove(listener)
+
+    def _publish(self, change: ContentChange) -> None:
+        for listener in self._content_listeners:
+            listener(change)
+
+    @override
+    def caret_placed(self, tok: AbstractToken) -> None:
+        self._caret_blinker.attach(tok)
+
+    @override
+    def remove_caret(self, tok: AbstractToken) -> None:
+        super().remove_caret(tok)
+        self._caret_blinker.detach(tok)
+
+    def on_resize(self) -> None:
+        """Called when the canvas is resized. A window drag produces many of these, so the
+        layout is only scheduled, and all the resizes until the next idle cycle share one pass."""
+        self._layout_queue_stale = True
+        self.schedule_layout()
 
     @override
     def layout(self) -> None:
+        """Finish the pending layout now, without a time budget"""
         self._layout_needed = False
+        self._dirty = False
+        self._layout_scheduler.cancel()
+        if not self._layout_step(math.inf):
+            self._layout_scheduler.request()
+
+    @traced("layout_step", "layout")
+    def _layout_step(self, deadline: float) -> bool:
+        """Reflow queued paragraphs until the deadline, then stack the paragraph frames if any
+        paragraph changed its height. After an edit only the changed paragraphs are queued,
+        and the frames are only stacked again when the edit changed how a paragraph wraps.
+        Return True when there is nothing left to reflow."""
         with self._lock:
             if self._laying_out:
-                return
+                return False
             self._laying_out = True
 
-        canvas_width: int = self._canvas.winfo_width()
+        started: float = time.perf_counter()
+        laid_out_tokens: int = 0
+        canvas_width: int = self._view.width
+        if self._layout_queue_stale:
+            self._rebuild_layout_queue(canvas_width)
+            self._restack_needed = True
+        else:
+            self._layout_queue.extend(self._changed_paragraphs)
+        self._changed_paragraphs = []
+        while len(self._layout_queue) > 0:
+            paragraph: Paragraph = self._layout_queue.popleft()
+            if paragraph.needs_reflow(canvas_width):
+                height: int = paragraph.laid_out_height
+                if paragraph.reflow(canvas_width) != height:
+                    self._restack_needed = True
+                laid_out_tokens += paragraph.laid_out_token_count
+            if time.perf_counter() >= deadline:
+                break
+        restacked: bool = self._restack_needed
+        if self._restack_needed:
+            self._restack_needed = False
+            self._stack_paragraphs(canvas_width)
+        if laid_out_tokens > 0 or restacked:
+            self.layout_stats.record(time.perf_counter() - started)
+            self.last_layout_tokens = laid_out_tokens
+
+        with self._lock:
+            self._laying_out = False
+        done: bool = len(self._layout_queue) == 0
+        if done and Chapter.debug_geometry:
+            self.check_geometry()
+        return done
+
+    def check_geometry(self) -> List[str]:
+        """Compare the geometry recorded by layout with what Tk reports, and print any mismatch.
+        This makes Tk do the pending geometry management first, so it is only for debugging."""
+        self._view.sync()
+        mismatches: List[str] = []
+        for child in self.child_entities:
+            if not isinstance(child, Paragraph): raise ArgumentTypeError("children need to be instances of Paragraph")
+            paragraph: Paragraph = child
+            mismatches.extend(paragraph.geometry_mismatches())
+        for mismatch in mismatches:
+            print(f"geometry mismatch: {mismatch}")
+        return mismatches
+
+    def _rebuild_layout_queue(self, canvas_width: int) -> None:
+        """Queue the paragraphs that need a reflow, the visible ones first"""
+        view_top: int = self._view.view_top
+        view_bottom: int = view_top + self._view.height
+        visible: List[Paragraph] = []
+        hidden: List[Paragraph] = []
+        for child in self.child_entities:
+            if not isinstance(child, Paragraph): raise ArgumentTypeError("children need to be instances of Paragraph")
+            paragraph: Paragraph = child
+            if not paragraph.needs_reflow(canvas_width):
+                continue
+            top: int = paragraph.box.y
+            if top < view_bottom and top + paragraph.laid_out_height >= view_top:
+                visible.append(paragraph)
+            else:
+                hidden.append(paragraph)
+        self._layout_queue = deque(visible)
+        self._layout_queue.extend(hidden)
+        self._layout_queue_stale = False
+
+    @traced("stack_paragraphs", "layout")
+    def _stack_paragraphs(self, canvas_width: int) -> None:
+        """Position the paragraph frames one below the other, index them by y,
+        and make the scroll region fit them"""
+        stacked: List[Tuple[int, Paragraph]] = []
         frame_y_offset: int = 0
         for child in self.child_entities:
             if not isinstance(child, Paragraph): raise ArgumentTypeError("children need to be instances of Paragraph")
             paragraph: Paragraph = child
-            frame_height: int = paragraph.layout(frame_y_offset, canvas_width)
-            frame_y_offset += frame_height + paragraph.max_tok_height
-
-        with self._lock:
-            self._laying_out = False
+            paragraph.place_frame(frame_y_offset)
+            if paragraph.laid_out_height > 0:
+                paragraph.set_stack_index(len(stacked))
+                stacked.append((frame_y_offset, paragraph))
+            else:
+                paragraph.set_stack_index(-1)
+            frame_y_offset += paragraph.laid_out_height + paragraph.max_tok_height
+        self._paragraph_index.rebuild(stacked)
+        scroll_region: Tuple[int, int, int, int] = (0, 0, canvas_width, frame_y_offset)
+        if scroll_region != self._scroll_region:
+            self._view.set_scroll_region(canvas_width, frame_y_offset)
+            self._scroll_region = scroll_region
 
     @property
     @override
@@ -427,23 +839,25 @@ class Chapter(ParagraphContainer):
     def child_entities(self) -> List[Entity]:
         return self._property_list.entities_of(EzProperty.HAS_PART, Paragraph)
 
-    @override
-    def deselect_all(self) -> None:
-        for child in self.child_entities:
-            if not isinstance(child, Paragraph):
-                continue
-            paragraph: Paragraph = child
-            paragraph.deselect_all()
-
     def layout_if_needed(self) -> None:
-        if self._layout_needed:
-            self.layout()
+        if self._layout_needed or self.dirty:
+            self.schedule_layout()
 
     @override
     def set_layout_needed(self) -> None:
         self._layout_needed = True
 
     def schedule_layout(self) -> None:
-        self._layout_needed = True
-        root = self._canvas.winfo_toplevel()
-        root.after(10, self.layout_if_needed)
\ No newline at end of file
+        """Coalesce this request with any others into one layout pass in the next idle cycle"""
+        self._layout_needed = False
+        self._dirty = False
+        self._layout_scheduler.request()
+
+    @override
+    def remove_child_entity(self, child: Entity) -> bool:
+        removed: bool = super().remove_child_entity(child)
+        self._changed_paragraphs = [paragraph for paragraph in self._changed_paragraphs if paragraph is not child]
+        self._layout_queue_stale = True
+        if removed and isinstance(child, Paragraph):
+            self._publish(ContentChange(child, True))
+        return removed
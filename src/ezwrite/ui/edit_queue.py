@@ -0,0 +1,66 @@
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import List
+
+from ezwrite.utils.timers import Timers
+from ezwrite.utils.tracing import traced
+
+
+@dataclass
+class Edit:
+    """A run of the same editing command. Repeats of a command add to the count,
+    and consecutive insertions add to the text."""
+    command: str
+    count: int = 1
+    text: str = ""
+
+
+class EditQueue():
+    """Editing commands from key events, e.g. an auto-repeated BackSpace, are queued and applied
+    as one batch per frame. Repeats of a command are counted rather than queued one by one, and
+    the batch applies each command as many times as it was pushed, then calls finish once, so
+    the cleanup and the layout happen once per batch rather than once per key event."""
+    FRAME_INTERVAL_S: float = 0.016
+
+    def __init__(self, widget: Timers, apply: Callable[[Edit], None], finish: Callable[[], None]):
+        self._widget = widget
+        self._apply = apply
+        self._finish = finish
+        self._runs: List[Edit] = []
+        self._job_id: str | None = None
+        self._applied_at: float = 0.0
+
+    @property
+    def pending(self) -> int:
+        """The number of commands waiting to be applied"""
+        return sum(edit.count for edit in self._runs)
+
+    def push(self, command: str, text: str = "") -> None:
+        if len(self._runs) > 0 and self._runs[-1].command == command:
+            self._runs[-1].count += 1
+            self._runs[-1].text += text
+        else:
+            self._runs.append(Edit(command, 1, text))
+        if self._job_id is not None:
+            return
+        wait_ms: int = max(0, int((self._applied_at + EditQueue.FRAME_INTERVAL_S - time.perf_counter()) * 1000))
+        self._job_id = self._widget.after(wait_ms, self._run)
+
+    def flush(self) -> None:
+        """Apply the queued commands now, e.g. before an edit or a cursor movement that must follow them"""
+        if self._job_id is not None:
+            self._widget.after_cancel(self._job_id)
+        self._run()
+
+    @traced("edit_batch", "editor")
+    def _run(self) -> None:
+        self._job_id = None
+        if len(self._runs) == 0:
+            return
+        runs: List[Edit] = self._runs
+        self._runs = []
+        for edit in runs:
+            self._apply(edit)
+        self._finish()
+        self._applied_at = time.perf_counter()
@@ -0,0 +1,232 @@
+import heapq
+import tkinter as tk
+from collections.abc import Callable
+from typing import Any, List, Set, Tuple, override
+
+from ezwrite.layout.metrics import FixedAdvanceMetrics, Font, FontMetrics
+from ezwrite.ui.views import Backend, ChapterView, ParagraphView, TokenView
+
+
+class HeadlessTokenView(TokenView):
+    """Records what a token would show, without a display"""
+    def __init__(self, word: str, width: int, height: int):
+        self.text: str = word
+        self.size: Tuple[int, int] = (width, height)
+        self.position: Tuple[int, int] | None = None
+        self.cursor_position: Tuple[int, int] = (-5, 0)
+        self.cursor_colour: str = "white"
+        self.highlight: Tuple[int, int] | None = None
+        self.destroyed: bool = False
+
+    @property
+    @override
+    def widget(self) -> tk.Misc | None:
+        return None
+
+    @override
+    def set_text(self, word: str) -> None:
+        self.text = word
+
+    @override
+    def set_size(self, width: int, height: int) -> None:
+        self.size = (width, height)
+
+    @override
+    def place(self, x: int, y: int, width: int, height: int) -> None:
+        self.position = (x, y)
+        self.size = (width, height)
+
+    @override
+    def set_cursor_position(self, x: int, y: int) -> None:
+        self.cursor_position = (x, y)
+
+    @override
+    def set_cursor_colour(self, colour: str) -> None:
+        self.cursor_colour = colour
+
+    @override
+    def show_highlight(self, start_x: int, end_x: int, height: int) -> None:
+        self.highlight = (start_x, end_x)
+
+    @override
+    def hide_highlight(self) -> None:
+        self.highlight = None
+
+    @override
+    def focus(self) -> None:
+        pass
+
+    @override
+    def move_to(self, paragraph: ParagraphView) -> None:
+        self.position = None
+
+    @override
+    def destroy(self) -> None:
+        self.destroyed = True
+
+
+class HeadlessParagraphView(ParagraphView):
+    """Records where a paragraph would be, without a display"""
+    def __init__(self) -> None:
+        self.geometry: Tuple[int, int, int, int] | None = None
+        self.destroyed: bool = False
+
+    @property
+    @override
+    def widget(self) -> tk.Misc | None:
+        return None
+
+    @override
+    def place(self, x: int, y: int, width: int, height: int) -> None:
+        self.geometry = (x, y, width, height)
+
+    @override
+    def destroy(self) -> None:
+        self.destroyed = True
+
+
+class HeadlessChapterView(ChapterView):
+    """A viewport of a fixed size, without a display. Its timers run on a virtual clock,
+    which only moves when run_for is called, so a batch job decides when they fire."""
+    def __init__(self, width: int = 400, height: int = 300):
+        self._width = width
+        self._height = height
+        self._top: int = 0
+        self._scroll_height: int = 0
+        self._resize: Callable[[], None] | None = None
+        self._now_ms: int = 0
+        self._serial: int = 0
+        self._jobs: List[Tuple[int, int, str, Callable[..., object], Tuple[Any, ...]]] = []
+        self._cancelled: Set[str] = set()
+
+    @property
+    @override
+    def widget(self) -> tk.Misc | None:
+        return None
+
+    @property
+    @override
+    def x(self) -> int:
+        return 0
+
+    @property
+    @override
+    def y(self) -> int:
+        return 0
+
+    @property
+    @override
+    def root_x(self) -> int:
+        return 0
+
+    @property
+    @override
+    def root_y(self) -> int:
+        return 0
+
+    @property
+    @override
+    def width(self) -> int:
+        return self._width
+
+    @property
+    @override
+    def height(self) -> int:
+        return self._height
+
+    @property
+    @override
+    def view_left(self) -> int:
+        return 0
+
+    @property
+    @override
+    def view_top(self) -> int:
+        return self._top
+
+    @property
+    def scroll_height(self) -> int:
+        return self._scroll_height
+
+    @override
+    def set_scroll_region(self, width: int, height: int) -> None:
+        self._scroll_height = height
+
+    @override
+    def scroll_to(self, top: int) -> None:
+        self._top = top
+
+    @override
+    def bind_resize(self, callback: Callable[[], None]) -> None:
+        self._resize = callback
+
+    def resize(self, width: int, height: int) -> None:
+        self._width = width
+        self._height = height
+        if self._resize is not None:
+            self._resize()
+
+    @override
+    def after(self, ms: int, func: Callable[..., object], *args: Any) -> str:
+        self._serial += 1
+        job_id: str = f"after#{self._serial}"
+        heapq.heappush(self._jobs, (self._now_ms + ms, self._serial, job_id, func, args))
+        return job_id
+
+    @override
+    def after_idle(self, func: Callable[..., object], *args: Any) -> str:
+        return self.after(0, func, *args)
+
+    @override
+    def after_cancel(self, id: str) -> None: # pylint: disable=redefined-builtin
+        self._cancelled.add(id)
+
+    @property
+    def pending(self) -> int:
+        """The number of timers that have not fired or been cancelled"""
+        return sum(1 for job in self._jobs if job[2] not in self._cancelled)
+
+    def run_for(self, ms: int = 0) -> int:
+        """Move the virtual clock on by ms, and fire the timers that are due by then, in order,
+        including those that the timers schedule in that time. Return how many fired."""
+        end_ms: int = self._now_ms + ms
+        fired: int = 0
+        while len(self._jobs) > 0 and self._jobs[0][0] <= end_ms:
+            (due_ms, _, job_id, func, args) = heapq.heappop(self._jobs)
+            if job_id in self._cancelled:
+                self._cancelled.discard(job_id)
+                continue
+            self._now_ms = max(self._now_ms, due_ms)
+            func(*args)
+            fired += 1
+        self._now_ms = end_ms
+        return fired
+
+
+class HeadlessBackend(Backend):
+    """Views without a display, and metrics that need none, by default with a fixed advance. The model,
+    editing and layout run as they do with Tk, so batch jobs and benchmarks can run them at full speed."""
+    def __init__(self, metrics: FontMetrics | None = None):
+        self._metrics: FontMetrics = FixedAdvanceMetrics() if metrics is None else metrics
+
+    @property
+    @override
+    def metrics(self) -> FontMetrics:
+        return self._metrics
+
+    @override
+    def chapter_view(self, parent: tk.Misc | None) -> ChapterView:
+        return HeadlessChapterView()
+
+    @override
+    def paragraph_view(self, chapter: ChapterView) -> ParagraphView:
+        return HeadlessParagraphView()
+
+    @override
+    def token_view(self, # pylint: disable=too-many-arguments,too-many-positional-arguments
+                   paragraph: ParagraphView,
+                   word: str,
+                   font: Font,
+                   width: int,
+                   height: int) -> TokenView:
+        return HeadlessTokenView(word, width, height)
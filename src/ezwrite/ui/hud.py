@@ -0,0 +1,86 @@
+import tkinter as tk
+from typing import List
+
+from ezwrite.ui.chapter import Chapter
+
+
+def entity_count(chapter: Chapter) -> int:
+    """The number of paragraphs, sentences and tokens. The tokens are counted by their sentences,
+    so this walks the paragraphs and sentences only."""
+    count: int = 0
+    for paragraph in chapter.child_entities:
+        count += 1
+        for sentence in paragraph.child_entities:
+            count += 1 + len(sentence.child_entities)
+    return count
+
+
+class PerformanceHud():
+    """An overlay in the corner of the chapter canvas with the editor's own counters: the last layout,
+    the latency from a key to the paint of its edit, the hit rate of the measure cache, and how many
+    widgets and entities there are. It refreshes a couple of times a second, and only while it is
+    shown, so it costs little next to what it measures."""
+    REFRESH_INTERVAL_MS: int = 500
+
+    def __init__(self, chapter: Chapter):
+        self._chapter = chapter
+        self._label: tk.Label | None = None
+        self._job_id: str | None = None
+
+    @property
+    def visible(self) -> bool:
+        return self._label is not None
+
+    def toggle(self) -> None:
+        if self.visible:
+            self.hide()
+        else:
+            self.show()
+
+    def show(self) -> None:
+        if self._label is not None:
+            return
+        self._label = tk.Label(self._chapter.canvas,
+                               justify="left",
+                               anchor="nw",
+                               font="TkFixedFont",
+                               bg="black",
+                               fg="light green",
+                               padx=6,
+                               pady=4)
+        self._label.place(relx=1.0, x=-6, y=6, anchor="ne")
+        self._refresh()
+
+    def hide(self) -> None:
+        if self._job_id is not None:
+            self._chapter.view.after_cancel(self._job_id)
+            self._job_id = None
+        if self._label is not None:
+            self._label.destroy()
+            self._label = None
+
+    def text(self) -> str:
+        chapter: Chapter = self._chapter
+        layout = chapter.layout_stats
+        keystroke = chapter.keystroke_latency
+        hit_rate: float | None = chapter.backend.metrics.cache_hit_rate
+        lines: List[str] = [
+            f"layout    {layout.last * 1000:7.2f} ms  {chapter.last_layout_tokens} tokens",
+            f"          mean {layout.mean * 1000:.2f} ms  max {layout.max * 1000:.2f} ms  n={layout.count}",
+            f"key→paint {keystroke.last * 1000:7.2f} ms  max {keystroke.max * 1000:.2f} ms  n={keystroke.count}",
+            "measure   " + ("no cache" if hit_rate is None else f"{hit_rate:7.1%} cached"),
+            f"widgets   {len(chapter.widget_registry):7d}  canvas items {len(chapter.canvas.find_all())}",
+            f"entities  {entity_count(chapter):7d}",
+        ]
+        motion = chapter.key_handler.motion_latency
+        if motion.count > 0:
+            lines.append(f"drag      {motion.last * 1000:7.2f} ms  max {motion.max * 1000:.2f} ms")
+        return "\n".join(lines)
+
+    def _refresh(self) -> None:
+        self._job_id = None
+        if self._label is None:
+            return
+        self._label.configure(text=self.text())
+        self._label.lift()  # paragraphs that were added since are stacked above it
+        self._job_id = self._chapter.view.after(PerformanceHud.REFRESH_INTERVAL_MS, self._refresh)
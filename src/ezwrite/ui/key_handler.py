@@ -1,10 +1,35 @@
+import time
 import tkinter as tk
 from collections.abc import Callable
-from typing import List
+from typing import Dict, Iterable, List
+
+from ezwrite.utils.stats import LatencyStats
+from ezwrite.utils.tracing import tracer
+
+Handler = Callable[[tk.Event, List["Key"]], bool]
+
+MODIFIERS: Dict[str, str] = {
+    "Shift_L": "Shift", "Shift_R": "Shift",
+    "Control_L": "Control", "Control_R": "Control",
+    "Alt_L": "Alt", "Alt_R": "Alt",
+    "Meta_L": "Meta", "Meta_R": "Meta",
+    "Super_L": "Super", "Super_R": "Super"
+}
+MODIFIER_ORDER = ("Control", "Alt", "Meta", "Super", "Shift")
+
+
+def chord(keysym: str, modifiers: Iterable[str] = ()) -> str:
+    """The normalized name of a key, or of a button action like <Button-1> or <B1-Motion>,
+    with the modifiers held, e.g. chord("Left", ["Shift_L"]) is "Shift+Left".
+    Left and right modifier keys are the same modifier."""
+    held = {MODIFIERS.get(modifier, modifier) for modifier in modifiers}
+    return "+".join([modifier for modifier in MODIFIER_ORDER if modifier in held] + [keysym])
 
 
 class Key():
     """state of a key that was pressed"""
+    _next_serial: int = 0
+
     def __init__(
             self,
             char: str,
@@ -14,6 +39,21 @@ class Key():
             x: int,
             y: int
     ): # pylint: disable=too-many-arguments
+        self.serial: int = 0
+        self.reset(char, keysym, button_num, widget, x, y)
+
+    def reset(
+            self,
+            char: str,
+            keysym: str,
+            button_num: int,
+            widget: tk.Misc,
+            x: int,
+            y: int
+    ): # pylint: disable=too-many-arguments
+        """Reuse this Key for another press. The serial tells the presses apart."""
+        Key._next_serial += 1
+        self.serial = Key._next_serial
         self.char = char
         self.keysym = keysym
         self.button_num = button_num
@@ -25,6 +65,10 @@ class Key():
         self.released = False
         self.moved = False
 
+    @property
+    def is_modifier(self) -> bool:
+        return self.keysym in MODIFIERS
+
     def __eq__(self, other_obj: object) -> bool:
         if not isinstance(other_obj, Key):
             return False
@@ -43,35 +87,146 @@ class Key():
 
 class KeyHandler():
     """This key handler converts low level events into higher level to combine
-    actions like control-B into one event, and key press/release to key click."""
+    actions like control-B into one event, and key press/release to key click.
+    The handlers are in a table keyed by chord, so a key sequence goes straight to its
+    handler however many there are. A typed character with no handler of its own goes to
+    the fallback handler. Released Key objects are kept for reuse by the next press.
+    Mouse motion while a button is held is coalesced: only the latest pointer position
+    is kept, and the handlers see it at most once per display frame."""
+    MOTION_FRAME_S: float = 0.016
 
     def __init__(self, canvas: tk.Canvas):
+        self._canvas = canvas
         self._keys: List[Key] = []
-        self._handlers: List[Callable[[tk.Event, List[Key]], bool]] = []
+        self._handlers: Dict[str, Handler] = {}
+        self._fallback: Handler | None = None
+        self._free_keys: List[Key] = []
+        self._latest_motion: tk.Event | None = None
+        self._motion_job_id: str | None = None
+        self._motion_pending_since: float = 0.0
+        self._motion_processed_at: float = 0.0
+        self.motion_events_received: int = 0
+        self.motion_events_processed: int = 0
+        self.motion_latency = LatencyStats()
         canvas.bind_all('<KeyPress>', self.key_press)
         canvas.bind_all('<KeyRelease>', self.key_release)
         canvas.bind_all('<Button-1>', self.key_press)
         canvas.bind_all('<ButtonRelease-1>', self.key_release)
         canvas.bind_all('<Motion>', self.mouse_moved)
 
-    def add_handler(self, handler: Callable[[tk.Event, List[Key]], bool]):
-        self._handlers.append(handler)
+    @property
+    def keys(self) -> List[Key]:
+        return self._keys
+
+    def bind(self, key_chord: str, handler: Handler) -> None:
+        """Send the key sequences that make this chord, see chord(), to the handler"""
+        self._handlers[key_chord] = handler
+
+    def set_fallback(self, handler: Handler) -> None:
+        """Send typed characters that have no handler of their own to this handler"""
+        self._fallback = handler
 
     def mouse_moved(self, event: tk.Event) -> None:
+        held: bool = False
         for key in self._keys:
             if key.keysym[0:7] == "<Button" and not key.released:
                 key.moved = True
                 key.x2 = event.x
                 key.y2 = event.y
-                for handler in self._handlers:
-                    if handler(event, self._keys):
-                        return
+                held = True
+        if not held:
+            return
+        self.motion_events_received += 1
+        self._latest_motion = event
+        if self._motion_job_id is not None:
+            return
+        now: float = time.perf_counter()
+        self._motion_pending_since = now
+        wait_ms: int = max(0, int((self._motion_processed_at + KeyHandler.MOTION_FRAME_S - now) * 1000))
+        self._motion_job_id = self._canvas.after(wait_ms, self._process_motion)
+
+    def _process_motion(self) -> None:
+        self._motion_job_id = None
+        event: tk.Event | None = self._latest_motion
+        self._latest_motion = None
+        if event is None:
+            return
+        self.replay_motion(event)
+        self._motion_processed_at = time.perf_counter()
+        self.motion_events_processed += 1
+        self.motion_latency.record(self._motion_processed_at - self._motion_pending_since)
+
+    def replay_motion(self, event: tk.Event) -> None:
+        """Run the handlers for the latest pointer position of the held button,
+        e.g. again after the view scrolled under a pointer that did not move"""
+        for key in self._keys:
+            if key.keysym[0:7] == "<Button" and not key.released:
+                modifiers: List[str] = [held.keysym for held in self._keys if held.is_modifier]
+                self._dispatch(event, chord(f"<B{key.button_num}-Motion>", modifiers), False)
+                return
+
+    def _dispatch(self, event: tk.Event, key_chord: str, typed: bool) -> bool:
+        """Look up the handler of the chord, or the fallback if it is a typed character"""
+        handler: Handler | None = self._handlers.get(key_chord)
+        if handler is None and typed:
+            handler = self._fallback
+        if handler is not None:
+            with tracer.span("dispatch", "input", {"chord": key_chord} if tracer.enabled else None):
+                if handler(event, self._keys):
+                    return True
+        if tracer.enabled:
+            tracer.instant("unhandled key sequence", "input", {"chord": key_chord})
+        return False
+
+    def _dispatch_last_key(self, event: tk.Event) -> None:
+        """Dispatch the last key that was pressed, with the keys held before it as its modifiers.
+        If one of those is not a modifier, it is not a chord, and no handler is offered it."""
+        last: Key = self._keys[-1]
+        modifiers: List[str] = []
+        for key in self._keys[:-1]:
+            if not key.is_modifier:
+                if tracer.enabled:
+                    tracer.instant("unhandled key sequence", "input", {"keys": [k.keysym for k in self._keys]})
+                return
+            modifiers.append(key.keysym)
+        key_chord: str = chord(last.keysym, modifiers)
+        typed: bool = (last.char != "" and last.char.isprintable()
+                       and all(MODIFIERS[modifier] == "Shift" for modifier in modifiers))
+        self._dispatch(event, key_chord, typed)
+
+    def _new_key( # pylint: disable=too-many-arguments,too-many-positional-arguments
+            self,
+            char: str,
+            keysym: str,
+            button_num: int,
+            widget: tk.Misc,
+            x: int,
+            y: int
+    ) -> Key:
+        if len(self._free_keys) == 0:
+            return Key(char, keysym, button_num, widget, x, y)
+        key: Key = self._free_keys.pop()
+        key.reset(char, keysym, button_num, widget, x, y)
+        return key
+
+    def _free(self, keys: List[Key]) -> None:
+        self._free_keys.extend(keys)
+
+    def _cancel_motion(self) -> None:
+        if self._motion_job_id is not None:
+            self._canvas.after_cancel(self._motion_job_id)
+            self._motion_job_id = None
+        self._latest_motion = None
 
     def key_press(self, event: tk.Event) -> None:
         if event.type == tk.EventType.KeyPress:
-            key = Key(event.char, event.keysym, -1, event.widget, 0, 0)
+            if len(self._keys) > 0 and self._keys[-1].keysym == event.keysym and not self._keys[-1].released:
+                # auto-repeat without a release in between, as on macOS: each repeat is a key click
+                self._dispatch_last_key(event)
+                return
+            key = self._new_key(event.char, event.keysym, -1, event.widget, 0, 0)
         elif event.type == tk.EventType.ButtonPress:
-            key = Key("", f"<Button-{event.num}>", event.num, event.widget, event.x, event.y)
+            key = self._new_key("", f"<Button-{event.num}>", event.num, event.widget, event.x, event.y)
         else:
             return
         self._keys.append(key)
@@ -82,13 +237,15 @@ class KeyHandler():
             release_x = 0
             release_y = 0
         elif event.type == tk.EventType.ButtonRelease:
+            self._cancel_motion()  # the release supersedes the pending position
             keysym = f"<Button-{event.num}>"
             release_x = event.x
             release_y = event.y
         else:
             return
+        if len(self._keys) == 0:
+            return  # e.g. the key was pressed before the window had the focus
         all_released: bool = True
-        handled: bool = False
         for key in self._keys:
             if keysym == key.keysym:
                 key.released = True
@@ -97,18 +254,10 @@ class KeyHandler():
             elif not key.released:
                 all_released = False
         if all_released:
-            for handler in self._handlers:
-                if handler(event, self._keys):
-                    handled = True
-                    break
-            if not handled:
-                print("unhandled key sequence: " + ", ".join(map(lambda key: key.keysym, self._keys)))
+            self._dispatch_last_key(event)
+            self._free(self._keys)
             self._keys.clear()
-        elif len(self._keys) == 2 and self._keys[0].keysym in ["Shift_L", "Shift_R"]:
-            for handler in self._handlers:
-                if handler(event, self._keys):
-                    handled = True
-                    break
-            if not handled:
-                print("unhandled key sequence: " + ", ".join(map(lambda key: key.keysym, self._keys)))
-            self._keys.pop(1)
+        elif self._keys[-1].released and all(key.is_modifier for key in self._keys[:-1]):
+            # e.g. Shift+Left, where Left is released while Shift is still held
+            self._dispatch_last_key(event)
+            self._free([self._keys.pop()])
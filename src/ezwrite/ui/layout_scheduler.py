@@ -0,0 +1,49 @@
+import time
+from collections.abc import Callable
+
+from ezwrite.utils.timers import Timers
+
+
+class LayoutScheduler():
+    """Coalesces layout requests, e.g. from resize events and edits, into one layout pass
+    per idle cycle. A pass calls the step function with a deadline, and the step does as much
+    of the layout as it can within that time. If the step returns False, there is more to do,
+    and the layout resumes on the next frame, so that Tk can handle events and repaint in between."""
+    FRAME_BUDGET_MS: float = 12.0
+    FRAME_INTERVAL_MS: int = 16
+
+    def __init__(self, widget: Timers, step: Callable[[float], bool]):
+        self._widget = widget
+        self._step = step
+        self._idle_job_id: str | None = None
+        self._resume_job_id: str | None = None
+
+    @property
+    def pending(self) -> bool:
+        return self._idle_job_id is not None or self._resume_job_id is not None
+
+    def request(self) -> None:
+        if self._idle_job_id is not None:
+            return
+        if self._resume_job_id is not None:
+            self._widget.after_cancel(self._resume_job_id)
+            self._resume_job_id = None
+        self._idle_job_id = self._widget.after_idle(self._run)
+
+    def cancel(self) -> None:
+        if self._idle_job_id is not None:
+            self._widget.after_cancel(self._idle_job_id)
+            self._idle_job_id = None
+        if self._resume_job_id is not None:
+            self._widget.after_cancel(self._resume_job_id)
+            self._resume_job_id = None
+
+    def _run(self) -> None:
+        self._idle_job_id = None
+        deadline: float = time.perf_counter() + self.FRAME_BUDGET_MS / 1000.0
+        if not self._step(deadline):
+            self._resume_job_id = self._widget.after(self.FRAME_INTERVAL_MS, self._resume)
+
+    def _resume(self) -> None:
+        self._resume_job_id = None
+        self.request()
@@ -1,23 +1,29 @@
-import tkinter as tk
 from abc import ABC, abstractmethod
 from argparse import ArgumentTypeError
-from typing import List, override
+from dataclasses import dataclass
+from typing import List, Optional, override
 
+import numpy as np
 from rdflib.graph import Graph
 from rdflib.term import URIRef
 
 from ezwrite.editors.ez_editor import EzEditor
 from ezwrite.graph.ezentity import Entity
 from ezwrite.graph.ezproperty import EzProperty
-from ezwrite.ui.position import Position
+from ezwrite.layout.geometry import Box
+from ezwrite.layout.line_breaker import IntArray, LineBreaks, break_lines
+from ezwrite.layout.spatial_index import (HitEdge, LineHit, hit_test_line,
+                                          hit_test_lines)
 from ezwrite.ui.sentence import Sentence, SentenceContainer
-from ezwrite.ui.tok import AbstractToken, RootContainer, Tok
+from ezwrite.ui.tok import RootContainer, Tok
+from ezwrite.ui.views import Backend, ChapterView, ParagraphView
+from ezwrite.utils.tracing import traced
 
 
 class ParagraphContainer(RootContainer, ABC):
     """Just needed to avoid circular dependencies"""
-    def __init__(self, graph: Graph, subject: URIRef):
-        super().__init__(graph, subject)
+    def __init__(self, graph: Graph, subject: URIRef, backend: Backend):
+        super().__init__(graph, subject, backend)
 
     @property
     @abstractmethod
@@ -26,43 +32,77 @@ class ParagraphContainer(RootContainer, ABC):
 
     @property
     @abstractmethod
-    def canvas(self) -> tk.Canvas:
+    def view(self) -> ChapterView:
         pass
 
+    @abstractmethod
+    def insert_paragraph_after(self, reference: "Paragraph", paragraph: "Paragraph") -> None:
+        pass
+
+    @abstractmethod
+    def paragraph_after(self, paragraph: "Paragraph") -> Optional["Paragraph"]:
+        """The paragraph after this one, which may skip paragraphs without any text"""
+
+    @abstractmethod
+    def paragraph_changed(self, paragraph: "Paragraph") -> None:
+        """Called when a paragraph becomes dirty, so that it can be reflowed without
+        looking at all the others"""
+
+
+@dataclass
+class TokenHit:
+    """The token at or nearest to a point, and where the point is relative to that token"""
+    token: Tok
+    edge: HitEdge
+
 
 class Paragraph(SentenceContainer):
     """A paragraph is a Frame in the Canvas (Chapter). A Paragraph contains sentences. """
-    def __init__(self, chapter: ParagraphContainer, graph: Graph, first_line_indent: int = 0):
+    def __init__(self,
+                 chapter: ParagraphContainer,
+                 graph: Graph,
+                 first_line_indent: int = 0,
+                 after: "Paragraph | None" = None):
         super().__init__(
             graph,
             URIRef("http://persistence.uni-leipzig.org/nlp2rdf/ontologies/nif-core#Paragraph")
         )
         self._graph = graph
         self._chapter = chapter
-        self._frame = tk.Frame(chapter.canvas,
-                          bg="light grey",
-                          bd=0,
-                          height=80,
-                          padx=0,
-                          pady=0,
-                          borderwidth=0,
-                          relief="flat",
-                          cursor="ibeam")
-        self._frame.bind('<Button-1>', self._handle_mouse_button_1)
-        self._frame_id = self._chapter.canvas.create_window(0, 0, anchor="nw", window=self._frame)
+        self._view: ParagraphView = chapter.backend.paragraph_view(chapter.view)
         self._first_line_indent = first_line_indent
         self._editor: EzEditor | None = None
-        chapter.add_child_entity(self)
+        self._line_breaks: LineBreaks = LineBreaks()
+        self._laid_out_tokens: List[Tok] = []
+        self._laid_out_widths: IntArray = np.zeros(0, dtype=np.int64)
+        self._laid_out_heights: IntArray = np.zeros(0, dtype=np.int64)
+        self._laid_out_width: int = -1
+        self._box: Box = Box(0, 0, -1, -1)
+        self._stack_index: int = -1
+        if self._view.widget is not None:
+            chapter.widget_registry.register(self._view.widget, self)
+        if after is None:
+            chapter.add_child_entity(self)
+        else:
+            chapter.insert_paragraph_after(after, self)
 
     @override
     def zap(self) -> None:
         super().zap()
-        self._frame.destroy()
+        if self._view.widget is not None:
+            self._chapter.widget_registry.unregister(self._view.widget)
+        self._view.destroy()
 
     @override
     def is_container(self) -> bool:
         return True
 
+    @override
+    def mark_dirty(self) -> None:
+        if not self._dirty:
+            self._chapter.paragraph_changed(self)
+        super().mark_dirty()
+
     @property
     @override
     def editor(self) -> EzEditor:
@@ -72,98 +112,199 @@ class Paragraph(SentenceContainer):
         self._editor = chapter_editor.get_paragraph_editor()
         return self._editor
 
-    def widget_inside(self, widget: tk.Misc) -> Entity | None:
-        for child in self.child_entities:
-            if not isinstance(child, Sentence):
-                continue
-            sentence: Sentence = child
-            entity: Entity | None = sentence.widget_inside(widget)
-            if entity is not None:
-                return entity
-        if self._frame == widget:
-            return self
-        return None
+    def hit_test(self, x: int, y: int) -> Optional[TokenHit]:
+        """Find the token at or nearest to (x, y), in document coordinates, using the line boxes
+        of the last layout"""
+        hit: LineHit | None = hit_test_lines(self._line_breaks, x - self._box.x, y - self._box.y)
+        if hit is None:
+            return None
+        return TokenHit(self._laid_out_tokens[hit.index], hit.edge)
+
+    def hit_test_line(self, line: int, x: int) -> TokenHit:
+        """Find the token of a line that is at or nearest to x, in document coordinates"""
+        hit: LineHit = hit_test_line(self._line_breaks, line, x - self._box.x)
+        return TokenHit(self._laid_out_tokens[hit.index], hit.edge)
+
+    def line_of(self, tok: Tok) -> int:
+        """The line that tok was laid out on, or -1 if it is not laid out in this paragraph"""
+        index: int = tok.layout_index
+        if index < 0 or index >= len(self._laid_out_tokens) or self._laid_out_tokens[index] is not tok:
+            return -1
+        return int(self._line_breaks.token_lines[index])
+
+    @property
+    def first_line_indent(self) -> int:
+        return self._first_line_indent
+
+    @property
+    def line_count(self) -> int:
+        return self._line_breaks.line_count
+
+    @property
+    def stack_index(self) -> int:
+        """The index of this paragraph among the laid out paragraphs of the chapter,
+        or -1 if it takes no space"""
+        return self._stack_index
+
+    def set_stack_index(self, index: int) -> None:
+        self._stack_index = index
 
     def get_closest_token(self, x: int, y: int) -> Entity | None:
-        # first try to find if the coordinate is within the contained tokens
-        for sen in self.child_entities:
-            if not isinstance(sen, Sentence):
-                continue
-            sentence: Sentence = sen
-            for child in sentence.child_entities:
-                if not isinstance(child, Tok):
-                    continue
-                tok: Tok = child
-                if tok.inside(x, y):
-                    return tok
-        # not within, then find the closest token at the start or end of the paragraph.
-        ent: Entity | None = self.first_child()
-        if ent is not None:
-            ent = ent.first_child()
-            if ent is not None and isinstance(ent, Tok):
-                tok = ent
-                if y < tok.root_y:
-                    return tok
-                if y < tok.root_y + tok.height and x < tok.root_x:
-                    return tok
-        ent = self.last_child()
-        if ent is not None:
-            ent = ent.last_child()
-            if ent is not None and isinstance(ent, Tok):
-                tok = ent
-                if y < tok.root_y:
-                    return None
-                if x >= tok.root_x + tok.width or y >= tok.root_y + tok.height:
-                    return tok
-        return None
-
-    @property
-    @override
-    def frame(self) -> tk.Frame:
-        return self._frame
+        hit: TokenHit | None = self.hit_test(x, y)
+        if hit is None:
+            return None
+        return hit.token
+
+    @property
+    @override
+    def view(self) -> ParagraphView:
+        return self._view
 
     @property
     def graph(self) -> Graph:
         return self._graph
 
-    def _handle_mouse_button_1(self, event: tk.Event) -> None:
-        print(f"button 1 {event.x},{event.y}")
-
     @override
     def layout(self, frame_y_offset: int, canvas_width: int) -> int:
-        pos: Position = Position(self._first_line_indent, 0)
-        frame_height: int = 0
+        if self.needs_reflow(canvas_width):
+            self.reflow(canvas_width)
+        self.place_frame(frame_y_offset)
+        return self._line_breaks.height
+
+    def needs_reflow(self, canvas_width: int) -> bool:
+        return self.dirty or canvas_width != self._laid_out_width
+
+    @traced("reflow", "layout")
+    def reflow(self, canvas_width: int) -> int:
+        """Break the paragraph into lines for this width and place the tokens in the frame.
+        The frame itself is positioned separately, by place_frame.
+        When only the widths of tokens on one line changed, e.g. while typing a word, and the
+        line still breaks in the same place, just that line is placed again."""
+        tokens: List[Tok] = self.tokens()
+        widths: IntArray = np.fromiter((tok.measured_width for tok in tokens), dtype=np.int64, count=len(tokens))
+        heights: IntArray = np.fromiter((tok.measured_height for tok in tokens), dtype=np.int64, count=len(tokens))
+        if canvas_width != self._laid_out_width or not self._reflow_line(tokens, widths, heights):
+            breaks: LineBreaks = break_lines(widths, heights, canvas_width, self._first_line_indent)
+            for index, (tok, x, y) in enumerate(zip(tokens, breaks.x_offsets.tolist(), breaks.y_offsets.tolist())):
+                tok.place_at(x, y, index)
+            self._line_breaks = breaks
+        self._laid_out_tokens = tokens
+        self._laid_out_widths = widths
+        self._laid_out_heights = heights
+        self._laid_out_width = canvas_width
+        self._dirty = False
+        return self._line_breaks.height
+
+    def _reflow_line(self, tokens: List[Tok], widths: IntArray, heights: IntArray) -> bool:
+        """Place the tokens of one line again, if that is all that changed.
+        Return False if the paragraph needs to be broken into lines again."""
+        if len(tokens) != len(self._laid_out_tokens) or not np.array_equal(heights, self._laid_out_heights):
+            return False
+        if any(tok is not laid_out for tok, laid_out in zip(tokens, self._laid_out_tokens)):
+            return False
+        changed: IntArray = np.flatnonzero(widths != self._laid_out_widths)
+        if len(changed) == 0:
+            return True
+        breaks: LineBreaks = self._line_breaks
+        line: int = int(breaks.token_lines[changed[0]])
+        if int(breaks.token_lines[changed[-1]]) != line:
+            return False
+        start: int = int(breaks.line_starts[line])
+        end: int = int(breaks.line_ends[line])
+        line_width: int = int(widths[start:end].sum())
+        available: int = self._laid_out_width - int(breaks.line_x[line])
+        if line_width > available and end - start > 1:
+            return False  # the line now wraps
+        if end < len(tokens) and line_width + int(widths[end]) <= available:
+            return False  # the first token of the next line now fits on this one
+        if line > 0 and changed[0] == start:
+            previous: int = line - 1
+            if breaks.line_widths[previous] + widths[start] <= self._laid_out_width - breaks.line_x[previous]:
+                return False  # the first token of this line now fits on the previous one
+        breaks.x_offsets[start:end] = np.cumsum(widths[start:end]) - widths[start:end] + breaks.line_x[line]
+        breaks.line_widths[line] = line_width
+        for index in range(start, end):
+            tokens[index].place_at(int(breaks.x_offsets[index]), int(breaks.y_offsets[index]), index)
+        return True
+
+    def place_frame(self, frame_y_offset: int) -> None:
+        width: int = self._laid_out_width
+        height: int = self._line_breaks.height
+        if not self._box.differs_from(0, frame_y_offset, width, height):
+            return
+        self._box.place(0, frame_y_offset, width, height)
+        self._view.place(0, frame_y_offset, width, height)
+
+    @property
+    def box(self) -> Box:
+        return self._box
+
+    def geometry_mismatches(self) -> List[str]:
+        """For debugging: compare the recorded geometry of this paragraph and its tokens
+        with what Tk reports"""
+        mismatches: List[str] = []
+        actual = self._view.actual_geometry()
+        if actual is not None and self._box.differs_from(*actual):
+            mismatches.append(f"paragraph: model {self._box}, Tk {actual}")
+        for tok in self.tokens():
+            mismatch: str | None = tok.geometry_mismatch()
+            if mismatch is not None:
+                mismatches.append(mismatch)
+        return mismatches
+
+    def tokens(self) -> List[Tok]:
+        """All the tokens of this paragraph, in document order"""
+        tokens: List[Tok] = []
         for sentence in self.child_entities:
             if not isinstance(sentence, Sentence): raise ArgumentTypeError("sentence must be an instance of Sentence")
             container: Sentence = sentence
-            frame_height = max(frame_height, container.layout(pos, canvas_width))
-        self._frame.place(x=0, y=frame_y_offset, height=frame_height, width=canvas_width)
-        return frame_height
+            for child in container.child_entities:
+                if not isinstance(child, Tok): raise ArgumentTypeError("children need to be instances of Token")
+                tokens.append(child)
+        return tokens
 
     @property
-    def frame_id(self) -> int:
-        return self._frame_id
+    def line_breaks(self) -> LineBreaks:
+        return self._line_breaks
 
     def add_child_entity(self, child: Entity) -> None:
         if not isinstance(child, Sentence): raise ArgumentTypeError("token_container must be an instance of Sentence")
         sentence: Sentence = child
         self._property_list.append(EzProperty.HAS_PART, sentence)
+        self.mark_dirty()
 
     @override
-    def remove_cursor_except(self, tok: AbstractToken) -> None:
-        for child in self.child_entities:
-            if not isinstance(child, Sentence): raise ArgumentTypeError("child must be an instance of Sentence")
-            sentence: Sentence = child
-            sentence.remove_cursor_except(tok)
+    def insert_sentence_after(self, reference: Sentence, sentence: Sentence) -> None:
+        self._property_list.insert_after(reference, EzProperty.HAS_PART, sentence)
+        self.mark_dirty()
+
+    @override
+    def append_sentences_from(self, other: SentenceContainer, start: int = 0) -> None:
+        """Move the sentences of another paragraph, from index start on, to the end of this one, e.g. when
+        the two merge. The run is cut from one sentence list and added to the other in one step, so a merge
+        is linear in the sentences moved; their tokens are then shown in this paragraph's view."""
+        sentences: List[Entity] = other.remove_child_entities_from(start, Sentence)
+        if len(sentences) == 0:
+            return
+        for child in sentences:
+            if not isinstance(child, Sentence): raise ArgumentTypeError("children need to be instances of Sentence")
+            child.reparent(self)
+        self._property_list.extend(EzProperty.HAS_PART, sentences)
+        self.mark_dirty()
 
     @property
     def max_tok_height(self) -> int:
-        height: int = 0
-        for child in self.child_entities:
-            if not isinstance(child, Sentence): raise ArgumentTypeError("child must be an instance of Sentence")
-            sentence: Sentence = child
-            height = max(height, sentence.max_tok_height)
-        return height
+        if self._line_breaks.line_count == 0:
+            return 0
+        return int(self._line_breaks.line_heights.max())
+
+    @property
+    def laid_out_token_count(self) -> int:
+        return len(self._laid_out_tokens)
+
+    @property
+    def laid_out_height(self) -> int:
+        return self._line_breaks.height
 
     @property
     @override
@@ -175,40 +316,42 @@ class Paragraph(SentenceContainer):
     def child_entities(self) -> List[Entity]:
         return self._property_list.entities_of(EzProperty.HAS_PART, Sentence)
 
-    @override
-    def deselect_all(self) -> None:
-        for child in self.child_entities:
-            if not isinstance(child, Sentence):
-                continue
-            sentence: Sentence = child
-            sentence.deselect_all()
-
     @override
     @property
     def x(self) -> int:
-        return self._frame.winfo_x()
+        return self._box.x
 
     @override
     @property
     def y(self) -> int:
-        return self._frame.winfo_y()
+        return self._box.y
+
+    @override
+    @property
+    def doc_x(self) -> int:
+        return self._box.x
+
+    @override
+    @property
+    def doc_y(self) -> int:
+        return self._box.y
 
     @override
     @property
     def root_x(self) -> int:
-        return self._frame.winfo_rootx()
+        return self._chapter.root_x + self._box.x - self._chapter.view.view_left
 
     @override
     @property
     def root_y(self) -> int:
-        return self._frame.winfo_rooty()
+        return self._chapter.root_y + self._box.y - self._chapter.view.view_top
 
     @override
     @property
     def width(self) -> int:
-        return self._frame.winfo_width()
+        return self._box.width
 
     @override
     @property
     def height(self) -> int:
-        return self._frame.winfo_height()
+        return self._box.height
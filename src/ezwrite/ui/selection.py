@@ -0,0 +1,207 @@
+from collections.abc import Iterator
+from dataclasses import dataclass
+from itertools import islice
+from typing import List, Optional, Tuple
+
+from ezwrite.graph.entity import Entity
+from ezwrite.ui.paragraph import Paragraph, ParagraphContainer
+from ezwrite.ui.sentence import Sentence
+from ezwrite.ui.tok import Tok
+from ezwrite.utils.tracing import traced
+
+Span = Tuple[int, int]
+
+
+def document_order(entity: Entity) -> Tuple[int, ...]:
+    """The path of child indexes from the root to this entity, which sorts in document order"""
+    path: List[int] = []
+    child: Entity = entity
+    parent: Entity | None = entity.parent
+    while parent is not None:
+        path.append(parent.child_entities.index(child))
+        child = parent
+        parent = parent.parent
+    path.reverse()
+    return tuple(path)
+
+
+def layout_order(tok: Tok) -> Tuple[int, int] | None:
+    """The stacked index of the paragraph of a token and its index in the paragraph's line boxes,
+    which sort in document order, or None if the last layout did not place it.
+    Every stacking numbers all the paragraphs, so any two stacked indexes can be compared,
+    and a token moved to another paragraph loses its place in the line boxes."""
+    sentence: Entity | None = tok.parent
+    paragraph: Entity | None = sentence.parent if sentence is not None else None
+    if not isinstance(paragraph, Paragraph) or paragraph.stack_index < 0 or paragraph.line_of(tok) < 0:
+        return None
+    return (paragraph.stack_index, tok.layout_index)
+
+
+@dataclass(frozen=True)
+class DocumentPosition:
+    """A caret position: a token, and the index of a character within its word"""
+    token: Tok
+    word_index: int
+
+    def order(self) -> Tuple[Tuple[int, ...], int]:
+        return (document_order(self.token), self.word_index)
+
+    def precedes(self, other: "DocumentPosition") -> bool:
+        """Whether this position comes before the other one. This compares where the last layout
+        placed the tokens, and only indexes the parents' child lists for tokens it did not place."""
+        mine: Tuple[int, int] | None = layout_order(self.token)
+        theirs: Tuple[int, int] | None = layout_order(other.token)
+        if mine is not None and theirs is not None:
+            return (mine, self.word_index) < (theirs, other.word_index)
+        return self.order() < other.order()
+
+
+class Selection():
+    """The selection is two document positions: the anchor, where it started, and the head,
+    which moves as the user drags or extends it. When it changes, only the tokens whose
+    highlight changes are repainted, rather than deselecting and reselecting everything."""
+    def __init__(self):
+        self._anchor: DocumentPosition | None = None
+        self._head: DocumentPosition | None = None
+        self._range: Tuple[DocumentPosition, DocumentPosition] | None = None
+
+    @property
+    def anchor(self) -> DocumentPosition | None:
+        return self._anchor
+
+    @property
+    def head(self) -> DocumentPosition | None:
+        return self._head
+
+    @property
+    def start(self) -> DocumentPosition | None:
+        """The position where the selection starts in document order, whichever end the anchor is"""
+        if self._range is None:
+            return None
+        return self._range[0]
+
+    @property
+    def end(self) -> DocumentPosition | None:
+        """The position where the selection ends in document order"""
+        if self._range is None:
+            return None
+        return self._range[1]
+
+    @property
+    def is_empty(self) -> bool:
+        return self._range is None
+
+    def set(self, anchor: DocumentPosition, head: DocumentPosition) -> None:
+        old_range = self._range
+        self._anchor = anchor
+        self._head = head
+        self._range = Selection._ordered(anchor, head)
+        self._repaint(old_range)
+
+    def extend_to(self, head: DocumentPosition) -> None:
+        if self._anchor is None:
+            self.set(head, head)
+            return
+        self.set(self._anchor, head)
+
+    def clear(self) -> None:
+        old_range = self._range
+        self._anchor = None
+        self._head = None
+        self._range = None
+        self._repaint(old_range)
+
+    def forget(self) -> None:
+        """Drop the selection without repainting, e.g. after the selected tokens were deleted"""
+        self._anchor = None
+        self._head = None
+        self._range = None
+
+    def tokens(self) -> Iterator[Tok]:
+        """Iterate over the tokens that have selected characters, in document order"""
+        if self._range is None:
+            return iter(())
+        return (tok for tok in Selection._walk(self._range[0].token, self._range[1].token)
+                if self.span_of(tok) is not None)
+
+    def span_of(self, tok: Tok) -> Optional[Span]:
+        """The selected characters of a token in the selection range, or None"""
+        if self._range is None:
+            return None
+        start, end = self._range
+        first: int = start.word_index if tok is start.token else 0
+        last: int = end.word_index if tok is end.token else len(tok.word)
+        if first >= last:
+            return None
+        return (first, last)
+
+    @staticmethod
+    def _ordered(a: DocumentPosition,
+                 b: DocumentPosition
+                 ) -> Tuple[DocumentPosition, DocumentPosition] | None:
+        if a.token is b.token:
+            if a.word_index == b.word_index:
+                return None
+            return (a, b) if a.word_index < b.word_index else (b, a)
+        return (a, b) if a.precedes(b) else (b, a)
+
+    @staticmethod
+    def _walk(first: Tok, last: Tok) -> Iterator[Tok]:
+        """Iterate from first to last through the token lists of the sentences, so that a walk
+        costs the tokens it passes, plus looking up where it starts"""
+        sentence: Entity | None = first.parent
+        if not isinstance(sentence, Sentence):
+            return
+        start: int = sentence.child_entities.index(first)
+        for following in Selection._sentences_from(sentence):
+            for tok in islice(following.child_entities, start, None):
+                if isinstance(tok, Tok):
+                    yield tok
+                if tok is last:
+                    return
+            start = 0
+
+    @staticmethod
+    def _sentences_from(sentence: Sentence) -> Iterator[Entity]:
+        """The sentences from this one to the end of the chapter"""
+        paragraph: Entity | None = sentence.parent
+        chapter: Entity | None = paragraph.parent if paragraph is not None else None
+        if not isinstance(paragraph, Paragraph) or not isinstance(chapter, ParagraphContainer):
+            return
+        sentences: List[Entity] = paragraph.child_entities
+        yield from islice(sentences, sentences.index(sentence), None)
+        following: Paragraph | None = chapter.paragraph_after(paragraph)
+        while following is not None:
+            yield from following.child_entities
+            following = chapter.paragraph_after(following)
+
+    @traced("repaint_selection", "render")
+    def _repaint(self, old_range: Tuple[DocumentPosition, DocumentPosition] | None) -> None:
+        """Repaint the tokens whose highlight may differ between the old and the new range.
+        Those are between the old and new starts, and between the old and new ends."""
+        new_range = self._range
+        if old_range is None and new_range is None:
+            return
+        if old_range is None or new_range is None:
+            changed = old_range if new_range is None else new_range
+            if changed is not None:
+                self._repaint_between(changed[0], changed[1])
+            return
+        self._repaint_between(*Selection._sorted_pair(old_range[0], new_range[0]))
+        self._repaint_between(*Selection._sorted_pair(old_range[1], new_range[1]))
+
+    @staticmethod
+    def _sorted_pair(a: DocumentPosition, b: DocumentPosition) -> Tuple[DocumentPosition, DocumentPosition]:
+        if a.token is b.token:
+            return (a, b)
+        return (a, b) if a.precedes(b) else (b, a)
+
+    def _repaint_between(self, first: DocumentPosition, last: DocumentPosition) -> None:
+        for tok in Selection._walk(first.token, last.token):
+            span: Span | None = self.span_of(tok)
+            if span == tok.highlight_span:
+                continue
+            if span is None:
+                tok.deselect()
+            else:
+                tok.select(span[0], span[1])
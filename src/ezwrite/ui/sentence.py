@@ -1,4 +1,3 @@
-import tkinter as tk
 from abc import ABC, abstractmethod
 from argparse import ArgumentTypeError
 from typing import List, override
@@ -9,8 +8,8 @@ from rdflib.term import URIRef
 from ezwrite.editors.ez_editor import EzEditor
 from ezwrite.graph.ezentity import Entity
 from ezwrite.graph.ezproperty import EzProperty
-from ezwrite.ui.position import Position
-from ezwrite.ui.tok import AbstractToken, EzwriteContainer, Tok, TokenContainer
+from ezwrite.ui.tok import EzwriteContainer, Tok, TokenContainer
+from ezwrite.ui.views import ParagraphView
 
 
 class SentenceContainer(EzwriteContainer, ABC):
@@ -29,20 +28,31 @@ class SentenceContainer(EzwriteContainer, ABC):
 
     @property
     @abstractmethod
-    def frame(self) -> tk.Frame:
+    def view(self) -> ParagraphView:
         pass
 
+    @abstractmethod
+    def insert_sentence_after(self, reference: "Sentence", sentence: "Sentence") -> None:
+        pass
+
+    @abstractmethod
+    def append_sentences_from(self, other: "SentenceContainer", start: int = 0) -> None:
+        """Move the sentences of another container, from index start on, to the end of this one"""
+
 
 class Sentence(TokenContainer):
     """A sentence is not a UI element, it is just a collection of tokens."""
-    def __init__(self, paragraph: SentenceContainer):
+    def __init__(self, paragraph: SentenceContainer, after: "Sentence | None" = None):
         super().__init__(
             paragraph.graph,
             URIRef("http://persistence.uni-leipzig.org/nlp2rdf/ontologies/nif-core#Sentence")
         )
         self._paragraph = paragraph
         self._editor: EzEditor | None = None
-        paragraph.add_child_entity(self)
+        if after is None:
+            paragraph.add_child_entity(self)
+        else:
+            paragraph.insert_sentence_after(after, self)
 
     @property
     @override
@@ -57,16 +67,6 @@ class Sentence(TokenContainer):
     def is_container(self) -> bool:
         return True
 
-    def widget_inside(self, widget: tk.Misc) -> Entity | None:
-        for child in self.child_entities:
-            if not isinstance(child, Tok):
-                continue
-            token: Tok = child
-            entity: Entity | None = token.widget_inside(widget)
-            if entity is not None:
-                return entity
-        return None
-
     @property
     def graph(self) -> Graph:
         return self._paragraph.graph
@@ -82,68 +82,66 @@ class Sentence(TokenContainer):
         return self._property_list.entities_of(EzProperty.HAS_PART, Tok)
 
     @override
-    def parent_frame(self) -> tk.Frame:
+    def paragraph_view(self) -> ParagraphView:
         parent = self.parent
         if parent is None:
             raise ArgumentTypeError("The parent of a sentence must not be None")
         if not isinstance(parent, SentenceContainer):
             raise ArgumentTypeError("The sentence parent must be a SentenceContainer")
         sentence_container: SentenceContainer = parent
-        return sentence_container.frame
+        return sentence_container.view
 
     @override
     def add_child_entity(self, child: Entity) -> None:
         if not isinstance(child, Tok): raise ArgumentTypeError("label needs to be an instance of Token")
         token: Tok = child
         self._property_list.append(EzProperty.HAS_PART, token)
-
-    @override
-    def remove_cursor_except(self, tok: AbstractToken) -> None:
-        for ent in self.child_entities:
-            if ent != tok:
-                if not isinstance(ent, Tok): raise ArgumentTypeError("children need to be instances of Token")
-                token: Tok = ent
-                token.remove_cursor()
-
-    @override
-    def layout(self, pos: Position, frame_width: int) -> int:
-        sentence_height: int = 0
-        for ent in self.child_entities:
-            if not isinstance(ent, Tok): raise ArgumentTypeError("children need to be instances of Token")
-            token: Tok = ent
-            sentence_height = token.layout(pos, frame_width)
-        return sentence_height
-
-    @property
-    def max_tok_height(self) -> int:
-        height: int = 0
-        for ent in self.child_entities:
-            if not isinstance(ent, Tok): raise ArgumentTypeError("children need to be instances of Token")
-            token: Tok = ent
-            tok_height: int = token.height
-            height = max(height, tok_height)
-        return height
-
-    def join_tokens(self, a: Tok, b: Tok) -> Tok:
-        joined_word: str = a.word + b.word
-        joined_tok = Tok(self, joined_word, a.font, False)
-        self._property_list.insert_before(a, EzProperty.HAS_PART, joined_tok)
-        return joined_tok
-
-    def append_copy_tokens_from(self, other_sentence: "Sentence") -> None:
-        for child in other_sentence.child_entities:
-            if not isinstance(child, Tok):
-                continue
-            tok: Tok = child
-            Tok(self, tok.word, tok.font)
-
-    @override
-    def deselect_all(self) -> None:
+        self.mark_dirty()
+
+    def extend_tokens(self, tokens: List[Tok]) -> None:
+        """Append tokens that were created with append_to_sentence False, e.g. by a bulk insert"""
+        self._property_list.extend(EzProperty.HAS_PART, list(tokens))
+        self.mark_dirty()
+
+    def insert_token_before(self, reference: Tok, tok: Tok) -> None:
+        self._property_list.insert_before(reference, EzProperty.HAS_PART, tok)
+        self.mark_dirty()
+
+    def insert_token_after(self, reference: Tok, tok: Tok) -> None:
+        self._property_list.insert_after(reference, EzProperty.HAS_PART, tok)
+        self.mark_dirty()
+
+    def split_after(self, tok: Tok) -> "Sentence":
+        """Move the tokens after tok into a new sentence, which follows this one"""
+        index: int = self.child_entities.index(tok)
+        sentence = Sentence(self._paragraph, self)
+        sentence.append_tokens_from(self, index + 1)
+        return sentence
+
+    def append_tokens_from(self, other_sentence: "Sentence", start: int = 0) -> None:
+        """Move the tokens of another sentence in the same paragraph, from index start on, to the end of
+        this one. The run is cut from one token list and added to the other in one step, rather than
+        a token at a time, so a split or merge is linear in the tokens moved, not quadratic."""
+        if other_sentence.paragraph_view() is not self.paragraph_view():
+            raise ArgumentTypeError("tokens can only move to a sentence in the same paragraph")
+        tokens: List[Entity] = other_sentence.remove_child_entities_from(start, Tok)
+        if len(tokens) == 0:
+            return
+        for child in tokens:
+            if not isinstance(child, Tok): raise ArgumentTypeError("children need to be instances of Token")
+            child.reparent(self)
+        self._property_list.extend(EzProperty.HAS_PART, tokens)
+        self.mark_dirty()
+
+    def reparent(self, paragraph: SentenceContainer) -> None:
+        """Make paragraph the parent of this sentence, once the sentence has been moved into its list, e.g.
+        with a run of sentences by append_sentences_from, and show the tokens in the view of that paragraph.
+        The tokens are moved rather than copied, so they keep their measurements and graph nodes."""
+        self._paragraph = paragraph
+        view: ParagraphView = paragraph.view
         for child in self.child_entities:
-            if not isinstance(child, Tok):
-                continue
-            tok: Tok = child
-            tok.deselect()
+            if not isinstance(child, Tok): raise ArgumentTypeError("children need to be instances of Token")
+            child.move_view_to(view)
 
     @override
     @property
@@ -161,6 +159,22 @@ class Sentence(TokenContainer):
             return self.parent.y
         return first.y
 
+    @override
+    @property
+    def doc_x(self) -> int:
+        first = self.first_child()
+        if first is None:
+            return self.parent.doc_x
+        return first.doc_x
+
+    @override
+    @property
+    def doc_y(self) -> int:
+        first = self.first_child()
+        if first is None:
+            return self.parent.doc_y
+        return first.doc_y
+
     @override
     @property
     def root_x(self) -> int:
@@ -0,0 +1,354 @@
+import tkinter as tk
+import tkinter.font
+from argparse import ArgumentTypeError
+from collections.abc import Callable
+from typing import Any, Dict, Tuple, override
+
+from ezwrite.layout.metrics import Font, FontMetrics
+from ezwrite.ui.views import (Backend, ChapterView, Geometry, ParagraphView,
+                              TokenView)
+from ezwrite.utils.tracing import tracer
+
+
+class TkFontMetrics(FontMetrics):
+    """Measures with Tk fonts, and caches the widths of words and the line spacing of fonts.
+    Each measurement is a round trip to Tk, and most of the words of a text are repeats, so a bulk
+    insert of a long text measures each distinct word once. Fonts are told apart by name, so clear
+    the cache if a named font is configured again."""
+    MAX_WORDS: int = 100_000
+
+    def __init__(self) -> None:
+        self._widths: Dict[Tuple[str, str], int] = {}
+        self._linespaces: Dict[str, int] = {}
+        self._default_font: tkinter.font.Font | None = None
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @override
+    def width(self, font: Font, text: str) -> int:
+        key: Tuple[str, str] = (str(font), text)
+        width: int | None = self._widths.get(key)
+        if width is None:
+            self.misses += 1
+            if len(self._widths) >= TkFontMetrics.MAX_WORDS:
+                self._widths.clear()
+            width = font.measure(text)
+            self._widths[key] = width
+        else:
+            self.hits += 1
+        return width
+
+    @override
+    def linespace(self, font: Font) -> int:
+        key: str = str(font)
+        linespace: int | None = self._linespaces.get(key)
+        if linespace is None:
+            linespace = font.metrics()['linespace']
+            self._linespaces[key] = linespace
+        return linespace
+
+    @override
+    def default_font(self) -> Font:
+        if self._default_font is None:
+            self._default_font = tkinter.font.Font(name="TkDefaultFont", exists=True)
+        return self._default_font
+
+    @property
+    @override
+    def cache_hit_rate(self) -> float | None:
+        measured: int = self.hits + self.misses
+        return None if measured == 0 else self.hits / measured
+
+    def clear(self) -> None:
+        self._widths.clear()
+        self._linespaces.clear()
+
+
+class TkTokenView(TokenView):
+    """A token is a canvas in the frame of its paragraph, with its word, its caret and its highlight as items.
+    Tk cannot move a widget to another parent, so when the token moves to another paragraph, the view
+    builds its canvas again in that paragraph's frame, from the state it keeps."""
+    def __init__(self, # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 frame: tk.Frame,
+                 word: str,
+                 font: Font,
+                 width: int,
+                 height: int):
+        self._word = word
+        self._font = font
+        self._width = width
+        self._height = height
+        self._cursor_x: int = -5
+        self._cursor_y: int = 0
+        self._cursor_colour: str = "white"
+        self._highlight: Tuple[int, int, int] | None = None
+        self._highlight_id: int | None = None
+        self._canvas: tk.Canvas = self._build(frame)
+
+    def _build(self, frame: tk.Frame) -> tk.Canvas:
+        canvas = tk.Canvas(frame,
+                           borderwidth=0,
+                           bd=0,
+                           highlightthickness=0,
+                           relief="flat")
+        self._cursor_id = canvas.create_line(
+            self._cursor_x,
+            self._cursor_y,
+            self._cursor_x,
+            self._cursor_y + self._height,
+            fill=self._cursor_colour,
+            width=2)
+        self._text_id = canvas.create_text(0, 0,
+                         text=self._word,
+                         fill="black",
+                         font=self._font,
+                         anchor="nw")
+        # not packed: the paragraph places the canvas when it lays out the token
+        canvas.config(width=self._width, height=self._height)
+        self._highlight_id = None
+        if self._highlight is not None:
+            self._create_highlight(canvas, *self._highlight)
+        return canvas
+
+    @property
+    @override
+    def widget(self) -> tk.Misc:
+        return self._canvas
+
+    @override
+    def set_text(self, word: str) -> None:
+        self._word = word
+        self._canvas.itemconfig(self._text_id, text=word)
+
+    @override
+    def set_size(self, width: int, height: int) -> None:
+        self._width = width
+        self._height = height
+        self._canvas.config(width=width, height=height)
+
+    @override
+    def place(self, x: int, y: int, width: int, height: int) -> None:
+        self._canvas.place(x=x, y=y, width=width, height=height)
+
+    @override
+    def set_cursor_position(self, x: int, y: int) -> None:
+        self._canvas.move(self._cursor_id, x - self._cursor_x, y - self._cursor_y)
+        self._cursor_x = x
+        self._cursor_y = y
+
+    @override
+    def set_cursor_colour(self, colour: str) -> None:
+        self._cursor_colour = colour
+        self._canvas.itemconfig(self._cursor_id, fill=colour)
+
+    @override
+    def show_highlight(self, start_x: int, end_x: int, height: int) -> None:
+        self.hide_highlight()
+        self._highlight = (start_x, end_x, height)
+        self._create_highlight(self._canvas, start_x, end_x, height)
+
+    def _create_highlight(self, canvas: tk.Canvas, start_x: int, end_x: int, height: int) -> None:
+        self._highlight_id = canvas.create_rectangle(
+            start_x,
+            0,
+            end_x,
+            height,
+            fill="turquoise", outline=""
+        )
+        canvas.tag_lower(self._highlight_id, self._cursor_id)
+
+    @override
+    def hide_highlight(self) -> None:
+        self._highlight = None
+        if self._highlight_id is None:
+            return
+        self._canvas.delete(self._highlight_id)
+        self._highlight_id = None
+
+    @override
+    def focus(self) -> None:
+        self._canvas.focus_set()
+
+    @override
+    def move_to(self, paragraph: ParagraphView) -> None:
+        frame = paragraph.widget
+        if not isinstance(frame, tk.Frame): raise ArgumentTypeError("the paragraph view must be a TkParagraphView")
+        old: tk.Canvas = self._canvas
+        had_focus: bool = old.focus_get() is old
+        self._canvas = self._build(frame)
+        old.destroy()
+        if had_focus:
+            self._canvas.focus_set()
+
+    @override
+    def destroy(self) -> None:
+        self._canvas.destroy()
+
+    @override
+    def actual_geometry(self) -> Geometry:
+        return (self._canvas.winfo_x(), self._canvas.winfo_y(), self._canvas.winfo_width(),
+                self._canvas.winfo_height())
+
+
+class TkParagraphView(ParagraphView):
+    """A paragraph is a frame, in a window item of the chapter canvas, so that it scrolls with the canvas"""
+    def __init__(self, canvas: tk.Canvas):
+        self._canvas = canvas
+        self._frame = tk.Frame(canvas,
+                          bg="light grey",
+                          bd=0,
+                          height=80,
+                          padx=0,
+                          pady=0,
+                          borderwidth=0,
+                          relief="flat",
+                          cursor="ibeam")
+        self._frame.bind('<Button-1>', self._handle_mouse_button_1)
+        self._frame_id = self._canvas.create_window(0, 0, anchor="nw", window=self._frame)
+
+    @property
+    @override
+    def widget(self) -> tk.Frame:
+        return self._frame
+
+    @property
+    def frame_id(self) -> int:
+        return self._frame_id
+
+    def _handle_mouse_button_1(self, event: tk.Event) -> None:
+        if tracer.enabled:
+            tracer.instant("paragraph button 1", "input", {"x": event.x, "y": event.y})
+
+    @override
+    def place(self, x: int, y: int, width: int, height: int) -> None:
+        self._canvas.coords(self._frame_id, x, y)
+        self._canvas.itemconfigure(self._frame_id, width=width, height=height)
+
+    @override
+    def destroy(self) -> None:
+        self._frame.destroy()
+
+    @override
+    def actual_geometry(self) -> Geometry:
+        return (self._frame.winfo_x() + int(self._canvas.canvasx(0)),
+                self._frame.winfo_y() + int(self._canvas.canvasy(0)),
+                self._frame.winfo_width(),
+                self._frame.winfo_height())
+
+
+class TkChapterView(ChapterView):
+    """A scrollable canvas, which the paragraph frames are window items of"""
+    def __init__(self, parent: tk.Misc):
+        self._canvas = tk.Canvas(parent, bg="white", cursor="arrow")
+        self._canvas.pack(side="left", fill="both", expand=True)
+        self._scroll_height: int = 0
+
+    @property
+    @override
+    def widget(self) -> tk.Canvas:
+        return self._canvas
+
+    @property
+    @override
+    def x(self) -> int:
+        return self._canvas.winfo_x()
+
+    @property
+    @override
+    def y(self) -> int:
+        return self._canvas.winfo_y()
+
+    @property
+    @override
+    def root_x(self) -> int:
+        return self._canvas.winfo_rootx()
+
+    @property
+    @override
+    def root_y(self) -> int:
+        return self._canvas.winfo_rooty()
+
+    @property
+    @override
+    def width(self) -> int:
+        return self._canvas.winfo_width()
+
+    @property
+    @override
+    def height(self) -> int:
+        return self._canvas.winfo_height()
+
+    @property
+    @override
+    def view_left(self) -> int:
+        return int(self._canvas.canvasx(0))
+
+    @property
+    @override
+    def view_top(self) -> int:
+        return int(self._canvas.canvasy(0))
+
+    @override
+    def set_scroll_region(self, width: int, height: int) -> None:
+        self._canvas.configure(scrollregion=(0, 0, width, height))
+        self._scroll_height = height
+
+    @override
+    def scroll_to(self, top: int) -> None:
+        if self._scroll_height <= 0:
+            return
+        self._canvas.yview_moveto(top / self._scroll_height)
+
+    @override
+    def bind_resize(self, callback: Callable[[], None]) -> None:
+        self._canvas.bind("<Configure>", lambda _event: callback())
+
+    @override
+    def sync(self) -> None:
+        self._canvas.update_idletasks()
+
+    @override
+    def after(self, ms: int, func: Callable[..., object], *args: Any) -> str:
+        return self._canvas.after(ms, func, *args)
+
+    @override
+    def after_idle(self, func: Callable[..., object], *args: Any) -> str:
+        return self._canvas.after_idle(func, *args)
+
+    @override
+    def after_cancel(self, id: str) -> None: # pylint: disable=redefined-builtin
+        self._canvas.after_cancel(id)
+
+
+class TkBackend(Backend):
+    """Views with Tk widgets, measured with Tk fonts"""
+    def __init__(self) -> None:
+        self._metrics = TkFontMetrics()
+
+    @property
+    @override
+    def metrics(self) -> FontMetrics:
+        return self._metrics
+
+    @override
+    def chapter_view(self, parent: tk.Misc | None) -> ChapterView:
+        if parent is None:
+            raise ArgumentTypeError("a Tk chapter view needs a parent widget")
+        return TkChapterView(parent)
+
+    @override
+    def paragraph_view(self, chapter: ChapterView) -> ParagraphView:
+        canvas = chapter.widget
+        if not isinstance(canvas, tk.Canvas): raise ArgumentTypeError("the chapter view must be a TkChapterView")
+        return TkParagraphView(canvas)
+
+    @override
+    def token_view(self, # pylint: disable=too-many-arguments,too-many-positional-arguments
+                   paragraph: ParagraphView,
+                   word: str,
+                   font: Font,
+                   width: int,
+                   height: int) -> TokenView:
+        frame = paragraph.widget
+        if not isinstance(frame, tk.Frame): raise ArgumentTypeError("the paragraph view must be a TkParagraphView")
+        return TkTokenView(frame, word, font, width, height)
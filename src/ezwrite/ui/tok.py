@@ -1,5 +1,3 @@
-import tkinter as tk
-import tkinter.font
 from abc import ABC, abstractmethod
 from argparse import ArgumentTypeError
 from typing import List, Optional, Tuple, override
@@ -10,7 +8,11 @@ from rdflib.term import URIRef
 from ezwrite.editors.ez_editor import EzEditor
 from ezwrite.graph.ezentity import Entity, EzEntity
 from ezwrite.graph.graph_token import GraphToken
+from ezwrite.layout.geometry import Box
+from ezwrite.layout.metrics import Font, FontMetrics
 from ezwrite.ui.position import Position
+from ezwrite.ui.views import Backend, ParagraphView, TokenView
+from ezwrite.ui.widget_registry import WidgetRegistry
 
 
 class EditableEntity(ABC):
@@ -59,9 +61,13 @@ class AbstractToken(GraphToken, EditableEntity, ABC):
     def place_cursor(self, pos: Position) -> None:
         pass
 
+    @abstractmethod
+    def set_cursor_colour(self, colour: str) -> None:
+        pass
+
     @property
     @abstractmethod
-    def canvas(self) -> tk.Canvas:
+    def view(self) -> TokenView:
         pass
 
 
@@ -71,29 +77,60 @@ class EzwriteContainer(EzEntity, EditableEntity, ABC):
     def __init__(self, graph: Graph, subject: URIRef):
         super().__init__(graph, subject)
 
-    @abstractmethod
-    def remove_cursor_except(self, tok: AbstractToken) -> None:
-        pass
+class RootContainer(EzwriteContainer, ABC):
+    """Generic class of the container of other containers - the root of a document"""
+    def __init__(self, graph: Graph, subject: URIRef, backend: Backend):
+        super().__init__(graph, subject)
+        self._backend = backend
+        self._widget_registry = WidgetRegistry()
+        self._caret_owners: List[AbstractToken] = []
 
-    @abstractmethod
-    def deselect_all(self) -> None:
-        pass
+    @property
+    def backend(self) -> Backend:
+        """Measures the text of the document, and creates the views that show it"""
+        return self._backend
 
-    def get_selected(self) -> List["Tok"]:
-        selected: List["Tok"] = []
-        for child in self.child_entities:
-            if isinstance(child, Tok):
-                tok: Tok = child
-                selected.extend(tok.get_selected())
-                continue
-            if not isinstance(child, EzwriteContainer):
-                continue
-            container: EzwriteContainer = child
-            selected.extend(container.get_selected())
-        return selected
+    @property
+    def widget_registry(self) -> WidgetRegistry:
+        return self._widget_registry
+
+    @property
+    def caret_owner(self) -> AbstractToken | None:
+        """The token that has the primary caret"""
+        if len(self._caret_owners) == 0:
+            return None
+        return self._caret_owners[0]
+
+    @property
+    def caret_owners(self) -> List[AbstractToken]:
+        """All the tokens that have a caret, the primary caret first"""
+        return self._caret_owners
+
+    def move_caret(self, tok: AbstractToken) -> None:
+        """Give the primary caret to tok. Only the previous owner needs to remove its cursor,
+        so this costs the same however big the document is."""
+        previous: AbstractToken | None = self.caret_owner
+        self.caret_placed(tok)
+        if previous is tok:
+            return
+        secondary: List[AbstractToken] = [owner for owner in self._caret_owners[1:] if owner is not tok]
+        self._caret_owners = [tok] + secondary
+        if previous is not None and not any(owner is previous for owner in secondary):
+            previous.remove_cursor()
+
+    def add_caret(self, tok: AbstractToken) -> None:
+        """Add a secondary caret"""
+        if any(owner is tok for owner in self._caret_owners):
+            return
+        self._caret_owners.append(tok)
+
+    def remove_caret(self, tok: AbstractToken) -> None:
+        """Called when tok no longer has a caret, e.g. when it is zapped"""
+        self._caret_owners = [owner for owner in self._caret_owners if owner is not tok]
+
+    def caret_placed(self, tok: AbstractToken) -> None:
+        """Called whenever the primary caret is placed, whether or not it moved to another token"""
 
-class RootContainer(EzwriteContainer, ABC):
-    """Generic class of the container of other containers - the root of a document"""
     @abstractmethod
     def layout(self) -> None:
         pass
@@ -102,6 +139,11 @@ class RootContainer(EzwriteContainer, ABC):
     def set_layout_needed(self) -> None:
         pass
 
+    @abstractmethod
+    def cursor_on_line(self, tok: "Tok", line_offset: int, x: int) -> Optional["RelativeCursor"]:
+        """The cursor position nearest to x, in document coordinates, on the line that is
+        line_offset lines away from the line of tok, or None if there is no such line"""
+
 
 class TokenContainer(EzwriteContainer, ABC):
     """This is more specifically an abstractrion of a sentence"""
@@ -109,12 +151,8 @@ class TokenContainer(EzwriteContainer, ABC):
         super().__init__(graph, subject)
 
     @abstractmethod
-    def layout(self, pos: Position, frame_width: int) -> int:
-        pass
-
-    @abstractmethod
-    def parent_frame(self) -> tk.Frame:
-        pass
+    def paragraph_view(self) -> ParagraphView:
+        """The view that the tokens of this container are placed in"""
 
 
 class RelativeCursor():
@@ -132,74 +170,77 @@ class Tok(AbstractToken):
 
     A token is a word or single punctuation character. It is modeled as a Label."""
 
-    cursor_colours: List[str] = ["purple","gold"]
-    cursor_index: int = 0
-    @classmethod
-    def _cursor_colour(cls) -> str:
-        Tok.cursor_index = (Tok.cursor_index + 1) % len(Tok.cursor_colours)
-        return Tok.cursor_colours[Tok.cursor_index]
-
-    def __init__(self, sentence: TokenContainer, word: str, font=None, append_to_sentence = True):
+    def __init__(self, sentence: TokenContainer, word: str, font: Font = None, append_to_sentence = True):
         self._word = word
+        root: RootContainer = sentence.get_root_container()
+        metrics: FontMetrics = root.backend.metrics
         if font is None:
-            font = tkinter.font.Font(name="TkDefaultFont", exists=True)
+            font = metrics.default_font()
         self._font = font
-        frame: tk.Frame = sentence.parent_frame()
+        self._metrics = metrics
         super().__init__(sentence.graph)
-        self._canvas = tk.Canvas(frame,
-                                 borderwidth=0,
-                                 bd=0,
-                                 highlightthickness=0,
-                                 relief="flat")
-        width = font.measure(word)
+        width = metrics.width(font, word)
         width = max(width, 2) # for carriage return etc, need space to display the cursor
-        height = font.metrics()['linespace']
+        height = metrics.linespace(font)
+        self._measured_width: int = width
+        self._measured_height: int = height
+        self._box: Box = Box(-1, -1, width, height)  # not placed yet
+        self._layout_index: int = -1
         self._cursor_pos = Position(-5, 0)
         self._cursor_height: int = height
-        self._cursor_job_id: str | None = None
         self._cursor_word_index: int = 0
-        self._cursor_id = self._canvas.create_line(
-            self._cursor_pos.x,
-            self._cursor_pos.y,
-            self._cursor_pos.x,
-            self._cursor_pos.y + self._cursor_height,
-            fill="white",
-            width=2)
-        self._highlight_id: int | None = None
+        self._highlighted: bool = False
         self._start_select = 0
         self._end_select = 0
-        self._text_id = self._canvas.create_text(0, 0,
-                         text=word,
-                         fill="black",
-                         font=font,
-                         anchor="nw")
-        self._canvas.config(width=width, height=height)
-        self._canvas.pack()
+        self._view: TokenView = root.backend.token_view(sentence.paragraph_view(), word, font, width, height)
         self._sentence: TokenContainer = sentence
         self._editor: EzEditor | None = None
+        if self._view.widget is not None:
+            root.widget_registry.register(self._view.widget, self)
         if append_to_sentence:
             sentence.add_child_entity(self)
 
     @override
     def zap(self) -> None:
         self._cursor_pos.x = -1
-        self._canvas.destroy()
+        root: RootContainer = self.get_root_container()
+        if self._view.widget is not None:
+            root.widget_registry.unregister(self._view.widget)
+        root.remove_caret(self)
+        self._view.destroy()
         super().zap()
-        self.get_root_container().set_layout_needed()
+        root.set_layout_needed()
+
+    def reparent(self, sentence: TokenContainer) -> None:
+        """Make sentence the parent of this token, once the token has been moved into its list, e.g. with
+        a run of tokens by Sentence.append_tokens_from. The sentences share the paragraph view, so the token
+        keeps its view."""
+        self._sentence = sentence
+
+    def move_view_to(self, paragraph: ParagraphView) -> None:
+        """Show this token in another paragraph, after its sentence has moved there.
+        The token keeps its word, its measurements and its node in the graph; it is placed
+        again at the next layout of that paragraph."""
+        widget = self._view.widget
+        self._view.move_to(paragraph)
+        if self._view.widget is not widget:
+            # e.g. a Tk view builds its canvas again, in the frame of the paragraph
+            registry: WidgetRegistry = self.get_root_container().widget_registry
+            if widget is not None:
+                registry.unregister(widget)
+            if self._view.widget is not None:
+                registry.register(self._view.widget, self)
+        self._box = Box(-1, -1, self._measured_width, self._measured_height)  # not placed yet
+        self._layout_index = -1
 
     def change_word(self, new_word: str):
         self._word = new_word
         self.resize()
-        self._canvas.itemconfig(self._text_id, text=new_word)
+        self._view.set_text(new_word)
         self.mark_dirty()
 
-    def widget_inside(self, widget: tk.Misc) -> Entity | None:
-        if self._canvas == widget:
-            return self
-        return None
-
     @property
-    def font(self) -> tkinter.font.Font:
+    def font(self) -> Font:
         return self._font
 
     @property
@@ -221,44 +262,40 @@ class Tok(AbstractToken):
 
     @property
     @override
-    def canvas(self) -> tk.Canvas:
-        return self._canvas
+    def view(self) -> TokenView:
+        return self._view
 
     def select(self, start_word_index: int = 0, end_word_index: int = -1) -> None:
         self.deselect()
         (start_word_index, start_x) = self.get_x_pos_of_word_index(start_word_index)
         (end_word_index, end_x) = self.get_x_pos_of_word_index(end_word_index)
-        self._highlight_id = self._canvas.create_rectangle(
-            start_x,
-            0,
-            end_x,
-            self._cursor_height,
-            fill="turquoise", outline=""
-        )
-        self._canvas.tag_lower(self._highlight_id, self._cursor_id)
+        self._view.show_highlight(start_x, end_x, self._cursor_height)
+        self._highlighted = True
         self._start_select = start_word_index
         self._end_select = end_word_index
 
     def deselect(self) -> bool:
-        if self._highlight_id is None:
+        if not self._highlighted:
             return False
-        self._canvas.delete(self._highlight_id)
-        self._highlight_id = None
+        self._view.hide_highlight()
+        self._highlighted = False
         return True
 
-    def get_selected(self) -> List["Tok"]:
-        if self._highlight_id is not None:
-            return [self]
-        return []
+    @property
+    def highlight_span(self) -> Tuple[int, int] | None:
+        """The highlighted characters of the word, or None when nothing is highlighted"""
+        if not self._highlighted:
+            return None
+        return (self._start_select, self._end_select)
 
     def get_x_pos_of_word_index(self, word_index) -> Tuple[int, int]:
         max_len = len(self._word)
         i = max_len if word_index == -1 else min(max_len, word_index)
-        x = 0 if i == 0 else self._font.measure(self._word[0:i])
+        x = 0 if i == 0 else self._metrics.width(self._font, self._word[0:i])
         return (i, x)
 
     def remove_cursor_everywhere_except_this(self) -> None:
-        self.get_root_container().remove_cursor_except(self)
+        self.get_root_container().move_caret(self)
 
     def place_cursor_at_word_index(self, word_index: int):
         (i, x) = self.get_x_pos_of_word_index(word_index)
@@ -277,7 +314,7 @@ class Tok(AbstractToken):
         closest_distance: int | None = None
         word_index: int = 0
         for i in range(len(self._word) + 1):
-            x_after_substring = 0 if i == 0 else self._font.measure(self._word[0:i])
+            x_after_substring = 0 if i == 0 else self._metrics.width(self._font, self._word[0:i])
             distance = abs(event_x - x_after_substring)
             if closest_distance is None or distance < closest_distance:
                 closest_x = x_after_substring
@@ -310,7 +347,8 @@ class Tok(AbstractToken):
             prev_tok: Tok = prev_entity
             prev_tok.set_cursor_word_index(len(prev_tok.word))
             return prev_tok.move_left()
-        x: int = 0 if self._cursor_word_index == 1 else self._font.measure(self._word[0:self._cursor_word_index - 1])
+        x: int = (0 if self._cursor_word_index == 1
+                  else self._metrics.width(self._font, self._word[0:self._cursor_word_index - 1]))
         self.place_cursor_at_word_index_and_x_position(self._cursor_word_index - 1, x)
         return self
 
@@ -321,109 +359,88 @@ class Tok(AbstractToken):
                 return None
             if not isinstance(next_entity, Tok): raise ArgumentTypeError("a peer of a Tok must be a Tok")
             next_tok: Tok = next_entity
-            return next_tok.place_cursor_at_word_index_and_x_position(0, 0)
-        x = self._font.measure(self._word[0:self._cursor_word_index + 1])
+            next_tok.place_cursor_at_word_index_and_x_position(0, 0)
+            return next_tok
+        x = self._metrics.width(self._font, self._word[0:self._cursor_word_index + 1])
         if self._cursor_word_index == len(self._word):
             x -= 2
         self.place_cursor_at_word_index_and_x_position(self._cursor_word_index + 1, x)
         return self
 
     def move_up(self) -> Optional["Tok"]:
-        abs_cursor_x = self._canvas.winfo_rootx() + self._cursor_pos.x
-        abs_cursor_y = self._canvas.winfo_rooty() + self._cursor_pos.y
-        closest: Tok | None = None
-        closest_distance: float | None = None
-        ent = self.previous_peer()
-        while ent is not None:
-            if not isinstance(ent, Tok): raise ArgumentTypeError("a peer of a Tok must be a Tok")
-            tok: Tok = ent
-            x = tok.canvas.winfo_rootx() + tok.canvas.winfo_width() / 2
-            y = tok.canvas.winfo_rooty() + tok.canvas.winfo_height()
-            if y <= abs_cursor_y:
-                distance = abs(x - abs_cursor_x)
-                if closest_distance is None or distance < closest_distance:
-                    closest_distance = distance
-                    closest = tok
-                else:
-                    break
-            ent = ent.previous_peer()
-        if closest is None:
-            return None
-        closest.place_cursor_x(abs_cursor_x - closest.canvas.winfo_rootx())
-        return closest
+        return self._move_to_line(-1)
 
     def move_down(self) -> Optional["Tok"]:
-        abs_cursor_x = self._canvas.winfo_rootx() + self._cursor_pos.x
-        abs_cursor_y = self._canvas.winfo_rooty() + self._cursor_pos.y + self._cursor_height
-        closest: Tok | None = None
-        closest_distance: float | None = None
-        ent = self.next_peer()
-        while ent is not None:
-            if not isinstance(ent, Tok): raise ArgumentTypeError("a peer of a Tok must be a Tok")
-            tok: Tok = ent
-            x = tok.canvas.winfo_rootx() + tok.canvas.winfo_width() / 2
-            y = tok.canvas.winfo_rooty()
-            if y >= abs_cursor_y:
-                distance = abs(x - abs_cursor_x)
-                if closest_distance is None or distance < closest_distance:
-                    closest_distance = distance
-                    closest = tok
-                else:
-                    break
-            ent = ent.next_peer()
-        if closest is None:
+        return self._move_to_line(1)
+
+    def _move_to_line(self, line_offset: int) -> Optional["Tok"]:
+        """Move the cursor to the line line_offset lines away, keeping its x position.
+        The root container finds the line from the laid out line boxes, so this costs
+        the same however long the line or the paragraph is."""
+        cursor_x: int = self.doc_x + self._cursor_pos.x
+        rel: RelativeCursor | None = self.get_root_container().cursor_on_line(self, line_offset, cursor_x)
+        if rel is None:
             return None
-        closest.place_cursor_x(abs_cursor_x - closest.canvas.winfo_rootx())
-        return closest
+        rel.token.place_cursor_at_word_index_and_x_position(rel.word_index, rel.x)
+        return rel.token
 
     def resize(self) -> None:
         # for carriage return etc, need space to display the cursor, hence at least 2:
-        width = max(self._font.measure(self._word), 2)
-        height = self._font.metrics()['linespace']
-        self._canvas.config(width=width, height=height) # probably unnecessary, but no harm done
-        #self._canvas.pack(padx=0, pady=0)
+        self._measured_width = max(self._metrics.width(self._font, self._word), 2)
+        self._measured_height = self._metrics.linespace(self._font)
+        self._view.set_size(self._measured_width, self._measured_height)
+
+    def place_at(self, x: int, y: int, layout_index: int) -> None:
+        """Apply the position that the paragraph's line breaking has given this token,
+        and record it in the token's box. layout_index is the token's index in the paragraph."""
+        self._layout_index = layout_index
+        if not self._box.differs_from(x, y, self._measured_width, self._measured_height):
+            return
+        self._box.place(x, y, self._measured_width, self._measured_height)
+        self._view.place(x, y, self._measured_width, self._measured_height)
 
-    def layout(self, pos: Position, frame_width: int) -> int:
-        # for carriage return etc, need space to display the cursor, hence at least 2:
-        width = max(self._font.measure(self._word), 2)
-        height = self._font.metrics()['linespace']
-        self._canvas.config(width=width, height=height) # probably unnecessary, but no harm done
-        self._canvas.pack(padx=0, pady=0)
-        if pos.x + width > frame_width:
-            pos.x = 0
-            pos.y += height
-        self._canvas.place(x=pos.x, y=pos.y, width=width, height=height)
-        pos.x += width
-        return pos.y + height
+    @property
+    def box(self) -> Box:
+        return self._box
+
+    @property
+    def layout_index(self) -> int:
+        """The index of this token in its paragraph at the last layout, or -1 if not laid out yet"""
+        return self._layout_index
+
+    def geometry_mismatch(self) -> str | None:
+        """For debugging: compare the recorded box with what Tk reports"""
+        actual = self._view.actual_geometry()
+        if actual is None or not self._box.differs_from(*actual):
+            return None
+        return f"token {self._word!r}: model {self._box}, Tk {actual}"
+
+    @property
+    def measured_width(self) -> int:
+        return self._measured_width
+
+    @property
+    def measured_height(self) -> int:
+        return self._measured_height
 
     @override
     def remove_cursor(self) -> None:
         if self._cursor_pos.x < 0:
             return
-        self._canvas.move(self._cursor_id, -5 - self._cursor_pos.x, 0)
         self._cursor_pos.x = -5
+        self._view.set_cursor_position(self._cursor_pos.x, self._cursor_pos.y)
 
     @override
     def place_cursor(self, pos: Position) -> None:
-        self._canvas.focus_set()
-        self._canvas.move(
-            self._cursor_id,
-            pos.x - self._cursor_pos.x,
-            pos.y - self._cursor_pos.y
-        )
+        self._view.focus()
+        self._view.set_cursor_position(pos.x, pos.y)
         self._cursor_pos = pos
-        root = self._canvas.winfo_toplevel()
-        if self._cursor_job_id is not None:
-            root.after_cancel(self._cursor_job_id)
-            self._cursor_job_id = None
-        self._cursor_job_id = root.after(150, self.cycle_cursor_colour)
-
-    def cycle_cursor_colour(self) -> None:
-        self._cursor_job_id = None
+
+    @override
+    def set_cursor_colour(self, colour: str) -> None:
         if self._cursor_pos.x < 0:
             return
-        self._canvas.itemconfig(self._cursor_id, fill=Tok._cursor_colour())
-        self._cursor_job_id = self._canvas.winfo_toplevel().after(370, self.cycle_cursor_colour)
+        self._view.set_cursor_colour(colour)
 
     @override
     def remove_child_entity(self, child: Entity) -> bool:
@@ -454,32 +471,49 @@ class Tok(AbstractToken):
     @override
     @property
     def x(self) -> int:
-        return self._canvas.winfo_x()
+        return self._box.x
 
     @override
     @property
     def y(self) -> int:
-        return self._canvas.winfo_y()
+        return self._box.y
+
+    @override
+    @property
+    def doc_x(self) -> int:
+        return self._frame_entity().doc_x + self._box.x
+
+    @override
+    @property
+    def doc_y(self) -> int:
+        return self._frame_entity().doc_y + self._box.y
 
     @override
     @property
     def root_x(self) -> int:
-        return self._canvas.winfo_rootx()
+        return self._frame_entity().root_x + self._box.x
 
     @override
     @property
     def root_y(self) -> int:
-        return self._canvas.winfo_rooty()
+        return self._frame_entity().root_y + self._box.y
 
     @override
     @property
     def width(self) -> int:
-        return self._canvas.winfo_width()
+        return self._box.width
 
     @override
     @property
     def height(self) -> int:
-        return self._canvas.winfo_height()
+        return self._box.height
+
+    def _frame_entity(self) -> Entity:
+        """The entity that owns the frame this token is placed in, i.e. the paragraph"""
+        frame_entity = self._sentence.parent
+        if frame_entity is None:
+            raise ValueError("a token must be in a sentence that is in a paragraph")
+        return frame_entity
 
     @property
     def selection_start(self) -> int:
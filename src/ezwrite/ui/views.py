@@ -0,0 +1,183 @@
+import tkinter as tk
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from typing import Any, Tuple
+
+from ezwrite.layout.metrics import Font, FontMetrics
+
+# x, y, width and height
+Geometry = Tuple[int, int, int, int]
+
+
+class TokenView(ABC):
+    """What a token shows: its word, its caret and its highlight. The token keeps the state,
+    e.g. where its caret is, and the view only shows it."""
+    @property
+    @abstractmethod
+    def widget(self) -> tk.Misc | None:
+        """The widget that events come from, or None if the view has no widget"""
+
+    @abstractmethod
+    def set_text(self, word: str) -> None:
+        """Show another word"""
+
+    @abstractmethod
+    def set_size(self, width: int, height: int) -> None:
+        """Resize the view, e.g. when its word changes"""
+
+    @abstractmethod
+    def place(self, x: int, y: int, width: int, height: int) -> None:
+        """Position the view in its paragraph"""
+
+    @abstractmethod
+    def set_cursor_position(self, x: int, y: int) -> None:
+        """Move the caret, relative to the view"""
+
+    @abstractmethod
+    def set_cursor_colour(self, colour: str) -> None:
+        """Colour the caret, e.g. white to hide it"""
+
+    @abstractmethod
+    def show_highlight(self, start_x: int, end_x: int, height: int) -> None:
+        """Highlight the selected part of the word, from start_x to end_x"""
+
+    @abstractmethod
+    def hide_highlight(self) -> None:
+        """Remove the highlight, if there is one"""
+
+    @abstractmethod
+    def focus(self) -> None:
+        """Send the key events to this view"""
+
+    @abstractmethod
+    def move_to(self, paragraph: "ParagraphView") -> None:
+        """Show the token in another paragraph, e.g. when its sentence moves there.
+        It is placed again at the next layout of that paragraph."""
+
+    @abstractmethod
+    def destroy(self) -> None:
+        """Free the resources of the view, e.g. its widget"""
+
+    def actual_geometry(self) -> Geometry | None:
+        """For debugging: where the view really is in its paragraph, if that can differ from where it was placed"""
+        return None
+
+
+class ParagraphView(ABC):
+    """The area of a paragraph in the chapter, which its tokens are placed in"""
+    @property
+    @abstractmethod
+    def widget(self) -> tk.Misc | None:
+        """The widget that the views of its tokens are in, or None if the view has no widget"""
+
+    @abstractmethod
+    def place(self, x: int, y: int, width: int, height: int) -> None:
+        """Position the view in the document"""
+
+    @abstractmethod
+    def destroy(self) -> None:
+        """Free the resources of the view, e.g. its widget"""
+
+    def actual_geometry(self) -> Geometry | None:
+        """For debugging: where the view really is in the document, if that can differ from where it was placed"""
+        return None
+
+
+class ChapterView(ABC):
+    """The scrollable viewport that shows a chapter. It is also the Timers of the layout and editing of the chapter."""
+    @property
+    @abstractmethod
+    def widget(self) -> tk.Misc | None:
+        """The widget that events come from, or None if the view has no widget"""
+
+    @property
+    @abstractmethod
+    def x(self) -> int:
+        """The x of the viewport in its parent"""
+
+    @property
+    @abstractmethod
+    def y(self) -> int:
+        """The y of the viewport in its parent"""
+
+    @property
+    @abstractmethod
+    def root_x(self) -> int:
+        """The x of the viewport on the screen"""
+
+    @property
+    @abstractmethod
+    def root_y(self) -> int:
+        """The y of the viewport on the screen"""
+
+    @property
+    @abstractmethod
+    def width(self) -> int:
+        """The width of the viewport"""
+
+    @property
+    @abstractmethod
+    def height(self) -> int:
+        """The height of the viewport"""
+
+    @property
+    @abstractmethod
+    def view_left(self) -> int:
+        """The document x at the left edge of the viewport"""
+
+    @property
+    @abstractmethod
+    def view_top(self) -> int:
+        """The document y at the top of the viewport"""
+
+    @abstractmethod
+    def set_scroll_region(self, width: int, height: int) -> None:
+        """The size of the document that the viewport scrolls over"""
+
+    @abstractmethod
+    def scroll_to(self, top: int) -> None:
+        """Scroll so that the document y top is at the top of the viewport"""
+
+    @abstractmethod
+    def bind_resize(self, callback: Callable[[], None]) -> None:
+        """Call back when the viewport changes size"""
+
+    def sync(self) -> None:
+        """For debugging: finish any geometry management that is pending, before actual_geometry is compared"""
+
+    @abstractmethod
+    def after(self, ms: int, func: Callable[..., object], *args: Any) -> str:
+        """Call func with args after ms milliseconds, and return an id to cancel it with"""
+
+    @abstractmethod
+    def after_idle(self, func: Callable[..., object], *args: Any) -> str:
+        """Call func with args when there are no events to handle"""
+
+    @abstractmethod
+    def after_cancel(self, id: str) -> None: # pylint: disable=redefined-builtin
+        """Cancel a call that after or after_idle scheduled"""
+
+
+class Backend(ABC):
+    """Measures text and creates the views of a chapter, e.g. with Tk widgets, or without a display"""
+    @property
+    @abstractmethod
+    def metrics(self) -> FontMetrics:
+        pass
+
+    @abstractmethod
+    def chapter_view(self, parent: tk.Misc | None) -> ChapterView:
+        pass
+
+    @abstractmethod
+    def paragraph_view(self, chapter: ChapterView) -> ParagraphView:
+        pass
+
+    @abstractmethod
+    def token_view(self, # pylint: disable=too-many-arguments,too-many-positional-arguments
+                   paragraph: ParagraphView,
+                   word: str,
+                   font: Font,
+                   width: int,
+                   height: int) -> TokenView:
+        pass
@@ -0,0 +1,31 @@
+import tkinter as tk
+from typing import Dict
+
+from ezwrite.graph.entity import Entity
+
+
+class WidgetRegistry():
+    """Maps each Tk widget, or an item on a canvas, to the entity that it displays,
+    so that an event can be routed to its entity with a single dict lookup.
+    Widgets are keyed by their Tk path name, which is also what Tk reports for
+    widgets that tkinter did not create."""
+    def __init__(self):
+        self._entities: Dict[str, Entity] = {}
+
+    @staticmethod
+    def _key(widget: tk.Misc | str, item_id: int | None) -> str:
+        if item_id is None:
+            return str(widget)
+        return f"{widget}#{item_id}"
+
+    def register(self, widget: tk.Misc | str, entity: Entity, item_id: int | None = None) -> None:
+        self._entities[WidgetRegistry._key(widget, item_id)] = entity
+
+    def unregister(self, widget: tk.Misc | str, item_id: int | None = None) -> None:
+        self._entities.pop(WidgetRegistry._key(widget, item_id), None)
+
+    def lookup(self, widget: tk.Misc | str, item_id: int | None = None) -> Entity | None:
+        return self._entities.get(WidgetRegistry._key(widget, item_id))
+
+    def __len__(self) -> int:
+        return len(self._entities)
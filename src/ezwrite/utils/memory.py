@@ -0,0 +1,234 @@
+import gc
+import sys
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple
+
+from ezwrite.graph.entity import Entity
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None  # type: ignore[assignment]
+
+
+POINTER_SIZE: int = 8
+
+
+def peak_rss_bytes() -> int | None:
+    """The peak resident set size of this process so far, or None where the platform does not report it"""
+    if resource is None:
+        return None
+    peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def start_tracing(frames: int = 1) -> None:
+    """Trace Python allocations from now on, so that a report can say where the memory went.
+    Start this before the document is built: allocations from before are not traced."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def owned_size(obj: object) -> int:
+    """The size of an object, and of the containers that it holds directly, e.g. its instance dict
+    and a token's lists and arrays, but not of the objects that those hold or refer to.
+    The attributes are found through the garbage collector rather than __dict__, which would
+    give each object a dict of its own and so change what is measured. Attributes that are kept
+    inline, as Python 3.13 does, are left out by getsizeof, so they are counted at a pointer each."""
+    size: int = sys.getsizeof(obj)
+    referents: List[object] = gc.get_referents(obj)
+    if type(obj).__dictoffset__ != 0 and not any(isinstance(value, dict) for value in referents):
+        size += POINTER_SIZE * (len(referents) - 1)  # all but the type
+    for value in referents:
+        if isinstance(value, (list, dict, set, tuple, bytearray)) or hasattr(value, "nbytes"):
+            size += sys.getsizeof(value)
+    return size
+
+
+@dataclass
+class Usage:
+    """A number of objects, and the bytes they take"""
+    count: int = 0
+    bytes: int = 0
+
+    def add(self, count: int, size: int) -> None:
+        self.count += count
+        self.bytes += size
+
+
+@dataclass
+class Spread:
+    """The sizes of a number of things, e.g. paragraphs, so that the mean and the largest can be told"""
+    count: int = 0
+    total: int = 0
+    largest: int = 0
+
+    def add(self, size: int) -> None:
+        self.count += 1
+        self.total += size
+        self.largest = max(self.largest, size)
+
+    @property
+    def mean(self) -> float:
+        return self.total / max(self.count, 1)
+
+    def difference(self, before: "Spread") -> "Spread":
+        """The change of the count and the total. The largest is not known from two spreads, so it is 0."""
+        return Spread(self.count - before.count, self.total - before.total)
+
+
+@dataclass
+class MemoryReport:
+    """Where the memory of a document goes. The entities are counted by walking the document, with
+    the owned_size of each and of its view, if it has one of its own. The paragraphs and chapters are
+    the sizes of each paragraph and chapter with the entities under it, so a large paragraph stands out
+    from the mean. The objects are every object the garbage collector tracks, by type, so
+    they include the rdflib terms and the PropertyLists of the entities. The allocations are the
+    lines that allocated the most of the memory that is traced, if tracing was started.
+    Tk widgets and fonts live in Tcl, so they are not traced and only show in the peak RSS.
+    Take a report before and after an operation, and diff them to see what it cost."""
+    traced_bytes: int
+    peak_rss_bytes: int | None
+    paragraph_bytes: Spread
+    chapter_bytes: Spread
+    entities: Dict[str, Usage]
+    objects: Dict[str, Usage]
+    allocations: List[Tuple[str, int, int]]  # where, bytes and blocks, most bytes first
+    top: int = 10  # the number of object types and allocations that are shown
+    snapshot: tracemalloc.Snapshot | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def entity_bytes(self) -> int:
+        return sum(usage.bytes for usage in self.entities.values())
+
+    @property
+    def paragraphs(self) -> int:
+        return self.paragraph_bytes.count
+
+    @property
+    def chapters(self) -> int:
+        return self.chapter_bytes.count
+
+    def diff(self, before: "MemoryReport") -> "MemoryReport":
+        """What changed since before. The allocations compare the two tracemalloc snapshots.
+        The snapshot of before is itself in memory, so it shows among the objects, as tuples."""
+        allocations: List[Tuple[str, int, int]] = []
+        if self.snapshot is not None and before.snapshot is not None:
+            allocations = [(_where(stat.traceback), stat.size_diff, stat.count_diff)
+                           for stat in self.snapshot.compare_to(before.snapshot, "lineno")[:self.top]]
+        return MemoryReport(
+            self.traced_bytes - before.traced_bytes,
+            None,
+            self.paragraph_bytes.difference(before.paragraph_bytes),
+            Spread(self.chapters, self.chapter_bytes.total - before.chapter_bytes.total),  # the same chapters
+            _difference(self.entities, before.entities),
+            _difference(self.objects, before.objects),
+            allocations,
+            self.top
+        )
+
+    def __str__(self) -> str:
+        lines: List[str] = [
+            f"traced {_mb(self.traced_bytes)}, peak RSS "
+            + ("n/a" if self.peak_rss_bytes is None else _mb(self.peak_rss_bytes)),
+            f"{self.chapters} chapters of {_mb(self.chapter_bytes.total)}, "
+            f"{self.paragraphs} paragraphs of {_mb(self.paragraph_bytes.total)}"
+        ]
+        for name, spread in (("paragraph", self.paragraph_bytes), ("chapter", self.chapter_bytes)):
+            if spread.largest > 0:
+                lines.append(f"  per {name}: {spread.mean / 1024:.1f} KB mean, {spread.largest / 1024:.1f} KB max")
+        lines.append("entities:")
+        lines += [f"  {name:<28} {usage.count:>9} {_mb(usage.bytes):>10} "
+                  f"{usage.bytes / max(usage.count, 1):8.0f} B each" for name, usage in self.entities.items()]
+        lines.append("objects:")
+        lines += [f"  {name:<28} {usage.count:>9} {_mb(usage.bytes):>10}"
+                  for name, usage in list(self.objects.items())[:self.top]]
+        if len(self.allocations) > 0:
+            lines.append("allocations:")
+            lines += [f"  {where:<50} {_mb(size):>10} {blocks:>9} blocks" for where, size, blocks in self.allocations]
+        return "\n".join(lines)
+
+
+def memory_report(roots: List[Entity], top: int = 10) -> MemoryReport:
+    """Report the memory of the documents under roots, e.g. the chapters, with the top object types and allocations.
+    This walks every object, so it takes a moment on a large document."""
+    entities: Dict[str, Usage] = {}
+    (paragraph_bytes, chapter_bytes) = _document_sizes(roots, entities)
+    counts: Counter[str] = Counter()
+    sizes: Counter[str] = Counter()
+    for obj in gc.get_objects():
+        name: str = type(obj).__name__
+        counts[name] += 1
+        sizes[name] += sys.getsizeof(obj)
+    objects: Dict[str, Usage] = {name: Usage(counts[name], size) for name, size in sizes.most_common()}
+    snapshot: tracemalloc.Snapshot | None = None
+    allocations: List[Tuple[str, int, int]] = []
+    traced: int = 0
+    if tracemalloc.is_tracing():
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        allocations = [(_where(stat.traceback), stat.size, stat.count)
+                       for stat in snapshot.statistics("lineno")[:top]]
+        traced = tracemalloc.get_traced_memory()[0]
+    return MemoryReport(traced, peak_rss_bytes(), paragraph_bytes, chapter_bytes,
+                        dict(sorted(entities.items(), key=lambda item: -item[1].bytes)), objects, allocations, top,
+                        snapshot)
+
+
+def _document_sizes(roots: List[Entity], entities: Dict[str, Usage]) -> Tuple[Spread, Spread]:
+    """The sizes of the paragraphs and of the chapters under roots, noting each entity under its class"""
+    paragraph_bytes: Spread = Spread()
+    chapter_bytes: Spread = Spread()
+    views: Set[int] = set()
+    for root in roots:
+        chapter_size: int = _entity_size(root, views, entities)
+        for paragraph in root.child_entities:
+            paragraph_size: int = _tree_size(paragraph, views, entities)
+            paragraph_bytes.add(paragraph_size)
+            chapter_size += paragraph_size
+        chapter_bytes.add(chapter_size)
+    return (paragraph_bytes, chapter_bytes)
+
+
+def _entity_size(entity: Entity, views: Set[int], entities: Dict[str, Usage]) -> int:
+    """The owned_size of an entity and of its view, counted under its class. A view is counted once:
+    a token has a view of its own, but a sentence shows in the view of its paragraph."""
+    size: int = owned_size(entity)
+    view: object | None = getattr(entity, "view", None)
+    if view is not None and id(view) not in views:
+        views.add(id(view))
+        size += owned_size(view)
+    entities.setdefault(type(entity).__name__, Usage()).add(1, size)
+    return size
+
+
+def _tree_size(entity: Entity, views: Set[int], entities: Dict[str, Usage]) -> int:
+    """The size of an entity and of everything under it, e.g. a paragraph with its sentences and tokens"""
+    size: int = 0
+    stack: List[Entity] = [entity]
+    while len(stack) > 0:
+        child: Entity = stack.pop()
+        size += _entity_size(child, views, entities)
+        stack.extend(child.child_entities)
+    return size
+
+
+def _difference(after: Dict[str, Usage], before: Dict[str, Usage]) -> Dict[str, Usage]:
+    """The change of each usage, the largest change first"""
+    changes: Dict[str, Usage] = {}
+    for name in after.keys() | before.keys():
+        (now, then) = (after.get(name, Usage()), before.get(name, Usage()))
+        if now != then:
+            changes[name] = Usage(now.count - then.count, now.bytes - then.bytes)
+    return dict(sorted(changes.items(), key=lambda item: -abs(item[1].bytes)))
+
+
+def _where(traceback: tracemalloc.Traceback) -> str:
+    frame: tracemalloc.Frame = traceback[0]
+    return f"{frame.filename.rsplit('site-packages/', 1)[-1]}:{frame.lineno}"
+
+
+def _mb(size: int) -> str:
+    return f"{size / (1 << 20):.2f} MB"
@@ -0,0 +1,29 @@
+class LatencyStats:
+    """Running statistics of a latency, in seconds, e.g. from an event to the end of its handling"""
+    def __init__(self):
+        self.count: int = 0
+        self.last: float = 0.0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.last = seconds
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count
+
+    def reset(self) -> None:
+        self.count = 0
+        self.last = 0.0
+        self.total = 0.0
+        self.max = 0.0
+
+    def __str__(self) -> str:
+        return (f"n={self.count} last={self.last * 1000:.2f}ms "
+                f"mean={self.mean * 1000:.2f}ms max={self.max * 1000:.2f}ms")
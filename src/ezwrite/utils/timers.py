@@ -0,0 +1,14 @@
+from collections.abc import Callable
+from typing import Any, Protocol
+
+
+class Timers(Protocol):
+    """Callbacks scheduled on the UI thread, as Tk widgets have them with after"""
+    def after(self, ms: int, func: Callable[..., object], *args: Any) -> str:
+        ...
+
+    def after_idle(self, func: Callable[..., object], *args: Any) -> str:
+        ...
+
+    def after_cancel(self, id: str) -> None: # pylint: disable=redefined-builtin
+        ...
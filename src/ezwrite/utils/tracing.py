@@ -0,0 +1,119 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from contextlib import AbstractContextManager, nullcontext
+from typing import Any, Dict, List, ParamSpec, TypeVar
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+_NO_SPAN: AbstractContextManager[None] = nullcontext()
+
+
+class _Span(AbstractContextManager[None]):
+    """Records a complete event, from entering to leaving the span"""
+    def __init__(self, owner: "Tracer", name: str, category: str, args: Dict[str, Any] | None):
+        self._tracer = owner
+        self._name = name
+        self._category = category
+        self._args = args
+        self._start: float = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *_exc_info: object) -> None:
+        self._tracer.complete(self._name, self._category, self._start, time.perf_counter(), self._args)
+
+
+class Tracer():
+    """Named spans around the hot paths of the editor, e.g. layout, hit testing, event dispatch,
+    editing and rendering. When tracing is disabled, a span is a shared no-op context manager
+    and nothing is recorded. When enabled, the events are kept in memory until they are exported
+    in the Chrome trace event format, which chrome://tracing and Perfetto can open."""
+    def __init__(self) -> None:
+        self._enabled: bool = False
+        self._events: List[Dict[str, Any]] = []
+        self._origin: float = time.perf_counter()
+        self._pid: int = os.getpid()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @property
+    def events(self) -> List[Dict[str, Any]]:
+        return self._events
+
+    def enable(self) -> None:
+        self._enabled = True
+
+    def disable(self) -> None:
+        self._enabled = False
+
+    def clear(self) -> None:
+        self._events = []
+
+    def span(self, name: str, category: str = "ezwrite", args: Dict[str, Any] | None = None
+             ) -> AbstractContextManager[None]:
+        if not self._enabled:
+            return _NO_SPAN
+        return _Span(self, name, category, args)
+
+    def instant(self, name: str, category: str = "ezwrite", args: Dict[str, Any] | None = None) -> None:
+        """Record something that happened, e.g. an unhandled key sequence"""
+        if not self._enabled:
+            return
+        event: Dict[str, Any] = self._event(name, category, "i", time.perf_counter())
+        event["s"] = "t"
+        if args is not None:
+            event["args"] = args
+        self._events.append(event)
+
+    def complete(self,
+                 name: str,
+                 category: str,
+                 start: float,
+                 end: float,
+                 args: Dict[str, Any] | None = None
+                 ) -> None: # pylint: disable=too-many-arguments,too-many-positional-arguments
+        """Record a span that started and ended at these perf_counter times"""
+        event: Dict[str, Any] = self._event(name, category, "X", start)
+        event["dur"] = (end - start) * 1_000_000
+        if args is not None:
+            event["args"] = args
+        self._events.append(event)
+
+    def _event(self, name: str, category: str, phase: str, at: float) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "cat": category,
+            "ph": phase,
+            "ts": (at - self._origin) * 1_000_000,
+            "pid": self._pid,
+            "tid": threading.get_ident()
+        }
+
+    def export(self, path: str) -> None:
+        """Write the recorded events as Chrome trace event JSON"""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": self._events, "displayTimeUnit": "ms"}, file)
+
+
+tracer = Tracer()
+
+
+def traced(name: str, category: str = "ezwrite") -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Decorate a function so that each call is a span of the shared tracer"""
+    def decorate(function: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(function)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            with _Span(tracer, name, category, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
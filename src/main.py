@@ -1,5 +1,8 @@
+import sys
+
 from ezwrite.app import App
 
 if __name__ == "__main__":
-    app: App = App()
+    # the file to open, if any, e.g. python -m main manuscript.md
+    app: App = App(sys.argv[1] if len(sys.argv) > 1 else None)
     app.start()
@@ -0,0 +1,19 @@
+import sys
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+# pylint: disable=wrong-import-position
+from rdflib import Graph  # noqa: E402
+
+from ezwrite.ui.chapter import Chapter  # noqa: E402
+from ezwrite.ui.headless import HeadlessBackend  # noqa: E402
+
+
+@pytest.fixture
+def chapter() -> Iterator[Chapter]:
+    """An empty headless chapter, with a viewport of 400 by 300 and fixed advance metrics"""
+    yield Chapter(None, Graph(), HeadlessBackend())
@@ -0,0 +1,54 @@
+"""Build headless chapters from text, and look at what the edits made of them"""
+from typing import List
+
+from ezwrite.editors.tokenizer import iter_paragraphs
+from ezwrite.files.exporter import snapshot
+from ezwrite.ui.chapter import Chapter
+from ezwrite.ui.headless import HeadlessChapterView
+from ezwrite.ui.paragraph import Paragraph
+from ezwrite.ui.sentence import Sentence
+from ezwrite.ui.tok import Tok
+
+
+def build(chapter: Chapter, text: str) -> None:
+    """Build text into the chapter, a paragraph per line, and lay it out"""
+    chapter.append_paragraphs(iter_paragraphs(text))
+    settle(chapter)
+
+
+def settle(chapter: Chapter) -> None:
+    """Apply the queued edits, and run the timers, e.g. of the layout, until they are done"""
+    chapter.flush_edits()
+    view = chapter.view
+    if not isinstance(view, HeadlessChapterView):
+        raise ValueError("the chapter must be headless")
+    view.run_for(10_000)
+
+
+def paragraphs(chapter: Chapter) -> List[str]:
+    return [paragraph.text for paragraph in snapshot(chapter)]
+
+
+def sentences(chapter: Chapter) -> List[List[List[str]]]:
+    """The token words of each sentence of each paragraph"""
+    return [[[tok.word for tok in sentence.child_entities if isinstance(tok, Tok)]
+             for sentence in paragraph.child_entities]
+            for paragraph in chapter.child_entities]
+
+
+def tok_at(chapter: Chapter, paragraph: int, sentence: int, token: int) -> Tok:
+    para = chapter.child_entities[paragraph]
+    if not isinstance(para, Paragraph):
+        raise ValueError("the children of a chapter must be paragraphs")
+    sen = para.child_entities[sentence]
+    if not isinstance(sen, Sentence):
+        raise ValueError("the children of a paragraph must be sentences")
+    tok = sen.child_entities[token]
+    if not isinstance(tok, Tok):
+        raise ValueError("the children of a sentence must be tokens")
+    return tok
+
+
+def tokens(chapter: Chapter) -> List[Tok]:
+    return [tok for paragraph in chapter.child_entities for sentence in paragraph.child_entities
+            for tok in sentence.child_entities if isinstance(tok, Tok)]
@@ -0,0 +1,110 @@
+import time
+from collections.abc import Callable
+from typing import List, override
+
+import pytest
+
+from ezwrite.analysis.analyzers import (Analyzer, IsStale, TextStats,
+                                        TextStatsAnalyzer)
+from ezwrite.analysis.pipeline import AnalysisPipeline, AnalysisResult
+from ezwrite.editors.tokenizer import ParagraphText
+from ezwrite.ui.chapter import Chapter
+from ezwrite.ui.headless import HeadlessChapterView
+from tests.helpers import build, settle, tok_at
+
+
+class SlowTextStatsAnalyzer(TextStatsAnalyzer):
+    """Takes a while over each sentence, so that an edit can catch it at work"""
+    started: List[float] = []
+
+    @override
+    def analyze_sentence(self, words: List[str]) -> TextStats:
+        SlowTextStatsAnalyzer.started.append(time.perf_counter())
+        time.sleep(0.02)
+        return super().analyze_sentence(words)
+
+
+class RecordingAnalyzer(Analyzer):
+    """Notes the text of each paragraph it is given, in the order it is given them"""
+    texts: List[str] = []
+
+    @property
+    @override
+    def name(self) -> str:
+        return "recording"
+
+    @override
+    def analyze(self, paragraph: ParagraphText, is_stale: IsStale) -> object | None:
+        RecordingAnalyzer.texts.append(paragraph.text)
+        return paragraph.text
+
+
+def recording_analyzers() -> List[Analyzer]:
+    return [RecordingAnalyzer()]
+
+
+def slow_analyzers() -> List[Analyzer]:
+    return [SlowTextStatsAnalyzer()]
+
+
+def drive(pipeline: AnalysisPipeline, chapter: Chapter, until: Callable[[], bool] = lambda: False) -> None:
+    """Run frames, sleeping between them to give the actors the time, until the pipeline is done"""
+    view = chapter.view
+    assert isinstance(view, HeadlessChapterView)
+    deadline: float = time.perf_counter() + 10.0
+    while (pipeline.busy and not until()) and time.perf_counter() < deadline:
+        view.run_for(AnalysisPipeline.POLL_INTERVAL_MS)
+        time.sleep(0.002)
+    assert time.perf_counter() < deadline
+
+
+@pytest.fixture(autouse=True)
+def no_quiet_time(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(AnalysisPipeline, "QUIET_MS", 0)
+
+
+def test_every_paragraph_is_analysed(chapter: Chapter) -> None:
+    build(chapter, "One two. Three.\nFour five six.\n")
+    results: List[AnalysisResult] = []
+    pipeline = AnalysisPipeline(chapter, results.extend)
+    pipeline.start()
+    drive(pipeline, chapter)
+    pipeline.stop()
+    stats = [result.result for result in results]
+    assert sorted(stats, key=str) == [TextStats(3, 1, 14, 0), TextStats(3, 2, 15, 0)]
+
+
+def test_an_edit_cancels_the_analysis_of_the_paragraph(chapter: Chapter) -> None:
+    build(chapter, " ".join(["A sentence."] * 20) + "\n")
+    results: List[AnalysisResult] = []
+    SlowTextStatsAnalyzer.started = []
+    pipeline = AnalysisPipeline(chapter, results.extend, slow_analyzers)
+    pipeline.start()
+    drive(pipeline, chapter, until=lambda: len(SlowTextStatsAnalyzer.started) > 0)
+    tok_at(chapter, 0, 0, 0).place_cursor_at_word_index(0)
+    chapter.type_text("Another. ")
+    settle(chapter)
+    drive(pipeline, chapter)
+    pipeline.stop()
+    assert pipeline.stats.cancelled == 1
+    assert [result.result for result in results] == [TextStats(41, 21, 248, 0)]
+
+
+def test_a_paragraph_that_changes_again_waits_behind_the_others(chapter: Chapter,
+                                                               monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(AnalysisPipeline, "MAX_IN_FLIGHT", 1)  # one job at a time, oldest first
+    build(chapter, "First.\nSecond.\n")
+    RecordingAnalyzer.texts = []
+    pipeline = AnalysisPipeline(chapter, lambda results: None, recording_analyzers)
+    pipeline.start()
+    tok_at(chapter, 0, 0, 0).place_cursor_at_word_index(0)
+    chapter.type_text("The ")
+    chapter.flush_edits()
+    view = chapter.view
+    assert isinstance(view, HeadlessChapterView)
+    view.run_for(0)  # lay out the edit, before the pipeline first polls
+    assert not chapter.child_entities[0].dirty
+    drive(pipeline, chapter)
+    pipeline.stop()
+    assert RecordingAnalyzer.texts == ["Second.\n", "The First.\n"]
+    assert pipeline.stats.coalesced == 1
@@ -0,0 +1,230 @@
+from ezwrite.editors.tokenizer import iter_paragraphs
+from ezwrite.ui.chapter import Chapter
+from ezwrite.ui.paragraph import Paragraph
+from ezwrite.ui.selection import DocumentPosition
+from tests.helpers import build, paragraphs, sentences, settle, tok_at, tokens
+
+
+def test_typing_retokenizes_and_resegments_at_the_caret(chapter: Chapter) -> None:
+    build(chapter, "Hello world")
+    tok_at(chapter, 0, 0, 0).place_cursor_at_word_index(5)
+    chapter.type_text(". Bye")
+    settle(chapter)
+    assert sentences(chapter) == [[["Hello", ".", " "], ["Bye", " ", "world"]]]
+    assert chapter.caret_owner is tok_at(chapter, 0, 1, 0)
+
+
+def test_backspace_mid_word(chapter: Chapter) -> None:
+    build(chapter, "Hello world")
+    tok_at(chapter, 0, 0, 2).place_cursor_at_word_index(3)
+    chapter.backspace()
+    chapter.backspace()
+    settle(chapter)
+    assert paragraphs(chapter) == ["Hello wld"]
+    caret = chapter.caret_owner
+    assert caret is tok_at(chapter, 0, 0, 2) and caret.cursor_word_index == 1
+
+
+def test_backspace_that_deletes_a_space_joins_the_words(chapter: Chapter) -> None:
+    build(chapter, "Hello world")
+    tok_at(chapter, 0, 0, 2).place_cursor_at_word_index(0)
+    chapter.backspace()
+    settle(chapter)
+    assert sentences(chapter) == [[["Helloworld"]]]
+
+
+def test_backspace_at_the_start_of_a_paragraph_moves_its_sentences(chapter: Chapter) -> None:
+    chapter.append_paragraphs([[["One", "."]], [["Two", ".", " "], ["Three", "."]]])
+    settle(chapter)
+    moved = tokens(chapter)[2:]
+    first = tok_at(chapter, 1, 0, 0)
+    first.place_cursor_at_word_index(0)
+    chapter.backspace()
+    settle(chapter)
+    assert sentences(chapter) == [[["One", ".", " "], ["Two", ".", " "], ["Three", "."]]]
+    assert tokens(chapter)[3:] == moved  # the same tokens, not copies
+    assert all(tok.layout_index >= 0 for tok in moved)
+    assert chapter.check_geometry() == []
+
+
+def test_paste_in_the_middle_of_a_word(chapter: Chapter) -> None:
+    build(chapter, "Hello world. Again")
+    after = tokens(chapter)[4:]
+    tok_at(chapter, 0, 0, 2).place_cursor_at_word_index(3)
+    chapter.paste("ab cd. ef\nnew para\nlast")
+    settle(chapter)
+    assert paragraphs(chapter) == ["Hello worab cd. ef\n", "new para\n", "lastld. Again"]
+    assert all(tok in tokens(chapter) for tok in after[1:])  # the text after the caret was moved
+    assert chapter.check_geometry() == []
+
+
+def test_a_long_paste_is_built_in_batches(chapter: Chapter) -> None:
+    build(chapter, "Start end")
+    tok_at(chapter, 0, 0, 1).place_cursor_at_word_index(1)
+    chapter.paste("Lorem ipsum dolor sit amet.\n" * 500 + "Tail ")
+    settle(chapter)
+    texts = paragraphs(chapter)
+    assert len(texts) == 501
+    assert texts[0] == "Start Lorem ipsum dolor sit amet.\n"
+    assert texts[-1] == "Tail end"
+    assert chapter.check_geometry() == []
+
+
+def test_deleting_a_selection_across_sentences_joins_the_words_either_side(chapter: Chapter) -> None:
+    build(chapter, "Hello world. This is it.")
+    head = tok_at(chapter, 0, 1, 0)
+    head.place_cursor_at_word_index(2)
+    chapter.select(DocumentPosition(tok_at(chapter, 0, 0, 2), 3), DocumentPosition(head, 2))
+    chapter.backspace()
+    settle(chapter)
+    assert sentences(chapter) == [[["Hello", " ", "woris", " ", "is", " ", "it", "."]]]
+    caret = chapter.caret_owner
+    assert caret is tok_at(chapter, 0, 0, 2) and caret.cursor_word_index == 3
+
+
+def test_a_paste_that_ends_with_a_line_break_leaves_the_text_after_the_caret_a_paragraph(chapter: Chapter) -> None:
+    build(chapter, "Hello world.\nNext.\n")
+    tok_at(chapter, 0, 0, 2).place_cursor_at_word_index(3)
+    chapter.paste("abc\n")
+    settle(chapter)
+    assert sentences(chapter) == [[["Hello", " ", "worabc", "\n"]], [["ld", ".", "\n"]], [["Next", ".", "\n"]]]
+    caret = chapter.caret_owner
+    assert caret is tok_at(chapter, 1, 0, 0) and caret.cursor_word_index == 0
+    assert chapter.check_geometry() == []
+
+
+def test_backspace_of_the_last_character_of_the_document_keeps_the_caret(chapter: Chapter) -> None:
+    build(chapter, "a")
+    tok_at(chapter, 0, 0, 0).place_cursor_at_word_index(1)
+    chapter.backspace()
+    settle(chapter)
+    assert paragraphs(chapter) == [""]
+    assert chapter.type_text("b")
+    settle(chapter)
+    assert paragraphs(chapter) == ["b"]
+
+
+def test_backspace_of_the_last_token_moves_the_caret_to_the_one_before(chapter: Chapter) -> None:
+    build(chapter, "Hi x")
+    tok_at(chapter, 0, 0, 2).place_cursor_at_word_index(1)
+    chapter.backspace()
+    settle(chapter)
+    assert chapter.type_text("y")
+    settle(chapter)
+    assert paragraphs(chapter) == ["Hi y"]
+
+
+def test_backspace_of_the_first_token_moves_the_caret_to_the_one_after(chapter: Chapter) -> None:
+    build(chapter, "x Hi")
+    tok_at(chapter, 0, 0, 0).place_cursor_at_word_index(1)
+    chapter.backspace()
+    settle(chapter)
+    assert chapter.type_text("y")
+    settle(chapter)
+    assert paragraphs(chapter) == ["y Hi"]
+
+
+def test_deleting_everything_keeps_the_caret(chapter: Chapter) -> None:
+    build(chapter, "Hello world.\nMore.\n")
+    last = tokens(chapter)[-1]
+    last.place_cursor_at_word_index(1)
+    chapter.select(DocumentPosition(tok_at(chapter, 0, 0, 0), 0), DocumentPosition(last, 1))
+    chapter.backspace()
+    settle(chapter)
+    assert paragraphs(chapter) == [""]
+    assert chapter.type_text("New")
+    settle(chapter)
+    assert paragraphs(chapter) == ["New"]
+
+
+def test_deleting_a_selection_from_the_start_keeps_the_caret(chapter: Chapter) -> None:
+    build(chapter, "Hello world")
+    head = tok_at(chapter, 0, 0, 1)
+    head.place_cursor_at_word_index(1)
+    chapter.select(DocumentPosition(tok_at(chapter, 0, 0, 0), 0), DocumentPosition(head, 1))
+    chapter.backspace()
+    settle(chapter)
+    assert chapter.type_text("A")
+    settle(chapter)
+    assert paragraphs(chapter) == ["Aworld"]
+
+
+def test_backspace_at_the_start_of_a_paragraph_deletes_the_line_break(chapter: Chapter) -> None:
+    build(chapter, "Hello world.\nSecond one.\n")
+    moved = tokens(chapter)[5:]
+    tok_at(chapter, 1, 0, 0).place_cursor_at_word_index(0)
+    chapter.backspace()
+    settle(chapter)
+    assert sentences(chapter) == [[["Hello", " ", "world", ".", "Second", " ", "one", ".", "\n"]]]
+    assert tokens(chapter)[4:] == moved
+    caret = chapter.caret_owner
+    assert caret is moved[0] and caret.cursor_word_index == 0
+    chapter.type_text(" ")
+    settle(chapter)
+    assert sentences(chapter) == [[["Hello", " ", "world", ".", " "], ["Second", " ", "one", ".", "\n"]]]
+    assert chapter.check_geometry() == []
+
+
+def test_joining_paragraphs_joins_the_words_either_side_of_the_line_break(chapter: Chapter) -> None:
+    build(chapter, "Hel\nlo there\n")
+    tok_at(chapter, 1, 0, 0).place_cursor_at_word_index(0)
+    chapter.backspace()
+    settle(chapter)
+    assert sentences(chapter) == [[["Hello", " ", "there", "\n"]]]
+    caret = chapter.caret_owner
+    assert caret is tok_at(chapter, 0, 0, 0) and caret.cursor_word_index == 3
+
+
+def test_backspace_after_a_line_break_joins_the_paragraphs(chapter: Chapter) -> None:
+    build(chapter, "One.\nTwo.\n")
+    tok_at(chapter, 0, 0, 2).place_cursor_at_word_index(1)
+    chapter.backspace()
+    settle(chapter)
+    assert paragraphs(chapter) == ["One.Two.\n"]
+
+
+def test_backspace_of_a_character_at_the_start_of_a_paragraph_keeps_the_paragraphs(chapter: Chapter) -> None:
+    build(chapter, "One.\nA b\n")
+    tok_at(chapter, 1, 0, 0).place_cursor_at_word_index(1)
+    chapter.backspace()
+    settle(chapter)
+    assert paragraphs(chapter) == ["One.\n", " b\n"]
+    caret = chapter.caret_owner
+    assert caret is tok_at(chapter, 1, 0, 0) and caret.cursor_word_index == 0
+
+
+def test_joining_paragraphs_moves_the_sentences_in_order(chapter: Chapter) -> None:
+    chapter.append_paragraphs([[["a", ".", " "]] * 300, [["b", ".", " "]] * 300])
+    settle(chapter)
+    first, second = chapter.child_entities
+    assert isinstance(first, Paragraph) and isinstance(second, Paragraph)
+    moved = list(second.child_entities)
+    first.append_sentences_from(second, 100)
+    assert first.child_entities[300:] == moved[100:] and second.child_entities == moved[:100]
+    assert all(sentence.parent is first for sentence in moved[100:])
+    settle(chapter)
+    assert chapter.check_geometry() == []
+
+
+def test_a_selection_made_backwards_across_paragraphs_is_walked_in_document_order(chapter: Chapter) -> None:
+    build(chapter, "One two.\nThree four.\nFive six.\n")
+    anchor = tok_at(chapter, 2, 0, 0)
+    head = tok_at(chapter, 0, 0, 2)
+    head.place_cursor_at_word_index(1)
+    chapter.select(DocumentPosition(anchor, 2), DocumentPosition(head, 1))
+    assert [tok.word for tok in chapter.get_selected()] == ["two", ".", "\n", "Three", " ", "four", ".", "\n", "Five"]
+    assert head.highlight_span == (1, 3) and anchor.highlight_span == (0, 2)
+
+
+def test_a_selection_into_paragraphs_not_laid_out_yet_is_walked_in_document_order(chapter: Chapter) -> None:
+    build(chapter, "One two.\n")
+    chapter.append_paragraphs(iter_paragraphs("Three four.\n"))
+    anchor = tok_at(chapter, 1, 0, 2)
+    head = tok_at(chapter, 0, 0, 2)
+    head.place_cursor_at_word_index(0)
+    chapter.select(DocumentPosition(anchor, 4), DocumentPosition(head, 0))
+    assert [tok.word for tok in chapter.get_selected()] == ["two", ".", "\n", "Three", " ", "four"]
+    settle(chapter)
+    chapter.select(DocumentPosition(head, 0), DocumentPosition(anchor, 2))
+    assert [tok.word for tok in chapter.get_selected()] == ["two", ".", "\n", "Three", " ", "four"]
+    assert anchor.highlight_span == (0, 2)
@@ -0,0 +1,165 @@
+import io
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import pytest
+
+from ezwrite.editors.tokenizer import ParagraphText, tokenize_paragraph
+from ezwrite.files.exporter import (ExportTask, MarkdownExporter, NifExporter,
+                                    TextExporter, exporter_for)
+from ezwrite.files.importer import (Importer, ImportReport, iter_lines,
+                                    markdown_paragraphs)
+from ezwrite.ui.chapter import Chapter
+from ezwrite.ui.headless import HeadlessChapterView
+from tests.helpers import build, tok_at
+
+
+def texts(paragraphs: List[str]) -> List[ParagraphText]:
+    return [tokenize_paragraph(paragraph + "\n") for paragraph in paragraphs]
+
+
+def run_import(importer: Importer) -> tuple[List[ParagraphText], ImportReport]:
+    """Run an import on a headless view, sleeping between frames to give the worker the time"""
+    view = HeadlessChapterView()
+    built: List[ParagraphText] = []
+    reports: List[ImportReport] = []
+    importer.start(view, built.extend, lambda fraction: None, reports.append)
+    deadline: float = time.perf_counter() + 10.0
+    while len(reports) == 0 and time.perf_counter() < deadline:
+        view.run_for(Importer.POLL_INTERVAL_MS)
+        time.sleep(0.001)
+    assert len(reports) == 1
+    return built, reports[0]
+
+
+def test_iter_lines_joins_lines_across_chunks() -> None:
+    chunks = [("one\ntw", 7), ("o\r\nthree", 15)]
+    assert list(iter_lines(chunks)) == [("one", 7), ("two", 15), ("three", 15)]
+
+
+def test_markdown_paragraphs() -> None:
+    lines = ["# Title", "first line", "second line", "", "- item", "```", "code  line", "", "```", "end"]
+    blocks = [text for text, _ in markdown_paragraphs((line, 0) for line in lines)]
+    assert blocks == ["# Title", "first line second line", "- item", "```", "code  line", "", "```", "end"]
+
+
+def test_import_a_text_file(tmp_path: Path) -> None:
+    path = tmp_path / "story.txt"
+    path.write_text("Once upon a time.\n\nThe end.\n", encoding="utf-8")
+    built, report = run_import(Importer(str(path)))
+    assert [paragraph.text for paragraph in built] == ["Once upon a time.\n", "\n", "The end.\n"]
+    assert report.error is None
+    assert report.paragraphs == 3 and report.size_bytes == path.stat().st_size
+
+
+def test_import_a_markdown_file(tmp_path: Path) -> None:
+    path = tmp_path / "story.md"
+    path.write_text("# Title\n\nOne\ntwo.\n", encoding="utf-8")
+    built, _ = run_import(Importer(str(path)))
+    assert [paragraph.text for paragraph in built] == ["# Title\n", "One two.\n"]
+
+
+def test_first_paint_waits_for_the_drawing_of_the_first_batch(tmp_path: Path) -> None:
+    path = tmp_path / "story.txt"
+    path.write_text("Once upon a time.\n" * 200, encoding="utf-8")
+    view = HeadlessChapterView()
+    reports: List[ImportReport] = []
+
+    def build_batch(batch: List[ParagraphText]) -> None:
+        view.after_idle(time.sleep, 0.05)  # stands in for Tk drawing what the batch built
+    Importer(str(path)).start(view, build_batch, lambda fraction: None, reports.append)
+    deadline: float = time.perf_counter() + 10.0
+    while len(reports) == 0 and time.perf_counter() < deadline:
+        view.run_for(Importer.POLL_INTERVAL_MS)
+        time.sleep(0.001)
+    assert len(reports) == 1
+    assert 0.05 <= reports[0].first_paint_s <= reports[0].total_s
+
+
+def test_text_export() -> None:
+    file = io.StringIO()
+    TextExporter().write(file, texts(["One.", "Two."]))
+    assert file.getvalue() == "One.\nTwo.\n"
+
+
+def test_markdown_export() -> None:
+    file = io.StringIO()
+    MarkdownExporter().write(file, texts(["# Title", "One."]))
+    assert file.getvalue() == "# Title\n\nOne.\n"
+
+
+def test_markdown_export_keeps_fenced_code_as_it_was(tmp_path: Path) -> None:
+    markdown: str = "# Title\n\nSome text.\n\n```\ndef f():\n\n    return 1\n```\n\nMore text.\n"
+    path = tmp_path / "code.md"
+    path.write_text(markdown, encoding="utf-8")
+    built, _ = run_import(Importer(str(path)))
+    file = io.StringIO()
+    MarkdownExporter().write(file, built)
+    assert file.getvalue() == markdown
+
+
+def test_nif_export_offsets_match_the_text_export() -> None:
+    file = io.StringIO()
+    paragraphs = texts(["One two.", "Three."])
+    NifExporter("http://example.org/doc").write(file, paragraphs)
+    turtle: str = file.getvalue()
+    assert "<http://example.org/doc#char=0,8> a nif:Paragraph" in turtle
+    assert "<http://example.org/doc#char=4,7> a nif:Word" in turtle
+    assert "nif:anchorOf \"two\"" in turtle
+    assert "<http://example.org/doc#char=9,15> a nif:Sentence" in turtle
+    assert "nif:endIndex \"16\"^^xsd:nonNegativeInteger ." in turtle
+
+
+def test_exporter_for() -> None:
+    assert isinstance(exporter_for("a.md"), MarkdownExporter)
+    assert isinstance(exporter_for("a.TTL"), NifExporter)
+    assert isinstance(exporter_for("a.txt"), TextExporter)
+
+
+def test_import_a_missing_file_reports_the_error(tmp_path: Path) -> None:
+    path = tmp_path / "missing.txt"
+    built, report = run_import(Importer(str(path)))
+    assert built == []
+    assert report.error is not None and "missing.txt" in report.error
+    assert str(report).startswith(f"Could not import {path}")
+
+
+def run_export(chapter: Chapter, path: Path, between_slices: Callable[[], None] = lambda: None) -> ExportTask:
+    """Export a headless chapter, calling between_slices after each frame"""
+    view = chapter.view
+    assert isinstance(view, HeadlessChapterView)
+    done: List[ExportTask] = []
+    ExportTask(str(path), chapter).start(view, done.append)
+    deadline: float = time.perf_counter() + 10.0
+    while len(done) == 0 and time.perf_counter() < deadline:
+        view.run_for(ExportTask.POLL_INTERVAL_MS)
+        between_slices()
+        time.sleep(0.001)
+    assert len(done) == 1
+    return done[0]
+
+
+def test_export_copies_the_chapter_in_slices(chapter: Chapter, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(ExportTask, "COPY_BUDGET_MS", 0.0)  # a paragraph per slice
+    build(chapter, "One.\nTwo.\nThree.\n")
+    path = tmp_path / "story.txt"
+    task = run_export(chapter, path)
+    assert task.error is None and task.restarts == 0
+    assert path.read_text(encoding="utf-8") == "One.\nTwo.\nThree.\n"
+
+
+def test_an_edit_during_an_export_starts_the_copy_again(chapter: Chapter,
+                                                        tmp_path: Path,
+                                                        monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(ExportTask, "COPY_BUDGET_MS", 0.0)
+    build(chapter, "One.\nTwo.\nThree.\n")
+    edits: List[str] = ["Uno"]
+
+    def edit() -> None:
+        if len(edits) > 0:
+            tok_at(chapter, 0, 0, 0).change_word(edits.pop())
+    path = tmp_path / "story.txt"
+    task = run_export(chapter, path, edit)
+    assert task.error is None and task.restarts == 1
+    assert path.read_text(encoding="utf-8") == "Uno.\nTwo.\nThree.\n"
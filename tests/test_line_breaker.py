@@ -0,0 +1,30 @@
+from ezwrite.layout.line_breaker import break_lines
+
+
+def test_no_tokens_no_lines() -> None:
+    assert break_lines([], [], 100).line_count == 0
+
+
+def test_tokens_wrap_when_the_line_is_full() -> None:
+    breaks = break_lines([40, 10, 40, 10, 40], [15] * 5, 100)
+    assert [(line.start, line.end) for line in breaks.lines] == [(0, 4), (4, 5)]
+    assert breaks.x_offsets.tolist() == [0, 40, 50, 90, 0]
+    assert breaks.y_offsets.tolist() == [0, 0, 0, 0, 15]
+    assert breaks.token_lines.tolist() == [0, 0, 0, 0, 1]
+    assert breaks.height == 30
+
+
+def test_the_first_line_is_indented() -> None:
+    breaks = break_lines([40, 40, 40], [15] * 3, 100, first_line_indent=30)
+    assert [(line.start, line.end, line.x) for line in breaks.lines] == [(0, 1, 30), (1, 3, 0)]
+
+
+def test_a_token_wider_than_the_frame_has_a_line_of_its_own() -> None:
+    breaks = break_lines([10, 500, 10], [15] * 3, 100)
+    assert [(line.start, line.end) for line in breaks.lines] == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_a_line_is_as_high_as_its_highest_token() -> None:
+    breaks = break_lines([10, 10, 90], [15, 20, 15], 50)
+    assert breaks.line_heights.tolist() == [20, 15]
+    assert breaks.height == 35
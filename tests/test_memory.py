@@ -0,0 +1,11 @@
+from ezwrite.ui.chapter import Chapter
+from ezwrite.utils.memory import memory_report
+from tests.helpers import build
+
+
+def test_the_report_tells_a_large_paragraph_from_the_mean(chapter: Chapter) -> None:
+    build(chapter, "Short.\n" + "A long paragraph of many words. " * 50 + "\n")
+    report = memory_report([chapter])
+    assert report.paragraphs == 2 and report.chapters == 1
+    assert report.paragraph_bytes.largest > report.paragraph_bytes.mean
+    assert report.chapter_bytes.total == report.entity_bytes
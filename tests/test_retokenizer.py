@@ -0,0 +1,35 @@
+from ezwrite.editors.retokenizer import retokenize
+from ezwrite.ui.chapter import Chapter
+from tests.helpers import build, sentences, tok_at
+
+
+def test_an_edit_that_makes_two_words_splits_the_token(chapter: Chapter) -> None:
+    build(chapter, "Hello world")
+    tok = tok_at(chapter, 0, 0, 0)
+    tok.change_word("Hel lo")
+    retokenized = retokenize(tok, 4)
+    assert sentences(chapter) == [[["Hel", " ", "lo", " ", "world"]]]
+    assert retokenized.cursor_token is not None
+    # an offset at the end of one word stays there, rather than moving to the start of the next
+    assert (retokenized.cursor_token.word, retokenized.cursor_index) == (" ", 1)
+
+
+def test_deleting_a_space_joins_the_words_and_keeps_the_first_token(chapter: Chapter) -> None:
+    build(chapter, "wor ld is")
+    first = tok_at(chapter, 0, 0, 0)
+    tok_at(chapter, 0, 0, 1).zap()
+    retokenized = retokenize(first, 3)
+    assert sentences(chapter) == [[["world", " ", "is"]]]
+    assert retokenized.cursor_token is first
+    assert retokenized.cursor_index == 3
+
+
+def test_tokens_outside_the_window_are_kept(chapter: Chapter) -> None:
+    build(chapter, "one two three")
+    (one, three) = (tok_at(chapter, 0, 0, 0), tok_at(chapter, 0, 0, 4))
+    middle = tok_at(chapter, 0, 0, 2)
+    middle.change_word("tw,o")
+    retokenize(middle, 2)
+    assert sentences(chapter) == [[["one", " ", "tw", ",", "o", " ", "three"]]]
+    assert tok_at(chapter, 0, 0, 0) is one
+    assert tok_at(chapter, 0, 0, 6) is three
@@ -0,0 +1,47 @@
+from ezwrite.editors.segmenter import resegment
+from ezwrite.ui.chapter import Chapter
+from ezwrite.ui.sentence import Sentence
+from ezwrite.ui.tok import Tok
+from tests.helpers import build, sentences, settle, tok_at
+
+
+def test_a_new_full_stop_splits_the_sentence(chapter: Chapter) -> None:
+    build(chapter, "one two three")
+    tok = tok_at(chapter, 0, 0, 2)
+    sentence = tok.parent
+    assert isinstance(sentence, Sentence)
+    full_stop = Tok(sentence, ".", tok.font, False)
+    sentence.insert_token_after(tok, full_stop)
+    resegment(full_stop)
+    assert sentences(chapter) == [[["one", " ", "two", ".", " "], ["three"]]]
+
+
+def test_deleting_a_full_stop_merges_the_sentences(chapter: Chapter) -> None:
+    build(chapter, "One. Two. Three.")
+    first = tok_at(chapter, 0, 0, 0)
+    tok_at(chapter, 0, 0, 1).zap()
+    resegment(first)
+    assert sentences(chapter) == [[["One", " ", "Two", ".", " "], ["Three", "."]]]
+
+
+def test_the_tokens_move_between_sentences_rather_than_being_copied(chapter: Chapter) -> None:
+    build(chapter, "One. Two three.")
+    moved = [tok_at(chapter, 0, 1, index) for index in range(4)]
+    first = tok_at(chapter, 0, 0, 0)
+    tok_at(chapter, 0, 0, 1).zap()
+    resegment(first)
+    assert [tok_at(chapter, 0, 0, index) for index in range(2, 6)] == moved
+
+
+def test_split_and_merge_move_the_tokens_in_order_and_reparent_them(chapter: Chapter) -> None:
+    chapter.append_paragraphs([[["w", " "] * 500]])
+    settle(chapter)
+    sentence = tok_at(chapter, 0, 0, 0).parent
+    assert isinstance(sentence, Sentence)
+    before = list(sentence.child_entities)
+    second = sentence.split_after(tok_at(chapter, 0, 0, 599))
+    assert second.child_entities == before[600:] and sentence.child_entities == before[:600]
+    assert all(tok.parent is second for tok in second.child_entities)
+    sentence.append_tokens_from(second)
+    assert sentence.child_entities == before and second.child_entities == []
+    assert all(tok.parent is sentence for tok in before)
@@ -0,0 +1,38 @@
+from ezwrite.editors.tokenizer import (ParagraphText, iter_paragraphs, joins,
+                                       split_tokens, tokenize_paragraph)
+
+
+def test_split_tokens_keeps_whitespace_and_punctuation_as_tokens_of_their_own() -> None:
+    assert split_tokens("Dave's dog, 42 times!") == ["Dave", "'", "s", " ", "dog", ",", " ", "42", " ", "times", "!"]
+
+
+def test_joins_only_word_characters() -> None:
+    assert joins("wor", "ld")
+    assert not joins("world", ".")
+    assert not joins(" ", "This")
+    assert not joins("", "a")
+
+
+def test_iter_paragraphs_ends_sentences_at_the_whitespace_after_a_terminator() -> None:
+    assert list(iter_paragraphs("Hi there. Bye!\nNext")) == [
+        [["Hi", " ", "there", ".", " "], ["Bye", "!", "\n"]],
+        [["Next"]],
+    ]
+
+
+def test_iter_paragraphs_does_not_end_a_sentence_at_a_terminator_inside_a_word() -> None:
+    assert list(iter_paragraphs("e.g. this\n")) == [[["e", ".", "g", ".", " "], ["this", "\n"]]]
+
+
+def test_tokenize_paragraph_matches_iter_paragraphs() -> None:
+    text = "One two. Three four? Five\n"
+    paragraph: ParagraphText = tokenize_paragraph(text)
+    assert paragraph.sentences() == next(iter_paragraphs(text))
+    assert paragraph.token_count == len(split_tokens(text))
+
+
+def test_paragraph_text_round_trips_sentences() -> None:
+    sentences = [["Hello", " ", "world", ".", " "], ["Again", "\n"]]
+    paragraph = ParagraphText.from_sentences(sentences)
+    assert paragraph.text == "Hello world. Again\n"
+    assert paragraph.sentences() == sentences